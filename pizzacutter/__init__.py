@@ -1,7 +1,21 @@
 from .pizzacutter import build
 from .pizzacutter import PizzaCutter
 from .sub.pizzacutter_config import PizzaCutterConfigBase
+from .sub.build_events import BuildEventStream
+from .sub.build_metrics import BuildMetrics
+from .sub.build_plan import BuildPlan, apply_plan
+from .sub.build_report import BuildReport
+from .sub.compiled_template import CompiledTemplate
+from .sub.content_store import ContentStore
+from .sub.fleet import FleetJob, FleetReport, run_fleet
 from .sub.helpers import find_version_number_in_file
+from .sub.output_sinks import OutputSinkBase, FileSystemSink, MemorySink, ZipSink, TarSink
+from .sub.lazy_patterns import LazyPattern
+from .sub.lint import lint, LintFinding
+from .sub.output_cache import OutputCache
+from .sub.pattern_index import PatternIndex
+from .sub.post_processing import PostProcessor, PostProcessFile
+from .sub.renderer import FrozenRenderer
 
 from . import __init__conf__
 __title__ = __init__conf__.title
@@ -1,24 +1,77 @@
 # STDLIB
+import collections
+import hashlib
+import io
 import logging
 import os
 import pprint
-from typing import List, Optional, Union, BinaryIO
+import stat
+import threading
+import time
+import warnings
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set, Tuple, Union, BinaryIO
 
 # OWN
 import pathlib3x as pathlib
 
 try:
+    from . import __init__conf__
+    from .sub import build_events
+    from .sub import build_journal
+    from .sub import build_manifest
+    from .sub import build_metrics
+    from .sub import build_plan
+    from .sub import build_report
+    from .sub import build_state
+    from .sub import compiled_template
+    from .sub import content_store
+    from .sub import diagnostics
     from .sub import get_config
     from .sub import helpers
     from .sub.helpers import find_version_number_in_file
+    from .sub.materialize import MATERIALIZE_METHODS
     from .sub import import_module
+    from .sub import lazy_patterns
+    from .sub import lint
+    from .sub import output_cache
+    from .sub import output_sinks
+    from .sub import path_filter
+    from .sub import pattern_index
+    from .sub import post_processing
+    from .sub import template_walker
+    from .sub import renderer
+    from .sub import resource_limits
+    from .sub import sharding
     from .sub.pizzacutter_config import PizzaCutterConfigBase
 except (ImportError, ModuleNotFoundError):  # pragma: no cover
     # imports for doctest
+    import __init__conf__  # type: ignore  # pragma: no cover
+    from sub import build_events  # type: ignore  # pragma: no cover
+    from sub import build_journal  # type: ignore  # pragma: no cover
+    from sub import build_manifest  # type: ignore  # pragma: no cover
+    from sub import build_metrics  # type: ignore  # pragma: no cover
+    from sub import build_plan  # type: ignore  # pragma: no cover
+    from sub import build_report  # type: ignore  # pragma: no cover
+    from sub import build_state  # type: ignore  # pragma: no cover
+    from sub import compiled_template  # type: ignore  # pragma: no cover
+    from sub import content_store  # type: ignore  # pragma: no cover
+    from sub import diagnostics  # type: ignore  # pragma: no cover
     from sub import get_config  # type: ignore  # pragma: no cover
     from sub import helpers  # type: ignore  # pragma: no cover
     from sub.helpers import find_version_number_in_file  # type: ignore  # pragma: no cover
+    from sub.materialize import MATERIALIZE_METHODS  # type: ignore  # pragma: no cover
     from sub import import_module  # type: ignore  # pragma: no cover
+    from sub import lazy_patterns  # type: ignore  # pragma: no cover
+    from sub import lint  # type: ignore  # pragma: no cover
+    from sub import output_cache  # type: ignore  # pragma: no cover
+    from sub import output_sinks  # type: ignore  # pragma: no cover
+    from sub import path_filter  # type: ignore  # pragma: no cover
+    from sub import pattern_index  # type: ignore  # pragma: no cover
+    from sub import post_processing  # type: ignore  # pragma: no cover
+    from sub import template_walker  # type: ignore  # pragma: no cover
+    from sub import renderer  # type: ignore  # pragma: no cover
+    from sub import resource_limits  # type: ignore  # pragma: no cover
+    from sub import sharding  # type: ignore  # pragma: no cover
     from sub.pizzacutter_config import PizzaCutterConfigBase  # type: ignore  # pragma: no cover
 
 logger = logging.getLogger()
@@ -41,7 +94,57 @@ class PizzaCutter(object):
                  allow_overwrite: Optional[bool] = None,
                  # allow to write files outside the target Project Folder, can be overridden by conf_file
                  allow_outside_write: Optional[bool] = None,
-                 quiet: Optional[bool] = None
+                 quiet: Optional[bool] = None,
+                 # where to write the target objects to - default is the filesystem. can be an archive, memory, or a custom sink
+                 output_sink: Optional[output_sinks.OutputSinkBase] = None,
+                 # how to materialize verbatim files : 'copy', 'reflink' or 'hardlink' (shares the inode with the template file), can be overridden by conf_file
+                 materialize: Optional[str] = None,
+                 # leave target files untouched if the content would not change, can be overridden by conf_file
+                 write_if_changed: Optional[bool] = None,
+                 # where the state of the builds into the target directory is kept - None : only kept if a feature needs it, can be overridden by conf_file
+                 path_state_dir: Optional[pathlib.Path] = None,
+                 # only re-render files whose template, target or pattern dependencies changed since the last build, can be overridden by conf_file
+                 selective_rebuild: Optional[bool] = None,
+                 # the compiled template - the build uses its manifest instead of walking and rescanning the template
+                 compiled: Optional[compiled_template.CompiledTemplate] = None,
+                 # the biggest file rendered in memory in bytes, 0 is unlimited, can be overridden by conf_file
+                 max_render_size: Optional[int] = None,
+                 # the memory (rss) the build should stay in, in bytes, 0 is unlimited, can be overridden by conf_file
+                 max_build_memory: Optional[int] = None,
+                 # the biggest string pattern value (included file) in bytes, 0 is unlimited, can be overridden by conf_file
+                 max_include_size: Optional[int] = None,
+                 # what to do with oversized files : 'stream' or 'copy', can be overridden by conf_file
+                 oversize_action: Optional[str] = None,
+                 # write the progress of the build as JSON lines events - None : no events
+                 event_stream: Optional[build_events.BuildEventStream] = None,
+                 # collect the metrics of the build, they can be exported as OpenMetrics text - None : no metrics
+                 metrics: Optional[build_metrics.BuildMetrics] = None,
+                 # the conf files of overlay templates, merged in that order over the template of the conf file - later layers take precedence
+                 layers: Optional[Sequence[pathlib.Path]] = None,
+                 # the content store shared by the builds of many target directories - None : the files are written directly, can be overridden by conf_file
+                 path_content_store: Optional[pathlib.Path] = None,
+                 # how the targets are materialized from the content store : 'reflink' or 'hardlink', can be overridden by conf_file
+                 content_store_method: Optional[str] = None,
+                 # load the conf files under module names unique for their path, without leaving their directories in sys.path -
+                 # for many builds in one interpreter (fleet builds)
+                 isolated_config: bool = False,
+                 # only build that shard of the template : (index, count), the index counts from 1 - None : the whole template
+                 shard: Optional[Tuple[int, int]] = None,
+                 # the cache of whole build outputs - None : no output cache, can be overridden by conf_file
+                 path_output_cache: Optional[pathlib.Path] = None,
+                 # the limits of the output cache in bytes and in entries, 0 is unlimited, can be overridden by conf_file
+                 output_cache_max_size: Optional[int] = None,
+                 output_cache_max_entries: Optional[int] = None,
+                 # only build the template objects matching one of these globs, on the template path or the target path - empty : all objects
+                 only: Sequence[str] = (),
+                 # do not build the template objects matching one of these globs, on the template path or the target path
+                 exclude: Sequence[str] = (),
+                 # log every warning of the build at once, instead of a summary by kind at the end of the build, can be overridden by conf_file
+                 verbose_diagnostics: Optional[bool] = None,
+                 # journal the build in the state directory, so it can be resumed if it is interrupted, can be overridden by conf_file
+                 journal: Optional[bool] = None,
+                 # continue a build which was interrupted, from its journal : the target files it completed are verified and kept
+                 resume: bool = False
                  ):
         """ Init reads the config file and sets up the neccessary class properties
 
@@ -59,6 +162,18 @@ class PizzaCutter(object):
         ...
         FileNotFoundError: the config file ... can not be found
 
+        >>> # Test init, unknown materialize method
+        >>> pizza_cutter = PizzaCutter(path_conf_file=path_conf_file, quiet=True, materialize='symlink')
+        Traceback (most recent call last):
+        ...
+        ValueError: materialize must be one of ('copy', 'reflink', 'hardlink'), not "symlink"
+
+        >>> # Test init, template layer conf file not found
+        >>> pizza_cutter = PizzaCutter(path_conf_file=path_conf_file, quiet=True, layers=[pathlib.Path('not_existing_conf_file')])
+        Traceback (most recent call last):
+        ...
+        FileNotFoundError: the config file of the template layer "not_existing_conf_file" can not be found
+
         """
 
         if not path_conf_file.is_file():
@@ -66,7 +181,8 @@ class PizzaCutter(object):
 
         self.conf = get_config.PizzaCutterGetConfig(pizza_cutter_path_conf_file=path_conf_file,
                                                     pizza_cutter_path_template_dir=path_template_dir,
-                                                    pizza_cutter_path_target_dir=path_target_dir).conf
+                                                    pizza_cutter_path_target_dir=path_target_dir,
+                                                    isolated=isolated_config).conf
 
         if path_template_dir is None:
             # we call again pathlib.Path, to be sure it is pathlib3x Type
@@ -99,46 +215,799 @@ class PizzaCutter(object):
         else:
             self.quiet = quiet
 
+        self.verbose_diagnostics = self.conf.pizza_cutter_verbose_diagnostics if verbose_diagnostics is None else verbose_diagnostics
+        # the warnings of the build by kind - logged as a summary at the end of the build
+        self.diagnostics = diagnostics.Diagnostics(logger, verbose=self.verbose_diagnostics)
+
+        if output_sink is None:
+            self.output_sink: output_sinks.OutputSinkBase = output_sinks.FileSystemSink()
+        else:
+            self.output_sink = output_sink
+
+        if materialize is None:
+            self.materialize = self.conf.pizza_cutter_materialize
+        else:
+            self.materialize = materialize
+        if self.materialize not in MATERIALIZE_METHODS:
+            raise ValueError(f'materialize must be one of {MATERIALIZE_METHODS}, not "{self.materialize}"')
+
+        if write_if_changed is None:
+            self.write_if_changed = self.conf.pizza_cutter_write_if_changed
+        else:
+            self.write_if_changed = write_if_changed
+
+        if path_state_dir is None:
+            path_state_dir = self.conf.pizza_cutter_path_state_dir
+        self.path_state_dir = build_state.get_path_state_dir(self.path_target_dir, path_state_dir)
+        # without a state directory given, the state is only kept (in the user cache directory) for the features which need it, see uses_build_state()
+        self.state_dir_given = path_state_dir is not None
+
+        if selective_rebuild is None:
+            self.selective_rebuild = self.conf.pizza_cutter_selective_rebuild
+        else:
+            self.selective_rebuild = selective_rebuild
+
+        self.compiled_template = compiled
+
+        # the files are partitioned by a hash of their template path, the directories are created by every shard
+        self.shard = sharding.check_shard(shard)
+        # the subset of the template to build - the objects which are not selected are not even walked. None : the whole template
+        self.path_filter = path_filter.get_path_filter(only=only, exclude=exclude)
+
+        if path_content_store is None:
+            path_content_store = self.conf.pizza_cutter_path_content_store
+        if content_store_method is None:
+            content_store_method = self.conf.pizza_cutter_content_store_method
+        self.content_store: Optional[content_store.ContentStore] = None
+        if path_content_store is not None:
+            self.content_store = content_store.ContentStore(pathlib.Path(path_content_store).resolve(), method=content_store_method)
+
+        self.output_cache = self.get_output_cache(path_output_cache, output_cache_max_size, output_cache_max_entries)
+        # the fingerprint and the target objects of a build whose output is not in the output cache yet, None if the output is not stored
+        self.output_cache_fingerprint: Optional[str] = None
+        self.output_cache_objects: Optional[List[List[Any]]] = None
+
+        # the conf files of the template layers, each with its own template directory - the patterns are merged before the build
+        self.layer_confs: List[PizzaCutterConfigBase] = list()
+        for path_layer_conf_file in layers or ():
+            if not pathlib.Path(path_layer_conf_file).is_file():
+                raise FileNotFoundError(f'the config file of the template layer "{path_layer_conf_file}" can not be found')
+            self.layer_confs.append(get_config.PizzaCutterGetConfig(pizza_cutter_path_conf_file=pathlib.Path(path_layer_conf_file),
+                                                                    pizza_cutter_path_target_dir=self.path_target_dir,
+                                                                    isolated=isolated_config).conf)
+        if self.layer_confs and self.compiled_template is not None:
+            raise ValueError('a compiled template can not be used with template layers')
+        # the template directories by layer number, 0 is the template directory of the conf file
+        self.path_template_dirs = [self.path_template_dir] + [pathlib.Path(layer_conf.pizza_cutter_path_template_dir) for layer_conf in self.layer_confs]
+
+        self.resource_limits = resource_limits.ResourceLimits(
+            max_render_size=self.conf.pizza_cutter_max_render_size if max_render_size is None else max_render_size,
+            max_build_memory=self.conf.pizza_cutter_max_build_memory if max_build_memory is None else max_build_memory,
+            max_include_size=self.conf.pizza_cutter_max_include_size if max_include_size is None else max_include_size,
+            oversize_action=self.conf.pizza_cutter_oversize_action if oversize_action is None else oversize_action)
+
+        # the instrumentation is only done if it is enabled
+        self.event_stream = event_stream
+        self.build_metrics = metrics
+        self.phase_started = time.perf_counter()
+
+        # the post processors of the build - None if there are none to run
+        self.post_processing: Optional[post_processing.PostProcessing] = None
+        # the rendered files waiting for the post processors in memory : (post process file, template entry, source, path counts, content counts, started)
+        self.pending_target_files: List[Tuple[post_processing.PostProcessFile, template_walker.TemplateEntry, pathlib.Path,
+                                              Dict[str, int], Dict[str, int], float]] = list()
+        # the written files waiting for the post processors on disk, they are recorded in the build manifest after those are done
+        self.post_processed_records: List[Tuple[template_walker.TemplateEntry, pathlib.Path, pathlib.Path, Dict[str, int], Dict[str, int]]] = list()
+
         self.file_stack: List[pathlib.Path] = list()
         self.pattern_stack: List[str] = list()
+        # the values of the lazy patterns computed in this build, and the values computed in former builds (if their input files did not change)
+        self.lazy_values: Dict[str, Union[str, pathlib.Path]] = dict()
+        self.pattern_cache = lazy_patterns.PatternCache()
+        self.build_report = build_report.BuildReport()
+        # which template objects use which pattern - filled during the build
+        self.pattern_index = pattern_index.PatternIndex()
+        # what the last build and this build wrote into the target - only used with the filesystem sink
+        self.previous_build_manifest = build_manifest.BuildManifest()
+        self.build_manifest = build_manifest.BuildManifest()
+        # render_file() : the renderer with the resolved patterns, and the template files by target path - both are set up on the first call
+        self.file_renderer: Optional[renderer.Renderer] = None
+        # if the hooks were called and the patterns resolved for rendering without a build, see prepare_patterns()
+        self.patterns_prepared = False
+        # the write-ahead journal of the build, and the records of the target files an interrupted build completed, if it is resumed
+        self.journal = self.conf.pizza_cutter_build_journal if journal is None else journal
+        self.resume = resume
+        self.build_journal: Optional[build_journal.BuildJournal] = None
+        self.resumed_records: Dict[str, Dict[str, Any]] = dict()
+        self.template_files_by_target: Optional[Dict[str, template_walker.TemplateEntry]] = None
+
+    def build(self) -> build_report.BuildReport:
+        """
+        builds or rebuilds the target based on the conf file and template given, returns the build report.
+        the pattern index is persisted in the state directory (if the build keeps its state, see uses_build_state()),
+        on dry_run the unused patterns are logged instead.
 
-    def build(self) -> None:
-        """ builds or rebuilds the target based on the conf file and template given"""
-        self.conf.pizza_cutter_hook_before_build()
-        self.resolve_str_patterns()
-        self.copy_files_from_template_to_project()
-        self.replace_patterns_in_files()
-        self.log_unfilled_patterns()
-        self.conf.pizza_cutter_hook_after_build()
+        >>> # Setup
+        >>> path_test_dir = pathlib.Path(__file__).parent.parent.resolve() / 'tests'
+        >>> path_template_dir = path_test_dir / 'pizzacutter_test_template_01'
+        >>> path_conf_file = path_template_dir / 'PizzaCutterTestConfig_01.py'
+        >>> path_target_dir = path_test_dir / 'pizzacutter_test_project_01'
+        >>> path_state_dir = path_test_dir / 'pizzacutter_test_state_01'
+        >>> pizza_cutter = PizzaCutter(path_conf_file, path_template_dir, path_target_dir, quiet=True, path_state_dir=path_state_dir)
+
+        >>> # Test
+        >>> report = pizza_cutter.build()
+        >>> report.diagnostics
+        {'unfilled_patterns_in_file': 1}
+        >>> loaded_pattern_index = pattern_index.PatternIndex.load(path_state_dir / pattern_index.PATTERN_INDEX_FILENAME)
+        >>> loaded_pattern_index.where('{{TestPizzaCutter.project_dir}}')['paths']['{{TestPizzaCutter.project_dir}}']
+        1
+        >>> loaded_pattern_index.unused()
+        ['{{PizzaCutter.True}}']
+        >>> path_target_dir.rmtree(ignore_errors=True)
+
+        >>> # Teardown
+        >>> path_target_dir.rmtree(ignore_errors=True)
+        >>> path_state_dir.rmtree(ignore_errors=True)
+
+        """
+        self.build_report = build_report.BuildReport()
+        if self.shard is not None:
+            self.build_report.shards.append(f'{self.shard[0]}/{self.shard[1]}')
+        self.phase_started = time.perf_counter()
+        event_log_handler = self.start_build_events()
+        try:
+            self.call_hooks_before_build()
+            self.pattern_index = pattern_index.PatternIndex(self.conf.pizza_cutter_patterns.keys())
+            # the references between the patterns are lost when the patterns are resolved
+            self.pattern_index.add_pattern_references(self.conf.pizza_cutter_patterns)
+            self.check_compiled_template()
+            self.start_lazy_patterns()
+            self.resolve_str_patterns()
+            self.resource_limits.check_pattern_sizes(self.conf.pizza_cutter_patterns)
+            self.end_phase('resolve')
+            self.load_build_manifest()
+            self.start_build_journal()
+            self.output_sink.begin(self.path_target_dir)
+            try:
+                if not self.build_from_output_cache():
+                    self.copy_files_from_template_to_project()
+                self.end_phase('render')
+            finally:
+                self.output_sink.finish()
+            if self.dry_run:
+                self.log_unused_patterns()
+            else:
+                self.store_output_cache()
+                self.save_pattern_index()
+                if self.pattern_cache.values and self.uses_build_state():
+                    self.pattern_cache.save(self.path_state_dir / lazy_patterns.PATTERN_CACHE_FILENAME)
+                if self.uses_build_manifest():
+                    self.build_manifest.save(self.path_state_dir / build_manifest.BUILD_MANIFEST_FILENAME)
+                if self.build_journal is not None:
+                    self.build_journal.remove()
+                if self.content_store is not None and self.content_store.references:
+                    self.content_store.save_references(self.path_target_dir.resolve())
+            self.end_phase('finish')
+            for conf in [self.conf] + self.layer_confs:
+                conf.pizza_cutter_hook_after_build()
+            self.build_report.diagnostics = self.diagnostics.counts()
+            self.diagnostics.emit()
+            if not self.quiet:
+                logger.info(self.build_report.as_text())
+            self.emit_event('build_finished', report=self.build_report.as_dict())
+        finally:
+            # the summary of the warnings until a build failed
+            self.diagnostics.emit()
+            # the target files completed until a build failed, so it can be resumed
+            if self.build_journal is not None:
+                self.build_journal.close()
+            self.stop_build_events(event_log_handler)
+        return self.build_report
+
+    def log_unused_patterns(self) -> None:
+        """ the pattern index of a build of a subset of the template does not know if the other objects use a pattern """
+        if self.path_filter is not None:
+            return
+        for pattern in self.pattern_index.unused():
+            logger.info(f'pattern is not used in the template: "{pattern}"')
+
+    def uses_build_state(self) -> bool:
+        """
+        the state of the builds (pattern index, pattern cache, ...) is only kept if a state directory is given, or for a selective rebuild
+        and a journaled or resumed build, which read it - otherwise a build leaves nothing in the user cache directory
+        """
+        return self.state_dir_given or self.selective_rebuild or self.journal or self.resume
+
+    def save_pattern_index(self) -> None:
+        """ the pattern index describes the whole template - after a build of a subset, the index of the last full build is kept """
+        if self.path_filter is None and self.uses_build_state():
+            self.pattern_index.save(self.path_state_dir / pattern_index.PATTERN_INDEX_FILENAME)
+
+    def call_hooks_before_build(self) -> None:
+        """ the hooks of the conf file and of the template layers - then the patterns of the layers are merged, a later layer takes precedence """
+        for conf in [self.conf] + self.layer_confs:
+            conf.pizza_cutter_hook_before_build()
+        for layer_conf in self.layer_confs:
+            self.conf.pizza_cutter_patterns.update(layer_conf.pizza_cutter_patterns)
+
+    def start_build_events(self) -> Optional[build_events.BuildEventLogHandler]:
+        """ emit the build_started event, and forward the warnings logged during the build into the event stream """
+        if self.event_stream is None:
+            return None
+        self.emit_event('build_started', conf_file=str(self.conf.pizza_cutter_path_conf_file), template_dir=str(self.path_template_dir),
+                        target_dir=str(self.path_target_dir), dry_run=self.dry_run)
+        event_log_handler = build_events.BuildEventLogHandler(self.event_stream)
+        logger.addHandler(event_log_handler)
+        return event_log_handler
+
+    @staticmethod
+    def stop_build_events(event_log_handler: Optional[build_events.BuildEventLogHandler]) -> None:
+        if event_log_handler is not None:
+            logger.removeHandler(event_log_handler)
+
+    def emit_event(self, event: str, **details: Any) -> None:
+        if self.event_stream is not None:
+            self.event_stream.emit(event, **details)
+
+    def plan(self) -> build_plan.BuildPlan:
+        """
+        the plan step of a build : decides what to do with every template object, without writing anything.
+        the plan can be applied with build_plan.apply_plan() - the hook after the build is not run then.
+
+        >>> # Setup
+        >>> path_test_dir = pathlib.Path(__file__).parent.parent.resolve() / 'tests'
+        >>> path_template_dir = path_test_dir / 'pizzacutter_test_template_01'
+        >>> path_conf_file = path_template_dir / 'PizzaCutterTestConfig_01.py'
+        >>> path_expected_folder = path_test_dir / 'pizzacutter_test_project_01_expected'
+        >>> path_target_dir = path_test_dir / 'pizzacutter_test_project_01'
+        >>> path_plan_file = path_test_dir / 'pizzacutter_test_plan_01.json'
+        >>> pizza_cutter = PizzaCutter(path_conf_file, path_template_dir, path_target_dir, quiet=True)
+
+        >>> # Test
+        >>> plan = pizza_cutter.plan()
+        >>> print(plan.as_text())
+        mkdir       pizzacutter_test_project
+        mkdir       pizzacutter_test_project/dir_test_01
+        ...
+        render      pizzacutter_test_project/test01.txt  <-  {{TestPizzaCutter.project_dir}}/test01.txt
+        ...
+        >>> plan.save(path_plan_file)
+        >>> report = build_plan.apply_plan(build_plan.BuildPlan.load(path_plan_file))
+        >>> assert report.files_rendered == 9
+        >>> assert len(list(path_expected_folder.glob('./**/*'))) == len(list(path_target_dir.glob('./**/*')))
+
+        >>> # Test skip existing objects
+        >>> [operation['reason'] for operation in pizza_cutter.plan().operations][:2]
+        ['allow_overwrite is False', 'allow_overwrite is False']
+
+        >>> # Teardown
+        >>> path_target_dir.rmtree(ignore_errors=True)
+        >>> path_plan_file.unlink()
 
-    def replace_patterns_in_files(self) -> None:
         """
-        replaces the patterns in each file
+        if isinstance(self.output_sink, output_sinks.FileSystemSink):
+            self.output_sink.reset_target_snapshot()
+        self.call_hooks_before_build()
+        self.check_compiled_template()
+        self.start_lazy_patterns()
+        self.resolve_str_patterns()
+        # the patterns are set after the walk - the lazy patterns are only computed if the template uses them
+        plan = build_plan.BuildPlan(path_template_dir=str(self.path_template_dir.resolve()), path_target_dir=str(self.path_target_dir.resolve()),
+                                    options=self.conf.pizza_cutter_options, materialize=self.materialize)
+        self.pattern_index = pattern_index.PatternIndex(self.conf.pizza_cutter_patterns.keys())
+
+        for template_entry in self.iter_template_entries():
+            path_source_object = self.get_path_source_object(template_entry)
+            content = b'' if template_entry.is_dir else path_source_object.read_bytes()
+            _, content_counts = self.pattern_index.add_template_object(template_entry.path, content)
+            path_target_object_resolved = self.get_path_target_object(path_source_object=path_source_object)
+            # the files of the overlay layers are not in the template directory of the plan, they are referenced with the full path
+            source = str(path_source_object) if template_entry.layer else template_entry.path
+
+            if self.skip_write_outside_project_folder(path_target_object_resolved, quiet=True):
+                plan.add_skip(source, path_target_object_resolved, 'outside project directory not allowed')
+                continue
+
+            self.log_unfilled_patterns_in_path(path_target_object_resolved)
+
+            if self.output_sink.exists(path_target_object_resolved):
+                if template_entry.no_overwrite:
+                    plan.add_skip(source, path_target_object_resolved, 'object_no_overwrite')
+                    continue
+                if not self.allow_overwrite:
+                    plan.add_skip(source, path_target_object_resolved, 'allow_overwrite is False')
+                    continue
 
+            if template_entry.is_dir:
+                plan.add_mkdir(source, path_target_object_resolved)
+            elif self.materialize != 'copy' and self.get_verbatim(template_entry, path_source_object, content):
+                plan.add_materialize(source, path_target_object_resolved, no_overwrite=template_entry.no_overwrite)
+            else:
+                plan.add_render(source, path_target_object_resolved, sorted(content_counts), no_overwrite=template_entry.no_overwrite)
+
+        unused_patterns = self.pattern_index.unused()
+        plan.set_patterns({pattern: self.get_pattern_value(pattern) for pattern, replacement in self.conf.pizza_cutter_patterns.items()
+                           if not (lazy_patterns.is_lazy(replacement) and pattern in unused_patterns)})
+        return plan
+
+    def compile_template(self) -> compiled_template.CompiledTemplate:
         """
+        analyzes the template with its config once, without writing anything : validates every path and content pattern and detects cycles
+        in the pattern values, so errors which would otherwise only appear in the middle of a build are found up front.
 
-        path_source_objects = self.get_path_template_objects()
+        >>> # Setup
+        >>> path_test_dir = pathlib.Path(__file__).parent.parent.resolve() / 'tests'
+        >>> path_template_dir = path_test_dir / 'pizzacutter_test_template_02'
+        >>> path_conf_file = path_template_dir / 'PizzaCutterTestConfig_02.py'
+        >>> path_target_dir = path_test_dir / 'pizzacutter_test_project_02'
+        >>> pizza_cutter = PizzaCutter(path_conf_file, path_template_dir, path_target_dir, quiet=True)
 
-        for path_source_object in path_source_objects:
+        >>> # Test
+        >>> compiled = pizza_cutter.compile_template()
+        >>> compiled.errors
+        []
+        >>> [entry['segments'] for entry in compiled.entries if entry['path'].endswith('/malformed.txt')]
+        [[]]
+        >>> print(compiled.as_text())
+        warning: ...malformed.txt: malformed pattern "{{TestPizzaCutter.missing_brackets" in line 2, column 27
+        ...
 
-            path_target_object = self.get_path_target_object(path_source_object=path_source_object)
+        >>> # Test the build uses the compiled template
+        >>> _ = PizzaCutter(path_conf_file, path_template_dir, path_target_dir, quiet=True, dry_run=True, compiled=compiled).build()
+
+        >>> # Test invalid pathlib pattern and cycle
+        >>> pizza_cutter.conf.pizza_cutter_patterns['{{TestPizzaCutter.intenionally_unfilled_pattern}}'] = pathlib.Path('test')
+        >>> print(pizza_cutter.compile_template().as_text())
+        error: {{TestPizzaCutter.project_dir}}/dir_test_01/test04{{TestPizzaCutter.intenionally_unfilled_pattern}}.txt: pathlib.Path patterns can only be ...
+        >>> pizza_cutter.conf.pizza_cutter_patterns['{{TestPizzaCutter.doctest}}'] = '{{TestPizzaCutter.doctest}}'
+        >>> print(pizza_cutter.compile_template().as_text())
+        error: : "{{TestPizzaCutter.doctest}}" refers back to "{{TestPizzaCutter.doctest}}"...
+
+        >>> # Test a compiled template with errors is refused
+        >>> PizzaCutter(path_conf_file, path_template_dir, path_target_dir, quiet=True, compiled=pizza_cutter.compile_template()).build()
+        Traceback (most recent call last):
+        ...
+        RuntimeError: the compiled template has errors, fix them and compile again
 
-            if self.do_not_copy(path_source_object):
+        """
+        compiled = compiled_template.CompiledTemplate(path_template_dir=str(self.path_template_dir.resolve()), template_digest=self.get_template_digest())
+        self.start_lazy_patterns()
+        try:
+            self.resolve_str_patterns()
+        except RecursionError as exc:
+            self.pattern_stack = list()
+            compiled.add_error('', str(exc))
+            return compiled
+
+        known_patterns = set(self.conf.pizza_cutter_patterns.keys()) | set(self.conf.pizza_cutter_options.values())
+        segment_matcher = lint.get_pattern_matcher(known_patterns)
+        prefix_matcher = lint.get_pattern_matcher(self.conf.pizzacutter_pattern_prefixes)
+        index = pattern_index.PatternIndex(self.conf.pizza_cutter_patterns.keys())
+
+        # the compiled template describes the whole template, also if the build selects a subset of it
+        for template_entry in self.iter_template_entries(selected=False):
+            path_source_object = self.get_path_source_object(template_entry)
+            try:
+                target: Optional[str] = str(self.get_path_target_object(path_source_object=path_source_object))
+            except RuntimeError as exc:
+                compiled.add_error(template_entry.path, str(exc))
+                target = None
+
+            if template_entry.is_dir:
+                compiled.add_entry(template_entry, target, path_source_object)
                 continue
 
-            if self.skip_write_outside_project_folder(path_target_object, quiet=True):
+            content = path_source_object.read_bytes()
+            path_counts, content_counts = index.add_template_object(template_entry.path, content)
+            segments = [[match.start(), match.group().decode('utf-8')] for match in segment_matcher.finditer(content)] if b'{{' in content else list()
+            compiled.add_entry(template_entry, target, path_source_object, path_counts, content_counts, segments, self.is_verbatim(path_source_object, content))
+
+            for finding in lint.lint_content(content, prefix_matcher):
+                if finding.pattern not in known_patterns:
+                    compiled.add_warning(template_entry.path, f'{finding.kind} pattern "{finding.pattern}" in line {finding.line}, column {finding.column}')
+        self.diagnostics.emit()
+        return compiled
+
+    def get_template_digest(self) -> str:
+        """ the digest of the pattern keys, their types and the options - what a compiled template depends on, besides the template files """
+        pattern_keys = sorted((pattern, isinstance(replacement, str)) for pattern, replacement in self.conf.pizza_cutter_patterns.items())
+        settings = [str(self.path_template_dir.resolve()), pattern_keys, sorted(self.conf.pizza_cutter_options.items())]
+        return hashlib.sha256(repr(settings).encode('utf-8')).hexdigest()
+
+    def check_compiled_template(self) -> None:
+        """ a compiled template must be free of errors and must have been compiled with the same template directory, pattern keys and options """
+        if self.compiled_template is None:
+            return
+        if self.compiled_template.errors:
+            raise RuntimeError('the compiled template has errors, fix them and compile again')
+        if self.compiled_template.template_digest != self.get_template_digest():
+            raise ValueError('the compiled template does not match the template directory, the pattern keys or the options, compile again')
+
+    def uses_build_manifest(self) -> bool:
+        """
+        the build manifest records the targets on the filesystem, so it is only used with the filesystem sink - and only for a selective rebuild,
+        or a journaled build, whose journal has the manifest records. other builds dont stat, hash and record their targets
+        """
+        if not isinstance(self.output_sink, output_sinks.FileSystemSink):
+            return False
+        return self.selective_rebuild or self.journal or self.resume
+
+    def get_settings_digest(self) -> str:
+        """ the digest of the settings which affect every target file - if they change, the manifest of the last build is not used """
+        settings = [str(self.path_template_dir.resolve()), str(self.path_target_dir.resolve()),
+                    self.materialize, sorted(self.conf.pizza_cutter_options.items())]
+        return hashlib.sha256(repr(settings).encode('utf-8')).hexdigest()
+
+    def load_build_manifest(self) -> None:
+        settings_digest = self.get_settings_digest()
+        self.build_manifest = build_manifest.BuildManifest(settings_digest=settings_digest)
+        if self.uses_build_manifest():
+            self.previous_build_manifest = build_manifest.BuildManifest.load(self.path_state_dir / build_manifest.BUILD_MANIFEST_FILENAME, settings_digest)
+        else:
+            self.previous_build_manifest = build_manifest.BuildManifest(settings_digest=settings_digest)
+
+    def start_build_journal(self) -> None:
+        """
+        journal the target files of a build on the filesystem as they are completed, if the build is journaled (or resumed) - the journal is kept
+        in the state directory, not in the target. a resumed build takes the records of the journal of the interrupted build like those
+        of a previous build manifest : a target file whose template, target and pattern values did not change since it was completed is kept,
+        without rendering it again. if the journal is from a build with other settings, nothing is resumed.
+        """
+        self.build_journal = None
+        self.resumed_records = dict()
+        if self.dry_run or not (self.journal or self.resume) or not self.uses_build_manifest():
+            return
+        self.build_journal = build_journal.BuildJournal(self.path_state_dir / build_journal.BUILD_JOURNAL_FILENAME, settings_digest=self.get_settings_digest())
+        if self.resume:
+            self.resumed_records = self.build_journal.load()
+            self.previous_build_manifest.files.update(self.resumed_records)
+        self.build_journal.start(resume=self.resume)
+
+    def remove_interrupted_target(self, template_entry: template_walker.TemplateEntry, path_target_object: pathlib.Path) -> None:
+        """
+        a resumed build removes a target file the interrupted build wrote, but did not complete - it might be written partly, and would be kept
+        otherwise, if the file must not be overwritten. the file was written by the interrupted build, if it is newer than the start of that build
+        """
+        if not self.resumed_records or template_entry.is_dir or template_entry.path in self.resumed_records:
+            return
+        if self.allow_overwrite and not template_entry.no_overwrite:
+            # the target is written again anyway
+            return
+        assert self.build_journal is not None
+        stat_signature = build_manifest.get_stat_signature(path_target_object)
+        # the timestamps of the filesystems are coarser than the clock
+        if stat_signature is None or stat_signature[1] < self.build_journal.started - build_journal.MTIME_GRANULARITY_NS:
+            return
+        path_target_object.unlink()
+        if isinstance(self.output_sink, output_sinks.FileSystemSink):
+            self.output_sink.target_snapshot.remove(path_target_object)
+        self.diagnostics.add('interrupted_target_removed', logging.INFO, 'targets removed, which the interrupted build did not complete',
+                             'target removed, the interrupted build did not complete it: "%s"', path_target_object)
+
+    def get_output_cache(self, path_output_cache: Optional[pathlib.Path], max_size: Optional[int],
+                         max_entries: Optional[int]) -> Optional[output_cache.OutputCache]:
+        """ the output cache of the build - the arguments take precedence over the conf file """
+        if path_output_cache is None:
+            path_output_cache = self.conf.pizza_cutter_path_output_cache
+        if path_output_cache is None:
+            return None
+        return output_cache.OutputCache(pathlib.Path(path_output_cache).resolve(),
+                                        max_size=self.conf.pizza_cutter_output_cache_max_size if max_size is None else max_size,
+                                        max_entries=self.conf.pizza_cutter_output_cache_max_entries if max_entries is None else max_entries)
+
+    def get_output_cache_fingerprint(self) -> Optional[str]:
+        """
+        the fingerprint of everything the output of the build depends on : the pizzacutter version, the conf files, the template files,
+        the values of all patterns (lazy patterns are computed for that) and the options. None if the output cache is not used for the build :
+        the output cache only stores complete target trees written to the filesystem - not with dry_run, shards, path filters, selective rebuild,
+        a resumed build, a content store,
+        and not if a pattern has an absolute path, because the objects placed there dont move with the target directory
+        """
+        if self.output_cache is None or self.dry_run or self.shard is not None or self.selective_rebuild or self.content_store is not None:
+            return None
+        if self.path_filter is not None or self.resumed_records or not isinstance(self.output_sink, output_sinks.FileSystemSink):
+            return None
+        fingerprint = hashlib.sha256()
+        pattern_values: List[Tuple[str, str, str]] = list()
+        for pattern in sorted(self.conf.pizza_cutter_patterns):
+            value = self.get_pattern_value(pattern)
+            if isinstance(value, pathlib.Path) and value.is_absolute():
+                return None
+            pattern_values.append((pattern, value.__class__.__name__, str(value)))
+        settings = [__init__conf__.version, pattern_values, sorted(self.conf.pizza_cutter_options.items()), self.allow_outside_write,
+                    self.resource_limits.max_render_size, self.resource_limits.max_build_memory, self.resource_limits.oversize_action,
+                    [output_cache.get_file_digest(conf.pizza_cutter_path_conf_file) for conf in [self.conf] + self.layer_confs]]
+        fingerprint.update(repr(settings).encode('utf-8'))
+        for template_entry in self.iter_template_entries():
+            fingerprint.update(repr((template_entry.path, template_entry.is_dir, template_entry.no_overwrite)).encode('utf-8'))
+            if not template_entry.is_dir:
+                path_source_file = self.get_path_source_object(template_entry)
+                executable = bool(path_source_file.stat().st_mode & stat.S_IXUSR)
+                fingerprint.update(f'{executable} {output_cache.get_file_digest(path_source_file)}'.encode('utf-8'))
+        return fingerprint.hexdigest()
+
+    def build_from_output_cache(self) -> bool:
+        """
+        materialize the output of the build from the output cache, if it is there - returns False if the template has to be rendered.
+        the overwrite options apply like in a build that renders. the post processors and the unfilled patterns were applied and collected,
+        when the output was stored. if the output is not in the cache, the build collects its target objects to store them afterwards
+        """
+        self.output_cache_objects = None
+        self.output_cache_fingerprint = fingerprint = self.get_output_cache_fingerprint()
+        if fingerprint is None:
+            return False
+        assert self.output_cache is not None
+        entry = self.output_cache.get(fingerprint)
+        self.emit_event('output_cache', fingerprint=fingerprint, hit=entry is not None)
+        if entry is None:
+            self.build_report.output_cache_misses += 1
+            self.output_cache_objects = list()
+            return False
+        self.build_report.output_cache_hits += 1
+        self.pattern_index = pattern_index.PatternIndex.from_dict(entry.details['pattern_index'])
+        for target_name, unfilled_patterns in entry.details['unfilled_patterns'].items():
+            self.build_report.add_unfilled_patterns(str(self.path_target_dir / target_name), unfilled_patterns)
+        for template_path, target_name, is_dir, no_overwrite in entry.objects:
+            started = time.perf_counter()
+            template_entry = template_walker.TemplateEntry(template_path, is_dir=is_dir, no_overwrite=no_overwrite)
+            path_cached_object = entry.get_path_object(target_name)
+            path_target_object = self.path_target_dir / target_name
+            if self.skip_overwrite(path_cached_object, path_target_object, no_overwrite=no_overwrite):
+                continue
+            if is_dir:
+                self.output_sink.make_dir(path_target_object, path_cached_object)
+                self.build_report.directories_created += 1
                 continue
+            if self.write_if_changed and self.output_sink.is_unchanged(path_target_object, path_cached_object.read_bytes()):
+                method = 'unchanged'
+            else:
+                method = self.output_sink.materialize_file(path_cached_object, path_target_object, 'reflink')
+            self.record_file(method, path_cached_object.stat().st_size, template_entry, path_target_object, started)
+        return True
+
+    def add_to_output_cache(self, template_entry: template_walker.TemplateEntry, path_target_object: pathlib.Path, written: bool = True) -> None:
+        """ collect a target object of a build which is not in the output cache - an object not written, or written outside, is not stored """
+        if self.output_cache_objects is None:
+            return
+        target_name = self.get_target_name(path_target_object)
+        if not written or os.path.isabs(target_name):
+            self.output_cache_objects = None
+            return
+        self.output_cache_objects.append([template_entry.path, target_name, template_entry.is_dir, template_entry.no_overwrite])
+
+    def store_output_cache(self) -> None:
+        """ store the output of a build which was not in the output cache, if the build wrote all its target objects """
+        if self.output_cache is None or self.output_cache_fingerprint is None or self.output_cache_objects is None:
+            return
+        unfilled_patterns = {self.get_target_name(pathlib.Path(target)): patterns for target, patterns in self.build_report.unfilled_patterns.items()}
+        details = {'unfilled_patterns': unfilled_patterns, 'pattern_index': self.pattern_index.as_dict()}
+        self.output_cache.put(self.output_cache_fingerprint, self.path_target_dir, self.output_cache_objects, details)
+        self.output_cache_objects = None
+
+    def skip_up_to_date(self, template_entry: template_walker.TemplateEntry, path_source_object: pathlib.Path) -> bool:
+        """
+        selective rebuild : skip a template file if the template file, the target file and the values of its pattern dependencies did not change -
+        a resumed build does that for the target files the interrupted build completed
+        """
+        resumed = template_entry.path in self.resumed_records
+        if not (self.selective_rebuild or resumed):
+            return False
+        record = self.previous_build_manifest.get_up_to_date_record(template_entry.path, path_source_object, self.get_resolving_patterns())
+        if record is None:
+            return False
+        if resumed:
+            self.build_report.files_resumed += 1
+        self.pattern_index.add_counts(template_entry.path, record['path_patterns'], record['content_patterns'])
+        self.build_manifest.add_record(template_entry.path, record)
+        self.build_report.add_file(method='up_to_date', size=record['target_stat'][0])
+        self.emit_event('file_skipped', template=template_entry.path, target=record['target'], reason='up to date')
+        return True
+
+    def record_target_file(self, template_entry: template_walker.TemplateEntry, path_source_object: pathlib.Path, path_target_object: pathlib.Path,
+                           path_counts: Dict[str, int], content_counts: Dict[str, int]) -> None:
+        """ record a written target file in the build manifest - with selective rebuild, the stale target of a renamed file is removed """
+        self.add_to_output_cache(template_entry, path_target_object)
+        if not self.uses_build_manifest():
+            return
+        previous_record = self.previous_build_manifest.files.get(template_entry.path)
+        if self.selective_rebuild and previous_record is not None and previous_record['target'] != str(path_target_object):
+            self.remove_stale_target(template_entry.path)
+        self.build_manifest.add_file(template_entry.path, path_source_object, path_target_object, self.get_resolving_patterns(), path_counts, content_counts)
+        if self.build_journal is not None:
+            self.build_journal.add_record(template_entry.path, self.build_manifest.files[template_entry.path])
+
+    def remove_stale_targets(self, template_paths_seen: Set[str]) -> None:
+        """ selective rebuild : remove the targets of template files which were removed from the template since the last build """
+        if self.path_filter is not None:
+            # a build of a subset of the template does not know which template files were removed
+            for template_path in self.previous_build_manifest.files:
+                if template_path not in template_paths_seen:
+                    self.keep_previous_record(template_path)
+            return
+        if not (self.selective_rebuild and self.uses_build_manifest()) or self.dry_run:
+            return
+        for template_path in self.previous_build_manifest.files:
+            if template_path not in template_paths_seen:
+                self.remove_stale_target(template_path)
+
+    def remove_stale_target(self, template_path: str) -> None:
+        path_stale_target = self.previous_build_manifest.files[template_path]['target']
+        if self.previous_build_manifest.remove_stale_target(template_path):
+            if isinstance(self.output_sink, output_sinks.FileSystemSink):
+                self.output_sink.target_snapshot.remove(pathlib.Path(path_stale_target))
+            self.build_report.files_removed += 1
+            self.diagnostics.add('stale_target_removed', logging.DEBUG, 'stale targets removed', 'stale target removed: "%s"', path_stale_target)
+        elif not self.quiet:
+            self.diagnostics.add('stale_target_changed', logging.WARNING, 'stale targets changed since the last build, not removed',
+                                 'stale target was changed since the last build, it is not removed: "%s"', path_stale_target)
+
+    def get_renderer(self) -> renderer.Renderer:
+        """ a renderer for the current patterns and options - during a build the patterns dont change, so the build creates it once """
+        return renderer.Renderer(self.conf.pizza_cutter_patterns, self.conf.pizza_cutter_options, resolve=self.get_pattern_value)
+
+    def render_template_file(self, path_source_file: pathlib.Path, content: Optional[bytes] = None) -> bytes:
+        """ returns the content of the template file with all patterns replaced, the content might be passed if it was read already """
+        with io.BytesIO() as f_target:
+            self.replace_patterns_in_file(path_source_file, f_target, content)
+            return f_target.getvalue()
+
+    def render_file(self, path_file: pathlib.Path) -> bytes:
+        """
+        what one file would look like if the project is cut again, without building : path_file is a template file, or the target file it renders to.
+        the first call runs the hooks and resolves the patterns, the first call with a target path maps the target paths to the template files -
+        from the manifest of the compiled template if there is one, without walking the template. the following calls only read and render the file.
+
+        >>> # Setup
+        >>> path_test_dir = pathlib.Path(__file__).parent.parent.resolve() / 'tests'
+        >>> path_template_dir = path_test_dir / 'pizzacutter_test_template_01'
+        >>> path_conf_file = path_template_dir / 'PizzaCutterTestConfig_01.py'
+        >>> path_target_dir = path_test_dir / 'pizzacutter_test_project_01'
+        >>> pizza_cutter = PizzaCutter(path_conf_file, path_template_dir, path_target_dir, quiet=True)
+        >>> path_expected_file = path_test_dir / 'pizzacutter_test_project_01_expected/pizzacutter_test_project/test01.txt'
+
+        >>> # Test by target path and by template path
+        >>> content = pizza_cutter.render_file(path_target_dir / 'pizzacutter_test_project/test01.txt')
+        >>> assert content == path_expected_file.read_bytes()
+        >>> assert pizza_cutter.render_file(path_template_dir / '{{TestPizzaCutter.project_dir}}/test01.txt') == content
+        >>> assert not path_target_dir.exists()
+
+        >>> # Test with a compiled template
+        >>> pizza_cutter = PizzaCutter(path_conf_file, path_template_dir, path_target_dir, quiet=True, compiled=pizza_cutter.compile_template())
+        >>> assert pizza_cutter.render_file(path_target_dir / 'pizzacutter_test_project/test01.txt') == content
+
+        >>> # Test unknown file
+        >>> pizza_cutter.render_file(path_target_dir / 'not_existing.txt')
+        Traceback (most recent call last):
+        ...
+        FileNotFoundError: "...not_existing.txt" is neither a file of the template, nor a target file of it
+
+        """
+        file_renderer = self.get_file_renderer()
+        path_source_file = self.get_path_source_file(pathlib.Path(path_file))
+        return file_renderer.render(path_source_file.read_bytes())
+
+    def get_file_renderer(self) -> renderer.Renderer:
+        """ the renderer for render_file() - the hooks are called and the patterns are resolved once, like at the start of a build """
+        if self.file_renderer is None:
+            self.prepare_patterns()
+            self.file_renderer = self.get_renderer()
+        return self.file_renderer
+
+    def get_frozen_renderer(self) -> renderer.FrozenRenderer:
+        """
+        an immutable renderer with the resolved values of all patterns, also the lazy ones - it renders content and template paths
+        from any number of threads without locks, for instance to render snippets in a web service. PizzaCutter itself is not thread safe.
+
+        >>> # Setup
+        >>> path_test_dir = pathlib.Path(__file__).parent.parent.resolve() / 'tests'
+        >>> path_template_dir = path_test_dir / 'pizzacutter_test_template_01'
+        >>> path_conf_file = path_template_dir / 'PizzaCutterTestConfig_01.py'
+        >>> path_target_dir = path_test_dir / 'pizzacutter_test_project_01'
+        >>> pizza_cutter = PizzaCutter(path_conf_file, path_template_dir, path_target_dir, quiet=True)
+        >>> template_path = '{{TestPizzaCutter.project_dir}}/test01.txt'
+
+        >>> # Test it renders like a build, from many threads
+        >>> import concurrent.futures
+        >>> frozen_renderer = pizza_cutter.get_frozen_renderer()
+        >>> content = (path_template_dir / template_path).read_bytes()
+        >>> with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+        ...     results = set(executor.map(frozen_renderer.render, [content] * 20))
+        >>> assert results == {pizza_cutter.render_file(path_template_dir / template_path)}
+        >>> frozen_renderer.render_path(template_path)
+        'pizzacutter_test_project/test01.txt'
+        >>> assert not path_target_dir.exists()
+
+        """
+        self.prepare_patterns()
+        return renderer.FrozenRenderer(self.conf.pizza_cutter_patterns, self.conf.pizza_cutter_options, resolve=self.get_pattern_value)
+
+    def prepare_patterns(self) -> None:
+        """ calls the hooks and resolves the patterns once, like at the start of a build - for rendering without a build """
+        if self.patterns_prepared:
+            return
+        self.call_hooks_before_build()
+        self.check_compiled_template()
+        self.start_lazy_patterns()
+        self.resolve_str_patterns()
+        self.patterns_prepared = True
+
+    def get_path_source_file(self, path_file: pathlib.Path) -> pathlib.Path:
+        """
+        the template file of a template or target path - the target paths are mapped again once, if a target is not found
+        or its template file was removed since : the map does not need to be checked against the template on every call
+        """
+        str_path_file = os.path.abspath(str(path_file))
+        for path_template_dir in self.path_template_dirs:
+            if helpers.path_startswith(pathlib.Path(str_path_file), path_template_dir.resolve()) and os.path.isfile(str_path_file):
+                return pathlib.Path(str_path_file)
+        template_entry = None if self.template_files_by_target is None else self.template_files_by_target.get(str_path_file)
+        if template_entry is None or not self.get_path_source_object(template_entry).is_file():
+            self.template_files_by_target = self.get_template_files_by_target()
+            template_entry = self.template_files_by_target.get(str_path_file)
+        if template_entry is None:
+            raise FileNotFoundError(f'"{path_file}" is neither a file of the template, nor a target file of it')
+        return self.get_path_source_object(template_entry)
+
+    def get_template_files_by_target(self) -> Dict[str, template_walker.TemplateEntry]:
+        """ the template files by their absolute target path - the target paths are resolved from the path patterns, the files are not read """
+        template_files_by_target: Dict[str, template_walker.TemplateEntry] = dict()
+        for template_entry in self.iter_template_entries(selected=False):
+            if not template_entry.is_dir:
+                path_target_file = self.get_path_target_object(self.get_path_source_object(template_entry))
+                template_files_by_target[os.path.abspath(str(path_target_file))] = template_entry
+        self.diagnostics.emit()
+        return template_files_by_target
+
+    def get_verbatim(self, template_entry: template_walker.TemplateEntry, path_source_object: pathlib.Path, content: bytes) -> bool:
+        """ is the file verbatim - taken from the compiled template if the file did not change since, otherwise the content is checked """
+        if self.compiled_template is not None:
+            verbatim = self.compiled_template.get_verbatim(template_entry.path, path_source_object)
+            if verbatim is not None:
+                return verbatim
+        return self.is_verbatim(path_source_object, content)
+
+    def is_verbatim(self, path_source_object: pathlib.Path, content: bytes) -> bool:
+        """
+        a verbatim file has no pattern in the content and only string patterns in the path, it can be cloned or linked
+
+        >>> # Setup
+        >>> path_test_dir = pathlib.Path(__file__).parent.parent / 'tests'
+        >>> path_template_dir = path_test_dir / 'pizzacutter_test_template_02'
+        >>> path_conf_file = path_template_dir / 'PizzaCutterTestConfig_02.py'
+        >>> pizza_cutter = PizzaCutter(path_conf_file, path_template_dir, path_test_dir / 'pizzacutter_test_project_02')
 
-            if path_target_object.is_file():
-                path_target_patterns_replaced = path_target_object.append_suffix('.PizzaCutter_Temp')
-                with open(str(path_target_patterns_replaced), 'wb') as f_target:
-                    self.replace_patterns_in_file(path_target_object, f_target)
-                path_target_object.unlink()
-                path_target_patterns_replaced.rename(path_target_object)
+        >>> # Test
+        >>> path_source_file = path_template_dir / '{{TestPizzaCutter.project_dir}}/test.txt'
+        >>> pizza_cutter.is_verbatim(path_source_file, b'no pattern')
+        True
+        >>> pizza_cutter.is_verbatim(path_source_file, b'{{unknown pattern}}')
+        True
+        >>> pizza_cutter.is_verbatim(path_source_file, b'{{TestPizzaCutter.doctest}}')
+        False
+        >>> pizza_cutter.is_verbatim(path_source_file, b'{{TestPizzaCutter.option.delete_line_if_empty}}')
+        False
+        >>> pizza_cutter.is_verbatim(path_template_dir / '{{TestPizzaCutter.outside_target_dir}}/test.txt', b'no pattern')
+        False
+
+        """
+        str_path = str(path_source_object.relative_to(self.get_path_template_dir(path_source_object)))
+        for pattern in self.conf.pizza_cutter_patterns.keys():
+            if pattern in str_path and not isinstance(self.get_pattern_value(pattern), str):
+                return False
 
-    def replace_patterns_in_file(self, path_source_file: pathlib.Path, f_target: BinaryIO) -> None:
+        # patterns are only replaced on lines with '{{'
+        if b'{{' not in content:
+            return True
+
+        for pattern in list(self.conf.pizza_cutter_patterns.keys()) + list(self.conf.pizza_cutter_options.values()):
+            if pattern.encode('utf-8') in content:
+                return False
+        return True
+
+    def replace_patterns_in_file(self, path_source_file: pathlib.Path, f_target: BinaryIO, content: Optional[bytes] = None) -> None:
         """
-        replace all the patterns in the source file
+        replace all the patterns in the source file - the content of the source file might be passed if it was read already
         it is already prepared for the function that You can include the content of other files into one file -
         we don't know if we will ever finish that idea, because we simply can make that replacement in the config file
         """
@@ -151,30 +1020,18 @@ class PizzaCutter(object):
         # this is in preparation for the function if we can include the content of files into other files
         # because on included files you need to make all replacements before
 
-        with open(str(path_source_file), 'rb') as f_source:
-            source_line = f_source.readline()
-            while source_line:
-                self.replace_patterns_in_source_line_and_write_to_target_file(path_source_file, source_line, f_target)
-                source_line = f_source.readline()
+        with (open(str(path_source_file), 'rb') if content is None else io.BytesIO(content)) as f_source:
+            self.get_renderer().render_stream(f_source, f_target)
 
         self.file_stack.pop()
 
     def replace_patterns_in_source_line_and_write_to_target_file(self, path_source_file: pathlib.Path, source_line: bytes, f_target: BinaryIO) -> None:
-        if b'{{' in source_line:
-            source_line = self.replace_str_patterns_in_line(source_line)
-            source_line = self.replace_pathlib_patterns_in_line(path_source_file, source_line, f_target)
-            source_line = self.replace_option_patterns_in_line(source_line)
-        f_target.write(source_line)
+        f_target.write(self.get_renderer().render_line(source_line))
 
     def replace_pathlib_patterns_in_line(self, path_source_file: pathlib.Path, source_line: bytes, f_target: BinaryIO) -> bytes:
         # not implemented now - You can solve it in the config file just to read the files there
         # a pathlib pattern is replaced with the str() of the pathlib replacement
-        for pattern in self.conf.pizza_cutter_patterns.keys():
-            replacement = self.conf.pizza_cutter_patterns[pattern]
-            if not isinstance(replacement, str):
-                replacement = str(replacement)
-                source_line = source_line.replace(pattern.encode('utf-8'), replacement.encode('utf-8'))
-        return source_line
+        return self.get_renderer().replace_pathlib_patterns_in_line(source_line)
 
     def replace_str_patterns_in_line(self, source_line: bytes) -> bytes:
         """
@@ -198,13 +1055,7 @@ class PizzaCutter(object):
         b'this is a test in doctest'
 
         """
-
-        for pattern in self.conf.pizza_cutter_patterns.keys():
-            replacement = self.conf.pizza_cutter_patterns[pattern]
-            if isinstance(replacement, str):
-                source_line = source_line.replace(pattern.encode('utf-8'), replacement.encode('utf-8'))
-
-        return source_line
+        return self.get_renderer().replace_str_patterns_in_line(source_line)
 
     def resolve_str_patterns(self) -> None:
         """
@@ -265,17 +1116,108 @@ class PizzaCutter(object):
 
         self.pattern_stack.append(pattern)
 
-        replacement = str(self.conf.pizza_cutter_patterns[pattern])
+        replacement = str(self.evaluate_pattern(pattern))
         for sub_pattern in self.conf.pizza_cutter_patterns.keys():
             if sub_pattern in replacement:
                 sub_replacement = self.resolve_str_patterns_recursive(sub_pattern)
                 replacement = replacement.replace(sub_pattern, sub_replacement)
-                self.conf.pizza_cutter_patterns[pattern] = replacement
+                if lazy_patterns.is_lazy(self.conf.pizza_cutter_patterns[pattern]):
+                    self.lazy_values[pattern] = replacement
+                else:
+                    self.conf.pizza_cutter_patterns[pattern] = replacement
 
         self.pattern_stack.pop()
 
         return replacement
 
+    def start_lazy_patterns(self) -> None:
+        """ the lazy patterns are computed again in every build - or taken from the pattern cache, if their input files did not change """
+        self.lazy_values = dict()
+        if self.uses_build_state():
+            self.pattern_cache = lazy_patterns.PatternCache.load(self.path_state_dir / lazy_patterns.PATTERN_CACHE_FILENAME)
+        else:
+            self.pattern_cache = lazy_patterns.PatternCache()
+
+    def evaluate_pattern(self, pattern: str) -> Union[str, pathlib.Path]:
+        """ the value of a pattern, a lazy value is computed once per build, when it is needed the first time - its patterns are not resolved """
+        replacement = self.conf.pizza_cutter_patterns[pattern]
+        lazy_pattern = lazy_patterns.get_lazy_pattern(replacement)
+        if lazy_pattern is None:
+            return replacement      # type: ignore
+        if pattern in self.lazy_values:
+            return self.lazy_values[pattern]
+
+        value = self.pattern_cache.get(pattern, lazy_pattern)
+        if value is None:
+            value = lazy_pattern.compute()
+            if isinstance(value, os.PathLike):
+                value = pathlib.Path(value)
+            elif not isinstance(value, str):
+                value = str(value)
+            self.pattern_cache.put(pattern, lazy_pattern, value)
+            self.build_report.lazy_patterns_computed += 1
+            logger.debug(f'lazy pattern computed: "{pattern}"')
+        else:
+            self.build_report.lazy_patterns_cached += 1
+        self.lazy_values[pattern] = value
+        self.resource_limits.check_pattern_sizes({pattern: value})
+        self.pattern_index.add_pattern_references({pattern: value})
+        return value
+
+    def get_pattern_value(self, pattern: str) -> Union[str, pathlib.Path]:
+        """
+        the resolved value of a pattern - lazy values are only computed here, when a path, a line or another pattern refers to them
+
+        >>> # Setup
+        >>> path_test_dir = pathlib.Path(__file__).parent.parent.resolve() / 'tests'
+        >>> path_template_dir = path_test_dir / 'pizzacutter_test_template_01'
+        >>> path_conf_file = path_template_dir / 'PizzaCutterTestConfig_01.py'
+        >>> path_target_dir = path_test_dir / 'pizzacutter_test_project_01'
+        >>> path_state_dir = path_test_dir / 'pizzacutter_test_state_01'
+        >>> computed = list()
+        >>> def compute_version():
+        ...     computed.append('version')
+        ...     return '{{TestPizzaCutter.doctest}} 1.0'
+        >>> def compute_unused():
+        ...     computed.append('unused')
+        ...     return 'unused'
+        >>> pizza_cutter = PizzaCutter(path_conf_file, path_template_dir, path_target_dir, quiet=True, path_state_dir=path_state_dir)
+        >>> pizza_cutter.conf.pizza_cutter_patterns['{{TestPizzaCutter.doctest}}'] = 'doctest'
+        >>> pizza_cutter.conf.pizza_cutter_patterns['{{TestPizzaCutter.version}}'] = lazy_patterns.LazyPattern(compute_version, [path_conf_file])
+        >>> pizza_cutter.conf.pizza_cutter_patterns['{{TestPizzaCutter.unused}}'] = compute_unused
+
+        >>> # Test only the referenced lazy pattern is computed, once
+        >>> pizza_cutter.start_lazy_patterns()
+        >>> pizza_cutter.get_renderer().render(b'{{TestPizzaCutter.version}}, {{TestPizzaCutter.version}}')
+        b'doctest 1.0, doctest 1.0'
+        >>> pizza_cutter.get_pattern_value('{{TestPizzaCutter.version}}')
+        'doctest 1.0'
+        >>> computed
+        ['version']
+
+        >>> # Test the value is taken from the pattern cache in the next build, if the input files did not change
+        >>> pizza_cutter.pattern_cache.save(path_state_dir / lazy_patterns.PATTERN_CACHE_FILENAME)
+        >>> pizza_cutter.start_lazy_patterns()
+        >>> pizza_cutter.get_pattern_value('{{TestPizzaCutter.version}}')
+        'doctest 1.0'
+        >>> computed, pizza_cutter.build_report.lazy_patterns_cached
+        (['version'], 1)
+
+        >>> # Teardown
+        >>> path_state_dir.rmtree(ignore_errors=True)
+
+        """
+        replacement = self.conf.pizza_cutter_patterns[pattern]
+        if not lazy_patterns.is_lazy(replacement):
+            return replacement      # type: ignore
+        if pattern not in self.lazy_values and isinstance(self.evaluate_pattern(pattern), str):
+            self.resolve_str_patterns_recursive(pattern)
+        return self.lazy_values[pattern]
+
+    def get_resolving_patterns(self) -> lazy_patterns.ResolvingPatterns:
+        """ the patterns for code which looks up single patterns - lazy values are computed when they are looked up """
+        return lazy_patterns.ResolvingPatterns(self.conf.pizza_cutter_patterns, self.get_pattern_value)
+
     def replace_option_patterns_in_line(self, source_line: bytes) -> bytes:
         """
 
@@ -317,18 +1259,12 @@ class PizzaCutter(object):
 
 
         """
-        for option in self.conf.pizza_cutter_options.keys():
-            pattern = self.conf.pizza_cutter_options[option]
-            pattern_bytes = pattern.encode('utf-8')
-            if pattern_bytes in source_line:
-                source_line = source_line.replace(pattern_bytes, b'')
-                if option == 'delete_line_if_empty' and source_line.strip() == b'':
-                    source_line = b''
-        return source_line
+        return self.get_renderer().replace_option_patterns_in_line(source_line)
 
     def copy_files_from_template_to_project(self) -> None:
         """
-        Builds or rebuilds a project
+        Builds or rebuilds a project - each template object is rendered and written exactly once into the output sink.
+        unfilled patterns are logged on the rendered content, so that works also with dry_run and with sinks we can not read back.
 
         >>> # Setup
         >>> my_logger=logging.getLogger()
@@ -340,15 +1276,17 @@ class PizzaCutter(object):
         >>> path_conf_file = path_template_dir / 'PizzaCutterTestConfig_01.py'
         >>> path_expected_folder = path_test_dir / 'pizzacutter_test_project_01_expected'
         >>> path_target_dir = path_test_dir / 'pizzacutter_test_project_01'
-        >>> pizza_cutter = PizzaCutter(path_conf_file, path_template_dir, path_target_dir)
+        >>> path_state_dir = path_test_dir / 'pizzacutter_test_state_01'
+        >>> pizza_cutter = PizzaCutter(path_conf_file, path_template_dir, path_target_dir, path_state_dir=path_state_dir)
 
-        >>> pizza_cutter = PizzaCutter(path_conf_file, path_template_dir, path_target_dir)
+        >>> pizza_cutter = PizzaCutter(path_conf_file, path_template_dir, path_target_dir, path_state_dir=path_state_dir)
         >>> path_target_dir.rmtree(ignore_errors=True)
 
         >>> # Test Create Files
         >>> pizza_cutter = PizzaCutter(path_conf_file=path_conf_file, \
                                        path_template_dir=path_template_dir, \
                                        path_target_dir=path_target_dir, \
+                                       path_state_dir=path_state_dir, \
                                        dry_run= False)
         >>> pizza_cutter.copy_files_from_template_to_project()
         >>> assert len(list(path_expected_folder.glob('./**/*'))) == len(list(path_target_dir.glob('./**/*')))
@@ -360,33 +1298,404 @@ class PizzaCutter(object):
         >>> # Teardown
         >>> path_target_dir.rmtree(ignore_errors=True)
 
+        >>> # Test Create Files in Memory
+        >>> memory_sink = output_sinks.MemorySink()
+        >>> pizza_cutter = PizzaCutter(path_conf_file=path_conf_file, \
+                                       path_template_dir=path_template_dir, \
+                                       path_target_dir=path_target_dir, \
+                                       path_state_dir=path_state_dir, \
+                                       output_sink=memory_sink)
+        >>> _ = pizza_cutter.build()
+        >>> assert len(list(path_expected_folder.glob('./**/*'))) == len(memory_sink.files) + len(memory_sink.directories)
+        >>> assert not path_target_dir.exists()
+
+        >>> # Test materialize verbatim files with reflinks, falls back to copy if not supported
+        >>> pizza_cutter = PizzaCutter(path_conf_file=path_conf_file, \
+                                       path_template_dir=path_template_dir, \
+                                       path_target_dir=path_target_dir, \
+                                       path_state_dir=path_state_dir, \
+                                       materialize='reflink')
+        >>> report = pizza_cutter.build()
+        >>> assert report.files_rendered == 0
+        >>> assert report.files_cloned + report.files_copied == 9
+        >>> assert len(list(path_expected_folder.glob('./**/*'))) == len(list(path_target_dir.glob('./**/*')))
+
+        >>> # Test write_if_changed - a rebuild of an unchanged project performs no writes
+        >>> pizza_cutter = PizzaCutter(path_conf_file=path_conf_file, \
+                                       path_template_dir=path_template_dir, \
+                                       path_target_dir=path_target_dir, \
+                                       path_state_dir=path_state_dir, \
+                                       allow_overwrite=True, \
+                                       write_if_changed=True)
+        >>> report = pizza_cutter.build()
+        >>> assert report.files_unchanged == 3
+        >>> assert report.files_rendered + report.files_cloned + report.files_linked + report.files_copied == 0
+
+        >>> # Teardown
+        >>> path_target_dir.rmtree(ignore_errors=True)
+
+        >>> # Test oversized files are rendered in a stream, to the same result
+        >>> pizza_cutter = PizzaCutter(path_conf_file, path_template_dir, path_target_dir, quiet=True, path_state_dir=path_state_dir, max_render_size=1)
+        >>> report = pizza_cutter.build()
+        >>> assert report.files_streamed == len(report.oversize_decisions) > 0 and report.files_rendered == 0
+        >>> assert len(list(path_expected_folder.glob('./**/*'))) == len(list(path_target_dir.glob('./**/*')))
+        >>> path_target_dir.rmtree(ignore_errors=True)
+
+        >>> # Test oversized files are copied verbatim
+        >>> pizza_cutter = PizzaCutter(path_conf_file, path_template_dir, path_target_dir, quiet=True, path_state_dir=path_state_dir, max_render_size=1,
+        ...                            oversize_action='copy')
+        >>> report = pizza_cutter.build()
+        >>> assert report.files_copied == len(report.oversize_decisions) > 0 and report.files_streamed == 0
+        >>> assert set(report.oversize_decisions.values()) == {'copy'}
+
+        >>> # Teardown
+        >>> path_target_dir.rmtree(ignore_errors=True)
+
+        >>> # Test post processors - in memory before the files are written, and on the written files
+        >>> files_written = list()
+        >>> def add_marker(batch):
+        ...     for post_process_file in batch:
+        ...         post_process_file.content += b'# processed'
+        >>> def record_written(batch):
+        ...     files_written.extend(post_process_file.path_target_file for post_process_file in batch)
+        >>> pizza_cutter = PizzaCutter(path_conf_file, path_template_dir, path_target_dir, quiet=True, path_state_dir=path_state_dir)
+        >>> pizza_cutter.conf.pizza_cutter_post_processors = [
+        ...     post_processing.PostProcessor('add_marker', ['*/test01.txt'], add_marker, in_memory=True, batch_size=2),
+        ...     post_processing.PostProcessor('record_written', ['*'], record_written, depends_on=[])]
+        >>> report = pizza_cutter.build()
+        >>> assert all(path.read_bytes().endswith(b'# processed') for path in path_target_dir.glob('**/test01.txt'))
+        >>> assert not any(path.read_bytes().endswith(b'# processed') for path in path_target_dir.glob('**/test02.txt'))
+        >>> assert all(path.is_file() for path in files_written) and len(files_written) == report.files_rendered + report.files_copied
+        >>> assert report.files_post_processed == len(files_written) + len(list(path_target_dir.glob('**/test01.txt')))
+
+        >>> # Teardown
+        >>> path_target_dir.rmtree(ignore_errors=True)
+        >>> path_state_dir.rmtree(ignore_errors=True)
+
+        >>> # Test selective rebuild - only the files depending on a changed pattern value are rendered
+        >>> path_template_dir = path_test_dir / 'pizzacutter_test_template_02'
+        >>> path_conf_file = path_template_dir / 'PizzaCutterTestConfig_02.py'
+        >>> path_target_dir = path_test_dir / 'pizzacutter_test_project_02'
+        >>> path_state_dir = path_test_dir / 'pizzacutter_test_state_02'
+        >>> pizza_cutter = PizzaCutter(path_conf_file, path_template_dir, path_target_dir, quiet=True, path_state_dir=path_state_dir, \
+                                       allow_overwrite=True, selective_rebuild=True)
+        >>> report = pizza_cutter.build()
+        >>> assert report.files_up_to_date == 0
+        >>> report = pizza_cutter.build()
+        >>> assert report.files_up_to_date > 0 and report.files_rendered + report.files_copied == 0
+
+        >>> # a changed path pattern renames the target, the stale target is removed
+        >>> pizza_cutter.conf.pizza_cutter_patterns['{{TestPizzaCutter.project_dir}}'] = 'renamed_project_dir'
+        >>> report = pizza_cutter.build()
+        >>> assert report.files_removed == report.files_rendered + report.files_copied > 0
+        >>> assert not list((path_target_dir / 'pizzacutter_test_project').glob('**/*.*'))
+
+        >>> # Teardown
+        >>> path_target_dir.rmtree(ignore_errors=True)
+        >>> path_state_dir.rmtree(ignore_errors=True)
 
         """
-        path_source_objects = self.get_path_template_objects()
+        template_paths_seen: Set[str] = set()
+        template_renderer = self.get_renderer()
+        self.start_post_processing()
+        for template_entry in self.iter_template_entries():
+
+            started = time.perf_counter()
+            path_source_object = self.get_path_source_object(template_entry)
+            if not template_entry.is_dir:
+                template_paths_seen.add(template_entry.path)
+                if not sharding.in_shard(template_entry.path, self.shard):
+                    self.keep_previous_record(template_entry.path)
+                    continue
+                if self.layer_confs:
+                    self.build_report.file_layers[template_entry.path] = str(self.path_template_dirs[template_entry.layer])
+                if self.skip_up_to_date(template_entry, path_source_object):
+                    continue
 
-        for path_source_object in path_source_objects:
+            # files which are too big to be rendered in memory are streamed or copied verbatim
+            render_mode = 'memory' if template_entry.is_dir else self.resource_limits.get_render_mode(path_source_object.stat().st_size)
 
+            # the template content is indexed also for objects which are skipped, the index describes the whole template
+            content = b''
+            if render_mode == 'memory':
+                content = b'' if template_entry.is_dir else path_source_object.read_bytes()
+                path_counts, content_counts = self.pattern_index.add_template_object(template_entry.path, content)
+            else:
+                with open(str(path_source_object), 'rb') as f_source:
+                    path_counts, content_counts = self.pattern_index.add_template_stream(template_entry.path, f_source, resource_limits.STREAM_LINE_LIMIT)
             path_target_object_resolved = self.get_path_target_object(path_source_object=path_source_object)
 
-            if self.do_not_copy(path_source_object):
+            if self.skip_write_outside_project_folder(path_target_object_resolved):
+                self.emit_event('file_skipped', template=template_entry.path, target=str(path_target_object_resolved), reason='outside project directory')
                 continue
 
-            if self.skip_write_outside_project_folder(path_target_object_resolved):
+            self.log_unfilled_patterns_in_path(path_target_object_resolved)
+            self.remove_interrupted_target(template_entry, path_target_object_resolved)
+
+            if self.skip_overwrite(path_source_object, path_target_object_resolved, no_overwrite=template_entry.no_overwrite):
+                self.emit_event('file_skipped', template=template_entry.path, target=str(path_target_object_resolved), reason='no overwrite')
+                # an existing directory is still part of the output, a file which was not overwritten is not
+                self.add_to_output_cache(template_entry, path_target_object_resolved, written=template_entry.is_dir)
+                continue
+
+            if template_entry.is_dir:
+                if not self.dry_run:
+                    self.output_sink.make_dir(path_target_object_resolved, path_source_object)
+                    self.add_to_output_cache(template_entry, path_target_object_resolved)
+                    # every shard creates the directories it might need, but only one of them counts it
+                    if sharding.in_shard(template_entry.path, self.shard):
+                        self.build_report.directories_created += 1
                 continue
 
-            if self.skip_overwrite(path_source_object, path_target_object_resolved):
+            if render_mode != 'memory':
+                self.build_report.oversize_decisions[template_entry.path] = render_mode
+                self.write_oversized_file(template_renderer, template_entry, path_source_object, path_target_object_resolved, render_mode, started)
+                if not self.dry_run:
+                    self.target_file_written(template_entry, path_source_object, path_target_object_resolved, path_counts, content_counts)
                 continue
 
+            verbatim = self.materialize != 'copy' and self.get_verbatim(template_entry, path_source_object, content)
+            if not verbatim:
+                content = template_renderer.render(content)
+            self.log_unfilled_patterns_in_content(content, path_target_object_resolved)
+
             if self.dry_run:
                 continue
 
-            if path_source_object.is_dir():
-                path_target_object_resolved.mkdir(parents=True, exist_ok=True)
-            else:
-                path_target_object_resolved.parent.mkdir(parents=True, exist_ok=True)
-                # because sometimes we receive "permission denied" when overwriting the file (weired)
-                path_target_object_resolved.unlink(missing_ok=True)
-                path_source_object.copy2(path_target_object_resolved)
+            if self.post_processing is not None and self.post_processing.wants_content(self.get_target_name(path_target_object_resolved)):
+                self.add_pending_target_file(template_entry, path_source_object, path_target_object_resolved, content, path_counts, content_counts, started)
+                continue
+
+            self.write_target_file(template_entry, path_source_object, path_target_object_resolved, content, verbatim, path_counts, content_counts, started)
+
+        self.finish_post_processing()
+        self.remove_stale_targets(template_paths_seen)
+
+    def replace_patterns_in_files(self) -> None:
+        """
+        deprecated : copy_files_from_template_to_project() renders each file when it is written, in one pass -
+        there is nothing left to replace in the target files afterwards, so that does nothing anymore
+
+        >>> # Setup
+        >>> import warnings
+        >>> path_test_dir = pathlib.Path(__file__).parent.parent.resolve() / 'tests'
+        >>> path_template_dir = path_test_dir / 'pizzacutter_test_template_01'
+        >>> path_target_dir = path_test_dir / 'pizzacutter_test_project_01'
+        >>> pizza_cutter = PizzaCutter(path_template_dir / 'PizzaCutterTestConfig_01.py', path_template_dir, path_target_dir, quiet=True)
+
+        >>> # Test
+        >>> with warnings.catch_warnings(record=True) as caught_warnings:
+        ...     warnings.simplefilter('always')
+        ...     pizza_cutter.replace_patterns_in_files()
+        >>> caught_warnings[0].category.__name__
+        'DeprecationWarning'
+
+        """
+        warnings.warn('replace_patterns_in_files() is deprecated, the patterns are replaced by copy_files_from_template_to_project()',
+                      DeprecationWarning, stacklevel=2)
+
+    def log_unfilled_patterns(self) -> None:
+        """
+        deprecated : copy_files_from_template_to_project() logs the unfilled patterns on the rendered content, when it writes the files.
+        that logs the unfilled patterns of the target objects written already, like before
+
+        >>> # Setup
+        >>> import warnings
+        >>> path_test_dir = pathlib.Path(__file__).parent.parent.resolve() / 'tests'
+        >>> path_template_dir = path_test_dir / 'pizzacutter_test_template_01'
+        >>> path_target_dir = path_test_dir / 'pizzacutter_test_project_01'
+        >>> path_state_dir = path_test_dir / 'pizzacutter_test_state_01'
+        >>> pizza_cutter = PizzaCutter(path_template_dir / 'PizzaCutterTestConfig_01.py', path_template_dir, path_target_dir, quiet=True,
+        ...                            path_state_dir=path_state_dir)
+        >>> _ = pizza_cutter.build()
+
+        >>> # Test
+        >>> with warnings.catch_warnings(record=True) as caught_warnings:
+        ...     warnings.simplefilter('always')
+        ...     pizza_cutter.log_unfilled_patterns()
+        >>> caught_warnings[0].category.__name__
+        'DeprecationWarning'
+
+        >>> # Teardown
+        >>> path_target_dir.rmtree(ignore_errors=True)
+        >>> path_state_dir.rmtree(ignore_errors=True)
+
+        """
+        warnings.warn('log_unfilled_patterns() is deprecated, the unfilled patterns are logged by copy_files_from_template_to_project()',
+                      DeprecationWarning, stacklevel=2)
+        for path_source_object in self.get_path_template_objects():
+            path_target_object = self.get_path_target_object(path_source_object=path_source_object)
+            if self.do_not_copy(path_source_object) or self.skip_write_outside_project_folder(path_target_object, quiet=True):
+                continue
+            self.log_unfilled_patterns_in_path(path_target_object)
+            self.log_unfilled_pattern_in_object(path_target_object)
+        self.diagnostics.emit()
+
+    def keep_previous_record(self, template_path: str) -> None:
+        """
+        a sharded build keeps the build manifest records of the files of the other shards, a filtered build those of the objects it did not select -
+        so the next build still knows their targets
+        """
+        record = self.previous_build_manifest.files.get(template_path)
+        if record is not None:
+            self.build_manifest.add_record(template_path, record)
+
+    def write_target_file(self, template_entry: template_walker.TemplateEntry, path_source_object: pathlib.Path, path_target_object: pathlib.Path,
+                          content: bytes, verbatim: bool, path_counts: Dict[str, int], content_counts: Dict[str, int], started: float) -> None:
+        """ write a rendered file into the output sink, or materialize a verbatim file """
+        if self.write_if_changed and self.output_sink.is_unchanged(path_target_object, content):
+            self.record_file('unchanged', len(content), template_entry, path_target_object, started)
+            self.record_target_file(template_entry, path_source_object, path_target_object, path_counts, content_counts)
+            return
+        if self.uses_content_store(path_target_object):
+            method = self.store_target_file(path_source_object, path_target_object, content)
+        elif verbatim:
+            method = self.output_sink.materialize_file(path_source_object, path_target_object, self.materialize)
+        else:
+            self.output_sink.write_file(path_target_object, content, path_source_object)
+            method = 'render'
+        self.record_file(method, len(content), template_entry, path_target_object, started)
+        self.target_file_written(template_entry, path_source_object, path_target_object, path_counts, content_counts)
+
+    def uses_content_store(self, path_target_object: pathlib.Path) -> bool:
+        """ the content store is only used with the filesystem sink, and not for files the post processors on disk change in place """
+        if self.content_store is None or not isinstance(self.output_sink, output_sinks.FileSystemSink):
+            return False
+        return self.post_processing is None or not self.post_processing.wants_file(self.get_target_name(path_target_object))
+
+    def store_target_file(self, path_source_object: pathlib.Path, path_target_object: pathlib.Path, content: bytes) -> str:
+        """ put the content into the content store, if it is not there already, and materialize the target from there - returns the method used """
+        assert self.content_store is not None and isinstance(self.output_sink, output_sinks.FileSystemSink)
+        executable = bool(path_source_object.stat().st_mode & stat.S_IXUSR)
+        object_name, written = self.content_store.put(content, executable=executable)
+        if written:
+            self.build_report.store_objects_written += 1
+            self.build_report.store_bytes_written += len(content)
+        else:
+            self.build_report.store_objects_reused += 1
+        method = self.content_store.link_file(object_name, path_target_object, path_source_object)
+        self.output_sink.target_snapshot.add(path_target_object)
+        return method
+
+    def get_target_name(self, path_target_object: pathlib.Path) -> str:
+        return post_processing.get_target_name(path_target_object, self.path_target_dir)
+
+    def start_post_processing(self) -> None:
+        """ set up the post processors of the conf file - they dont run on dry_run, the processors on disk only with the filesystem sink """
+        self.post_processing = None
+        self.pending_target_files = list()
+        self.post_processed_records = list()
+        post_processors = list(self.conf.pizza_cutter_post_processors)
+        if self.dry_run or not post_processors:
+            return
+        if not isinstance(self.output_sink, output_sinks.FileSystemSink):
+            on_disk_processors = [post_processor.name for post_processor in post_processors if not post_processor.in_memory]
+            if on_disk_processors and not self.quiet:
+                logger.warning(f'post processors on the written files need the filesystem sink, they are skipped: {", ".join(on_disk_processors)}')
+            post_processors = [post_processor for post_processor in post_processors if post_processor.in_memory]
+        if post_processors:
+            self.post_processing = post_processing.PostProcessing(post_processors)
+
+    def add_pending_target_file(self, template_entry: template_walker.TemplateEntry, path_source_object: pathlib.Path, path_target_object: pathlib.Path,
+                                content: bytes, path_counts: Dict[str, int], content_counts: Dict[str, int], started: float) -> None:
+        """ a rendered file for the post processors in memory - it is written when the batch is full """
+        assert self.post_processing is not None
+        post_process_file = post_processing.PostProcessFile(path_target_object, self.get_target_name(path_target_object), content)
+        self.pending_target_files.append((post_process_file, template_entry, path_source_object, path_counts, content_counts, started))
+        if len(self.pending_target_files) >= self.post_processing.in_memory_batch_size:
+            self.write_pending_target_files()
+
+    def write_pending_target_files(self) -> None:
+        if self.post_processing is None or not self.pending_target_files:
+            return
+        pending_target_files, self.pending_target_files = self.pending_target_files, list()
+        self.post_processing.process_in_memory([pending_target_file[0] for pending_target_file in pending_target_files])
+        for post_process_file, template_entry, path_source_object, path_counts, content_counts, started in pending_target_files:
+            self.write_target_file(template_entry, path_source_object, post_process_file.path_target_file, post_process_file.content or b'',
+                                   False, path_counts, content_counts, started)
+
+    def target_file_written(self, template_entry: template_walker.TemplateEntry, path_source_object: pathlib.Path, path_target_object: pathlib.Path,
+                            path_counts: Dict[str, int], content_counts: Dict[str, int]) -> None:
+        """ hand a written file to the post processors on disk, and record it in the build manifest when it is final """
+        if self.post_processing is not None:
+            target_name = self.get_target_name(path_target_object)
+            if self.post_processing.wants_file(target_name):
+                self.post_processing.add_written_file(post_processing.PostProcessFile(path_target_object, target_name))
+                self.post_processed_records.append((template_entry, path_source_object, path_target_object, path_counts, content_counts))
+                return
+        self.record_target_file(template_entry, path_source_object, path_target_object, path_counts, content_counts)
+
+    def finish_post_processing(self) -> None:
+        """ write the files still waiting for the post processors in memory, wait for the post processors on disk, then record their files """
+        if self.post_processing is None:
+            return
+        self.write_pending_target_files()
+        self.post_processing.finish()
+        self.build_report.files_post_processed = self.post_processing.files_processed
+        for post_processed_record in self.post_processed_records:
+            self.record_target_file(*post_processed_record)
+        self.post_processed_records = list()
+
+    def write_oversized_file(self, template_renderer: renderer.Renderer, template_entry: template_walker.TemplateEntry, path_source_file: pathlib.Path,
+                             path_target_file: pathlib.Path, render_mode: str, started: float) -> None:
+        """
+        write a file which is too big to be rendered in memory - 'stream' renders it line by line into the output sink,
+        'copy' materializes it verbatim, without replacing the patterns. write_if_changed is not applied to oversized files.
+        """
+        if render_mode == 'copy':
+            if not self.quiet:
+                self.diagnostics.add('oversized_copied', logging.WARNING, 'oversized files copied verbatim, the patterns in the content are not replaced',
+                                     'oversized file is copied verbatim, the patterns in the content are not replaced: "%s"', path_source_file)
+            if not self.dry_run:
+                method = self.output_sink.materialize_file(path_source_file, path_target_file, self.materialize)
+                self.record_file(method, path_source_file.stat().st_size, template_entry, path_target_file, started)
+            return
+
+        pattern_excerpts: List[bytes] = list()
+
+        def write_content(f_target: BinaryIO) -> None:
+            with open(str(path_source_file), 'rb') as f_source:
+                for target_line in template_renderer.iter_render_stream(f_source, resource_limits.STREAM_LINE_LIMIT):
+                    f_target.write(target_line)
+                    resource_limits.add_pattern_excerpts(target_line, pattern_excerpts)
+
+        if self.dry_run:
+            # render anyway, to find the unfilled patterns
+            with open(os.devnull, 'wb') as f_null:
+                write_content(f_null)
+        else:
+            size = self.output_sink.write_file_streamed(path_target_file, write_content, path_source_file)
+            self.record_file('stream', size, template_entry, path_target_file, started)
+        self.log_unfilled_patterns_in_content(b'\n'.join(pattern_excerpts), path_target_file)
+
+    def record_file(self, method: str, size: int, template_entry: template_walker.TemplateEntry, path_target_file: pathlib.Path, started: float) -> None:
+        """ count a written file in the build report - and in the metrics and the event stream, if they are enabled """
+        self.build_report.add_file(method=method, size=size)
+        if self.build_metrics is None and self.event_stream is None:
+            return
+        seconds = time.perf_counter() - started
+        if self.build_metrics is not None:
+            self.build_metrics.observe_file(size=size, seconds=seconds)
+        self.emit_event('file_written', template=template_entry.path, target=str(path_target_file), method=method, bytes=size, seconds=seconds)
+
+    def end_phase(self, phase: str) -> None:
+        """
+        the end of a build phase : records its duration in the metrics, the peak rss of the process in the build report,
+        and if the memory budget was exceeded
+        """
+        phase_ended = time.perf_counter()
+        seconds = phase_ended - self.phase_started
+        self.phase_started = phase_ended
+        if self.build_metrics is not None:
+            self.build_metrics.phase_seconds[phase] = seconds
+        peak_rss = resource_limits.get_peak_rss()
+        self.build_report.peak_rss_by_phase[phase] = peak_rss
+        if self.resource_limits.is_memory_budget_exceeded(peak_rss) and not self.build_report.memory_budget_exceeded:
+            self.build_report.memory_budget_exceeded = True
+            if not self.quiet:
+                logger.warning(f'the build exceeded max_build_memory = {self.resource_limits.max_build_memory} bytes in phase "{phase}" '
+                               f'with a peak rss of {peak_rss} bytes')
+        self.emit_event('phase_finished', phase=phase, seconds=seconds, peak_rss=peak_rss)
 
     def do_not_copy(self, file_object: pathlib.Path) -> bool:
         """ Check if the pattern for option 'object_no_copy' in file_object_name """
@@ -407,56 +1716,50 @@ class PizzaCutter(object):
         if helpers.path_startswith(path_target_object, self.path_target_dir):
             return skip_outside_write
 
-        if self.allow_outside_write:
+        if self.allow_outside_write and not self.output_sink.supports_outside_write:
+            if not quiet:
+                sink_name = self.output_sink.__class__.__name__
+                self.diagnostics.add('outside_write_unsupported', logging.WARNING, f'objects outside the project directory, can not be written to {sink_name}',
+                                     f'object outside project directory can not be written to {sink_name}: "%s"', path_target_object)
+            skip_outside_write = True
+        elif self.allow_outside_write:
             if self.dry_run:
-                logger.info(f'object outside project directory: "{path_target_object}"')
+                self.diagnostics.add('outside_project_dir', logging.INFO, 'objects outside the project directory',
+                                     'object outside project directory: "%s"', path_target_object)
             skip_outside_write = False
         else:
-            msg = f'object outside project directory not allowed: "{path_target_object}"'
-            if self.dry_run:
-                logger.info(msg)
-            else:
-                if not quiet:
-                    logger.warning(msg)
+            if self.dry_run or not quiet:
+                level = logging.INFO if self.dry_run else logging.WARNING
+                self.diagnostics.add('outside_not_allowed', level, 'objects outside the project directory not allowed',
+                                     'object outside project directory not allowed: "%s"', path_target_object)
             skip_outside_write = True
 
         return skip_outside_write
 
-    def skip_overwrite(self, path_source_object: pathlib.Path, path_target_object: pathlib.Path) -> bool:
-        """ check if overwrite is allowed """
+    def skip_overwrite(self, path_source_object: pathlib.Path, path_target_object: pathlib.Path, no_overwrite: Optional[bool] = None) -> bool:
+        """ check if overwrite is allowed - no_overwrite is passed by the template walker, who knows the option inherited from the parent directories """
+
+        target_exists = self.output_sink.exists(path_target_object)
 
-        if self.conf.pizza_cutter_options['object_no_overwrite'] in str(path_source_object) and path_target_object.exists():
+        if no_overwrite is None:
+            no_overwrite = self.conf.pizza_cutter_options['object_no_overwrite'] in str(path_source_object)
+
+        if no_overwrite and target_exists:
             return True
 
-        if path_target_object.exists():
+        if target_exists:
             if self.allow_overwrite:
                 if self.dry_run:
-                    logger.debug(f'object will be overwritten: "{path_target_object}"')
+                    self.diagnostics.add('overwrite', logging.DEBUG, 'objects overwritten', 'object will be overwritten: "%s"', path_target_object)
                 return False
             else:
                 if self.dry_run:
-                    logger.debug(f'object overwrite skipped, because allow_overwrite = False: "{path_target_object}"')
+                    self.diagnostics.add('overwrite_skipped', logging.DEBUG, 'objects not overwritten, because allow_overwrite = False',
+                                         'object overwrite skipped, because allow_overwrite = False: "%s"', path_target_object)
                 return True
         else:
             return False
 
-    def log_unfilled_patterns(self) -> None:
-
-        path_source_objects = self.get_path_template_objects()
-
-        for path_source_object in path_source_objects:
-
-            path_target_object = self.get_path_target_object(path_source_object=path_source_object)
-
-            if self.do_not_copy(path_source_object):
-                continue
-
-            if self.skip_write_outside_project_folder(path_target_object, quiet=True):
-                continue
-
-            self.log_unfilled_patterns_in_path(path_target_object)
-            self.log_unfilled_pattern_in_object(path_target_object)
-
     def log_unfilled_patterns_in_path(self, _path: pathlib.Path) -> List[str]:
         """
         logs unfilled patterns in the path name of a file
@@ -490,17 +1793,18 @@ class PizzaCutter(object):
         # we think a pattern never will be that long
         max_pattern_length = 160
         for pattern_prefix in self.conf.pizzacutter_pattern_prefixes:
+            for position in helpers.findall(pattern_prefix, str_path):
+                current_slice = str_path[position: position + max_pattern_length]
+                if '}}' not in current_slice:
+                    l_patterns.append(f'missing closing brackets for "{pattern_prefix}"')
+                else:
+                    full_pattern = current_slice.split('}}', 1)[0] + '}}'
+                    l_patterns.append(f'unfilled pattern "{full_pattern}"')
+        if l_patterns:
+            self.build_report.add_unfilled_patterns(str_path, l_patterns)
             if not self.quiet:
-                for position in helpers.findall(pattern_prefix, str_path):
-                    current_slice = str_path[position: position + max_pattern_length]
-                    if '}}' not in current_slice:
-                        l_patterns.append(f'missing closing brackets for "{pattern_prefix}"')
-                    else:
-                        full_pattern = current_slice.split('}}', 1)[0] + '}}'
-                        l_patterns.append(f'unfilled pattern "{full_pattern}"')
-                if l_patterns:
-                    patterns = '\n'.join(l_patterns)
-                    logger.warning(f'unfilled or malformed patterns in filename "{str_path}": \n{patterns}')
+                self.diagnostics.add('unfilled_patterns_in_path', logging.WARNING, 'objects with unfilled or malformed patterns in the filename',
+                                     'unfilled or malformed patterns in filename "%s": \n%s', str_path, '\n'.join(l_patterns))
         return l_patterns
 
     def log_unfilled_pattern_in_object(self, path_object: pathlib.Path) -> List[str]:
@@ -524,25 +1828,54 @@ class PizzaCutter(object):
         >>> pizza_cutter.log_unfilled_pattern_in_object(path_test_file)
         ['missing closing brackets for "{{TestPizzaCutter.missing_brackets"', 'unfilled pattern "{{TestPizzaCutter.unfilled_pattern}}"']
 
+        """
+        if not path_object.is_file():
+            return list()
+        # only the text after each '{{' is kept, so that also works for huge files
+        pattern_excerpts: List[bytes] = list()
+        with open(str(path_object), 'rb') as f_object:
+            line = f_object.readline(resource_limits.STREAM_LINE_LIMIT)
+            while line:
+                resource_limits.add_pattern_excerpts(line, pattern_excerpts)
+                line = f_object.readline(resource_limits.STREAM_LINE_LIMIT)
+        return self.log_unfilled_patterns_in_content(b'\n'.join(pattern_excerpts), path_object)
+
+    def log_unfilled_patterns_in_content(self, content_bytes: bytes, path_object: pathlib.Path) -> List[str]:
+        """
+        find unfilled patterns in the (rendered) content of a file.
+        we search for bytes, because we dont know the encoding of the file
+
+        >>> # Setup
+        >>> path_test_dir = pathlib.Path(__file__).parent.parent / 'tests'
+        >>> path_template_dir = path_test_dir / 'pizzacutter_test_template_02'
+        >>> path_conf_file = path_template_dir / 'PizzaCutterTestConfig_02.py'
+        >>> path_target_dir = path_test_dir / 'pizzacutter_test_project_02'
+        >>> pizza_cutter = PizzaCutter(path_conf_file, path_template_dir, path_target_dir)
+
+        >>> # Test
+        >>> pizza_cutter.log_unfilled_patterns_in_content(b'test {{TestPizzaCutter.unfilled}} test', pathlib.Path('test.txt'))
+        ['unfilled pattern "{{TestPizzaCutter.unfilled}}"']
+        >>> pizza_cutter.log_unfilled_patterns_in_content(b'test', pathlib.Path('test.txt'))
+        []
+
         """
         l_patterns: List[str] = list()
-        if path_object.is_file():
-            # we think a pattern never will be that long
-            max_pattern_length = 160
-            content_bytes = path_object.read_bytes()
-            for pattern_prefix in self.conf.pizzacutter_pattern_prefixes:
-                pattern_prefix_bytes = pattern_prefix.encode('utf-8')
-                for position in helpers.findall(pattern_prefix_bytes, content_bytes):
-                    current_slice = content_bytes[position: position + max_pattern_length].split(b'\n', 1)[0]
-                    if b'}}' not in current_slice:
-                        current_slice = b'{{' + current_slice[2:].split(b'{{', 1)[0].split(b'}', 1)[0]
-                        l_patterns.append(f'missing closing brackets for "{current_slice.decode("utf-8")}"')
-                    else:
-                        full_pattern_bytes = current_slice.split(b'}}', 1)[0] + b'}}'
-                        l_patterns.append(f'unfilled pattern "{full_pattern_bytes.decode("utf-8")}"')
-            if l_patterns:
-                patterns = '\n'.join(l_patterns)
-                logger.warning(f'unfilled or malformed patterns in file "{path_object}": \n{patterns}')
+        # we think a pattern never will be that long
+        max_pattern_length = 160
+        for pattern_prefix in self.conf.pizzacutter_pattern_prefixes:
+            pattern_prefix_bytes = pattern_prefix.encode('utf-8')
+            for position in helpers.findall(pattern_prefix_bytes, content_bytes):
+                current_slice = content_bytes[position: position + max_pattern_length].split(b'\n', 1)[0]
+                if b'}}' not in current_slice:
+                    current_slice = b'{{' + current_slice[2:].split(b'{{', 1)[0].split(b'}', 1)[0]
+                    l_patterns.append(f'missing closing brackets for "{current_slice.decode("utf-8")}"')
+                else:
+                    full_pattern_bytes = current_slice.split(b'}}', 1)[0] + b'}}'
+                    l_patterns.append(f'unfilled pattern "{full_pattern_bytes.decode("utf-8")}"')
+        if l_patterns:
+            self.build_report.add_unfilled_patterns(str(path_object), l_patterns)
+            self.diagnostics.add('unfilled_patterns_in_file', logging.WARNING, 'files with unfilled or malformed patterns in the content',
+                                 'unfilled or malformed patterns in file "%s": \n%s', path_object, '\n'.join(l_patterns))
         return l_patterns
 
     def path_remove_cutter_option_patterns(self, path_source_file: pathlib.Path) -> pathlib.Path:
@@ -624,7 +1957,9 @@ class PizzaCutter(object):
         result_file_parts = list()
         for source_file_part in source_file_parts:
             for pattern in self.conf.pizza_cutter_patterns.keys():
-                replacement = self.conf.pizza_cutter_patterns[pattern]
+                if pattern not in source_file_part:
+                    continue
+                replacement = self.get_pattern_value(pattern)
                 if isinstance(replacement, str):
                     source_file_part = source_file_part.replace(pattern, replacement)
             result_file_parts.append(source_file_part)
@@ -710,22 +2045,24 @@ class PizzaCutter(object):
         for source_object_part in source_object_parts:
             target_object_part: Union[str, pathlib.Path] = source_object_part
             for pattern in self.conf.pizza_cutter_patterns.keys():
-                replacement = self.conf.pizza_cutter_patterns[pattern]
+                if pattern not in source_object_part:
+                    continue
+                replacement = self.get_pattern_value(pattern)
                 # we need this, because pathlib3x.Path is NOT instance of pathlib.Path,
                 # but the User might use pathlib in his config File !
                 if isinstance(replacement, str):
                     continue
-                if pattern in source_object_part:
-                    if source_object_part != pattern:
-                        raise RuntimeError(
-                            f'pathlib.Path patterns can only be one complete part of a path : Path: "{path_source_path}", Pattern: {pattern}'
-                            )
-                    else:
-                        target_object_part = pathlib.Path(replacement)
-                        if target_object_part.is_absolute() and absolute_path_found:
-                            logger.warning(
-                                'the resulting path might be unexpected, You have more then one absolute pathlib.Path pattern in the path: '
-                                f'"{path_source_path}", Pattern: "{pattern}" points to "{replacement}"')
+                if source_object_part != pattern:
+                    raise RuntimeError(
+                        f'pathlib.Path patterns can only be one complete part of a path : Path: "{path_source_path}", Pattern: {pattern}'
+                        )
+                else:
+                    target_object_part = pathlib.Path(replacement)
+                    if target_object_part.is_absolute() and absolute_path_found:
+                        self.diagnostics.add('absolute_path_patterns', logging.WARNING,
+                                             'paths with more then one absolute pathlib.Path pattern, the resulting paths might be unexpected',
+                                             'the resulting path might be unexpected, You have more then one absolute pathlib.Path pattern in the path: '
+                                             '"%s", Pattern: "%s" points to "%s"', path_source_path, pattern, replacement)
 
             if not absolute_path_found:
                 target_parts.append(target_object_part)
@@ -737,15 +2074,17 @@ class PizzaCutter(object):
 
         if absolute_path_found:
             if not self.quiet:
-                logger.warning('the resulting path of a template file might be unexpected, You have an absolute pathlib.Path pattern in the path: '
-                               f'"{path_source_path}" points to "{path_target_path}"')
+                self.diagnostics.add('absolute_path_pattern', logging.WARNING,
+                                     'paths with an absolute pathlib.Path pattern, the resulting paths might be unexpected',
+                                     'the resulting path of a template file might be unexpected, You have an absolute pathlib.Path pattern in the path: '
+                                     '"%s" points to "%s"', path_source_path, path_target_path)
         else:
-            path_target_path = path_target_path.replace_parts(self.path_template_dir.resolve(), self.path_target_dir.resolve())
+            path_target_path = path_target_path.replace_parts(self.get_path_template_dir(path_target_path).resolve(), self.path_target_dir.resolve())
         return path_target_path
 
-    def get_path_template_subdirs_with_pattern(self) -> List[pathlib.Path]:
+    def get_path_template_subdirs_with_pattern(self) -> Iterator[pathlib.Path]:
         """
-        get the template sub directories with a valid pattern in it - all other directories are considered not to be part of the template
+        yields the template sub directories with a valid pattern in it - all other directories are considered not to be part of the template
 
         >>> # Setup
         >>> path_test_dir = pathlib.Path(__file__).parent.parent / 'tests'
@@ -756,22 +2095,17 @@ class PizzaCutter(object):
         >>> pizza_cutter = PizzaCutter(path_conf_file, path_template_dir, path_target_dir)
 
         >>> # TEST
-        >>> pizza_cutter.get_path_template_subdirs_with_pattern()
+        >>> list(pizza_cutter.get_path_template_subdirs_with_pattern())
         [...Path('.../pizzacutter_test_template_01/{{TestPizzaCutter.project_dir}}')...]
 
         """
-
-        template_subdirs_with_pattern: List[pathlib.Path] = list()
-        path_template_dir_subdirs = list(self.path_template_dir.glob('*/'))
-        for path_template_subdir in path_template_dir_subdirs:
-            for pattern in self.conf.pizza_cutter_patterns.keys():
-                if pattern in path_template_subdir.name:
-                    template_subdirs_with_pattern.append(path_template_subdir)
-        return template_subdirs_with_pattern
+        for dir_entry in template_walker.iter_template_subdirs_with_pattern(self.path_template_dir, self.conf.pizza_cutter_patterns.keys()):
+            yield pathlib.Path(dir_entry.path)
 
     def get_path_template_objects(self) -> List[pathlib.Path]:
         """
-        get all the files in the template subdirectories with a valid pattern
+        get all the files in the template subdirectories with a valid pattern, without the objects marked with the option "object_no_copy"
+        that materializes the whole template as pathlib objects - the build itself uses the lazy iter_template_entries()
 
         >>> # Setup
         >>> path_test_dir = pathlib.Path(__file__).parent.parent / 'tests'
@@ -791,11 +2125,47 @@ class PizzaCutter(object):
         >>> os.chdir(str(savedir))
 
         """
-        path_template_files: List[pathlib.Path] = list()
-        for path_directory in self.get_path_template_subdirs_with_pattern():
-            path_template_files = path_template_files + list(path_directory.glob('**/*')) + list(path_directory.glob('**/'))
-        path_template_files = sorted(list(set(path_template_files)))
-        return path_template_files
+        return [self.get_path_source_object(template_entry) for template_entry in self.iter_template_entries()]
+
+    def get_path_source_object(self, template_entry: template_walker.TemplateEntry) -> pathlib.Path:
+        """ the full path of a template entry - only created when needed, the entries themselves hold only the relative path string """
+        return self.path_template_dirs[template_entry.layer] / template_entry.path
+
+    def get_path_template_dir(self, path_source_object: pathlib.Path) -> pathlib.Path:
+        """ the template directory of the layer a template object is in - the innermost, if the template directories are nested """
+        if self.layer_confs:
+            path_template_dirs = [path_template_dir for path_template_dir in self.path_template_dirs if path_source_object.is_relative_to(path_template_dir)]
+            if path_template_dirs:
+                return max(path_template_dirs, key=lambda path_template_dir: len(path_template_dir.parts))
+        return self.path_template_dir
+
+    def iter_template_entries(self, selected: bool = True) -> Iterator[template_walker.TemplateEntry]:
+        """
+        yields compact template entries lazily in a single pass, subtrees marked with the option "object_no_copy" are not even enumerated.
+        with a compiled template, the entries are taken from its manifest, without walking the template.
+        with a path filter only the selected objects are yielded, and skipped subtrees are not enumerated - selected=False yields the whole template
+        """
+        select = self.select_template_object if selected and self.path_filter is not None else None
+        if self.compiled_template is not None:
+            template_entries = self.compiled_template.iter_template_entries()
+            return template_entries if select is None else template_walker.filter_template_entries(template_entries, select)
+        if self.layer_confs:
+            return template_walker.walk_template_layers(path_template_dirs=self.path_template_dirs,
+                                                        patterns=self.conf.pizza_cutter_patterns.keys(),
+                                                        option_no_copy=self.conf.pizza_cutter_options['object_no_copy'],
+                                                        option_no_overwrite=self.conf.pizza_cutter_options['object_no_overwrite'],
+                                                        select=select)
+        return template_walker.walk_template(path_template_dir=self.path_template_dir,
+                                             patterns=self.conf.pizza_cutter_patterns.keys(),
+                                             option_no_copy=self.conf.pizza_cutter_options['object_no_copy'],
+                                             option_no_overwrite=self.conf.pizza_cutter_options['object_no_overwrite'],
+                                             select=select)
+
+    def select_template_object(self, template_entry: template_walker.TemplateEntry, parent_selected: bool) -> Optional[bool]:
+        """ the path filter for the template walk - it matches the template path and the target path, which is resolved without reading the object """
+        assert self.path_filter is not None
+        target_name = self.get_target_name(self.get_path_target_object(self.path_template_dir / template_entry.path))
+        return self.path_filter.select(template_entry.path, target_name, template_entry.is_dir, parent_selected)
 
 
 def build(path_conf_file: pathlib.Path,
@@ -804,7 +2174,32 @@ def build(path_conf_file: pathlib.Path,
           dry_run: Optional[bool] = None,
           allow_overwrite: Optional[bool] = None,
           allow_outside_write: Optional[bool] = None,
-          quiet: Optional[bool] = None) -> None:
+          quiet: Optional[bool] = None,
+          output_sink: Optional[output_sinks.OutputSinkBase] = None,
+          materialize: Optional[str] = None,
+          write_if_changed: Optional[bool] = None,
+          path_state_dir: Optional[pathlib.Path] = None,
+          selective_rebuild: Optional[bool] = None,
+          compiled: Optional[compiled_template.CompiledTemplate] = None,
+          max_render_size: Optional[int] = None,
+          max_build_memory: Optional[int] = None,
+          max_include_size: Optional[int] = None,
+          oversize_action: Optional[str] = None,
+          event_stream: Optional[build_events.BuildEventStream] = None,
+          metrics: Optional[build_metrics.BuildMetrics] = None,
+          layers: Optional[Sequence[pathlib.Path]] = None,
+          path_content_store: Optional[pathlib.Path] = None,
+          content_store_method: Optional[str] = None,
+          isolated_config: bool = False,
+          shard: Optional[Tuple[int, int]] = None,
+          path_output_cache: Optional[pathlib.Path] = None,
+          output_cache_max_size: Optional[int] = None,
+          output_cache_max_entries: Optional[int] = None,
+          only: Sequence[str] = (),
+          exclude: Sequence[str] = (),
+          verbose_diagnostics: Optional[bool] = None,
+          journal: Optional[bool] = None,
+          resume: bool = False) -> build_report.BuildReport:
 
     pizza_cutter = PizzaCutter(path_conf_file=path_conf_file,
                                path_template_dir=path_template_dir,
@@ -812,9 +2207,126 @@ def build(path_conf_file: pathlib.Path,
                                dry_run=dry_run,
                                allow_overwrite=allow_overwrite,
                                allow_outside_write=allow_outside_write,
-                               quiet=quiet)
-
-    pizza_cutter.build()
+                               quiet=quiet,
+                               output_sink=output_sink,
+                               materialize=materialize,
+                               write_if_changed=write_if_changed,
+                               path_state_dir=path_state_dir,
+                               selective_rebuild=selective_rebuild,
+                               compiled=compiled,
+                               max_render_size=max_render_size,
+                               max_build_memory=max_build_memory,
+                               max_include_size=max_include_size,
+                               oversize_action=oversize_action,
+                               event_stream=event_stream,
+                               metrics=metrics,
+                               layers=layers,
+                               path_content_store=path_content_store,
+                               content_store_method=content_store_method,
+                               isolated_config=isolated_config,
+                               shard=shard,
+                               path_output_cache=path_output_cache,
+                               output_cache_max_size=output_cache_max_size,
+                               output_cache_max_entries=output_cache_max_entries,
+                               only=only,
+                               exclude=exclude,
+                               verbose_diagnostics=verbose_diagnostics,
+                               journal=journal,
+                               resume=resume)
+
+    return pizza_cutter.build()
+
+
+# the number of PizzaCutters render_file() keeps, the least recently used is dropped
+RENDER_FILE_CACHE_SIZE = 8
+# (conf file, template dir, target dir, compiled template file) -> (signature of the conf file and the compiled file,
+# PizzaCutter, lock of the PizzaCutter) - a template or target dir which is not given is '', the target dir of the conf file might depend on the cwd
+render_file_cache: 'collections.OrderedDict[Tuple[str, str, str, str], Tuple[Tuple[Tuple[int, int], ...], PizzaCutter, threading.Lock]]' = \
+    collections.OrderedDict()
+# only held to look up and fill render_file_cache - the renders are serialized by the lock of their PizzaCutter
+render_file_cache_lock = threading.Lock()
+
+
+def render_file(path_conf_file: pathlib.Path,
+                path_file: pathlib.Path,
+                path_template_dir: Optional[pathlib.Path] = None,
+                path_target_dir: Optional[pathlib.Path] = None,
+                path_compiled_file: Optional[pathlib.Path] = None) -> bytes:
+    """
+    what one template file, or the target file of it, would look like if the project is cut again - nothing is written.
+    the template and target directories default to those of the conf file, like for build().
+    the PizzaCutter with its loaded conf files, resolved patterns and map of the target paths is kept for the next calls,
+    until the conf file or the compiled template file changes - so only the first call loads and resolves, the others just stat those two files
+    and render the file. files added to or removed from the template since are noticed when a target path is not mapped, or its template file
+    is gone : then the template is walked again, once.
+    the last RENDER_FILE_CACHE_SIZE PizzaCutters are kept. renders with different PizzaCutters run at the same time,
+    those with the same PizzaCutter one after the other.
+
+    >>> # Setup
+    >>> path_test_dir = pathlib.Path(__file__).parent.parent.resolve() / 'tests'
+    >>> path_template_dir = path_test_dir / 'pizzacutter_test_template_01'
+    >>> path_conf_file = path_template_dir / 'PizzaCutterTestConfig_01.py'
+    >>> path_target_dir = path_test_dir / 'pizzacutter_test_project_01'
+    >>> path_expected_file = path_test_dir / 'pizzacutter_test_project_01_expected/pizzacutter_test_project/test01.txt'
+
+    >>> # Test the second call reuses the PizzaCutter of the first one
+    >>> content = render_file(path_conf_file, path_target_dir / 'pizzacutter_test_project/test01.txt', path_template_dir, path_target_dir)
+    >>> assert content == path_expected_file.read_bytes()
+    >>> pizza_cutter = render_file_cache[(str(path_conf_file), str(path_template_dir), str(path_target_dir), '')][1]
+    >>> assert render_file(path_conf_file, path_target_dir / 'pizzacutter_test_project/test01.txt', path_template_dir, path_target_dir) == content
+    >>> assert render_file_cache[(str(path_conf_file), str(path_template_dir), str(path_target_dir), '')][1] is pizza_cutter
+    >>> assert not path_target_dir.exists()
+
+    >>> # Test a file added to the template is mapped by the same PizzaCutter, a removed file is not found anymore
+    >>> path_added_file = path_template_dir / '{{TestPizzaCutter.project_dir}}/test_render_file_added.txt'
+    >>> _ = path_added_file.write_text('{{TestPizzaCutter.project_dir}}')
+    >>> render_file(path_conf_file, path_target_dir / 'pizzacutter_test_project/test_render_file_added.txt', path_template_dir, path_target_dir)
+    b'pizzacutter_test_project'
+    >>> assert render_file_cache[(str(path_conf_file), str(path_template_dir), str(path_target_dir), '')][1] is pizza_cutter
+    >>> path_added_file.unlink()
+    >>> render_file(path_conf_file, path_target_dir / 'pizzacutter_test_project/test_render_file_added.txt', path_template_dir, path_target_dir)
+    Traceback (most recent call last):
+    ...
+    FileNotFoundError: "...test_render_file_added.txt" is neither a file of the template, nor a target file of it
+
+    >>> # Test the template and target directories of the conf file are used, if they are not given
+    >>> assert render_file(path_conf_file, path_template_dir / '{{TestPizzaCutter.project_dir}}/test01.txt') == content
+
+    >>> # Test only the most recently used PizzaCutters are kept
+    >>> for number in range(RENDER_FILE_CACHE_SIZE):
+    ...     _ = render_file(path_conf_file, path_template_dir / '{{TestPizzaCutter.project_dir}}/test01.txt', path_template_dir,
+    ...                     path_test_dir / f'pizzacutter_test_project_01_{number}')
+    >>> assert len(render_file_cache) == RENDER_FILE_CACHE_SIZE
+    >>> (str(path_conf_file), str(path_template_dir), str(path_target_dir), '') in render_file_cache
+    False
+
+    """
+    path_conf_file = pathlib.Path(path_conf_file).resolve()
+    path_template_dir = None if path_template_dir is None else pathlib.Path(path_template_dir).resolve()
+    path_target_dir = None if path_target_dir is None else pathlib.Path(path_target_dir).resolve()
+    cache_key = (str(path_conf_file), '' if path_template_dir is None else str(path_template_dir),
+                 os.getcwd() if path_target_dir is None else str(path_target_dir), '' if path_compiled_file is None else str(path_compiled_file))
+    signature = tuple(get_file_signature(path_signature_file) for path_signature_file in (path_conf_file, path_compiled_file) if path_signature_file)
+    with render_file_cache_lock:
+        cached = render_file_cache.get(cache_key)
+        if cached is None or cached[0] != signature:
+            compiled = None if path_compiled_file is None else compiled_template.CompiledTemplate.load(pathlib.Path(path_compiled_file))
+            pizza_cutter = PizzaCutter(path_conf_file=path_conf_file, path_template_dir=path_template_dir, path_target_dir=path_target_dir,
+                                       dry_run=True, quiet=True, compiled=compiled)
+            cached = render_file_cache[cache_key] = (signature, pizza_cutter, threading.Lock())
+        render_file_cache.move_to_end(cache_key)
+        while len(render_file_cache) > RENDER_FILE_CACHE_SIZE:
+            render_file_cache.popitem(last=False)
+    pizza_cutter, pizza_cutter_lock = cached[1], cached[2]
+    # the renderer and the map of the target paths are set up on the first call, the map is set up again if a target is not found
+    with pizza_cutter_lock:
+        return pizza_cutter.render_file(pathlib.Path(path_file))
+
+
+def get_file_signature(path_file: pathlib.Path) -> Tuple[int, int]:
+    """ the mtime and size of a file, to notice when it was changed """
+    file_stat = os.stat(str(path_file))
+    return file_stat.st_mtime_ns, file_stat.st_size
 
 
 if __name__ == '__main__':
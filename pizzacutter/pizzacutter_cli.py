@@ -1,7 +1,7 @@
 # STDLIB
 import pathlib3x as pathlib
 import sys
-from typing import Optional
+from typing import Optional, Sequence
 
 # EXT
 import click
@@ -13,10 +13,36 @@ import cli_exit_tools
 try:
     from . import __init__conf__
     from . import pizzacutter
+    from .sub import build_events
+    from .sub import build_metrics
+    from .sub import build_plan
+    from .sub import build_state
+    from .sub import compiled_template
+    from .sub import content_store
+    from .sub import fleet as pizzacutter_fleet
+    from .sub import get_config
+    from .sub import lint as pizzacutter_lint
+    from .sub import output_sinks
+    from .sub import pattern_index
+    from .sub import sharding
+    from .sub.pizzacutter_config import PizzaCutterConfigBase
 except (ImportError, ModuleNotFoundError):  # pragma: no cover
     # imports for pytest
     import __init__conf__                   # type: ignore  # pragma: no cover
     import pizzacutter                      # type: ignore  # pragma: no cover
+    from sub import build_events            # type: ignore  # pragma: no cover
+    from sub import build_metrics           # type: ignore  # pragma: no cover
+    from sub import build_plan              # type: ignore  # pragma: no cover
+    from sub import build_state             # type: ignore  # pragma: no cover
+    from sub import compiled_template       # type: ignore  # pragma: no cover
+    from sub import content_store           # type: ignore  # pragma: no cover
+    from sub import fleet as pizzacutter_fleet  # type: ignore  # pragma: no cover
+    from sub import get_config              # type: ignore  # pragma: no cover
+    from sub import lint as pizzacutter_lint  # type: ignore  # pragma: no cover
+    from sub import output_sinks            # type: ignore  # pragma: no cover
+    from sub import pattern_index           # type: ignore  # pragma: no cover
+    from sub import sharding                # type: ignore  # pragma: no cover
+    from sub.pizzacutter_config import PizzaCutterConfigBase  # type: ignore  # pragma: no cover
 
 # CONSTANTS
 CLICK_CONTEXT_SETTINGS = dict(help_option_names=['-h', '--help'])
@@ -31,13 +57,29 @@ def info() -> None:
     __init__conf__.print_info()
 
 
-def build(conf_file: str, template_dir: str = '', target_dir: str = '', dry_run: bool = False, overwrite: bool = False, write_outside: bool = False) -> None:
-    """ Builds the Project from the Template
+def build(conf_file: str, template_dir: str = '', target_dir: str = '', dry_run: bool = False, overwrite: bool = False, write_outside: bool = False,
+          archive: str = '', archive_format: str = '', materialize: Optional[str] = None, write_if_changed: Optional[bool] = None,
+          report: bool = False, selective: Optional[bool] = None, compiled: str = '', max_render_size: Optional[int] = None,
+          max_build_memory: Optional[int] = None, max_include_size: Optional[int] = None, oversize_action: Optional[str] = None,
+          events: str = '', metrics: str = '', layers: Sequence[str] = (), store: str = '', store_method: Optional[str] = None,
+          shard: str = '', report_file: str = '', output_cache: str = '', output_cache_max_size: Optional[int] = None,
+          output_cache_max_entries: Optional[int] = None, only: Sequence[str] = (), exclude: Sequence[str] = (),
+          verbose_diagnostics: Optional[bool] = None, journal: Optional[bool] = None, resume: bool = False, state_dir: str = '') -> None:
+    """ Builds the Project from the Template, into the target directory or into an archive.
+    the progress can be written as JSON lines events into a file or file descriptor, the metrics as OpenMetrics text into a file.
+    layers are the conf files of overlay templates, merged in that order over the template - later layers take precedence.
+    store is the content store directory shared with the builds of other target directories.
+    shard 'INDEX/COUNT' builds only that shard of the template, report_file saves the (partial) build report as JSON for merge_reports()
+    output_cache is the directory of the cache of whole build outputs, a build with the same fingerprint is taken from there without rendering.
+    only and exclude are globs on the template paths or target paths, to build a subset of the template.
+    state_dir keeps the state of the builds (the pattern index for the command 'patterns', ...) in that directory.
+    journal journals the build in the state directory, so an interrupted build can be continued with resume
 
     >>> # Setup
     >>> path_test_dir = pathlib.Path(__file__).parent.parent.resolve() / 'tests'
     >>> path_template_dir = path_test_dir / 'pizzacutter_test_template_01'
     >>> path_target_dir = path_test_dir / 'pizzacutter_test_project_01_result'
+    >>> path_state_dir = path_test_dir / 'pizzacutter_test_state_01_result'
     >>> path_conf_file = path_template_dir / 'PizzaCutterTestConfig_01.py'
 
     >>> # Test only pass "conf_file", dry run
@@ -46,6 +88,62 @@ def build(conf_file: str, template_dir: str = '', target_dir: str = '', dry_run:
     >>> # Test pass "conf_file", "template_dir" and "target_dir" dry run
     >>> build(conf_file=str(path_conf_file), template_dir=str(path_template_dir), target_dir=str(path_target_dir), dry_run=True)
 
+    >>> # Test build into an archive
+    >>> path_archive = path_test_dir / 'pizzacutter_test_project_01_result.tar.gz'
+    >>> build(conf_file=str(path_conf_file), target_dir=str(path_target_dir), archive=str(path_archive), state_dir=str(path_state_dir))
+    >>> assert path_archive.is_file()
+    >>> assert not path_target_dir.exists()
+    >>> path_archive.unlink()
+
+    >>> # Test build with events and metrics
+    >>> path_events_file = path_test_dir / 'pizzacutter_test_project_01_result.jsonl'
+    >>> path_metrics_file = path_test_dir / 'pizzacutter_test_project_01_result.prom'
+    >>> build(conf_file=str(path_conf_file), target_dir=str(path_target_dir), dry_run=True, events=str(path_events_file), metrics=str(path_metrics_file))
+    >>> assert '"build_finished"' in path_events_file.read_text()
+    >>> assert path_metrics_file.read_text().endswith('# EOF\\n')
+    >>> path_events_file.unlink()
+    >>> path_metrics_file.unlink()
+
+    >>> # Test layered build
+    >>> build(conf_file=str(path_conf_file), target_dir=str(path_target_dir), dry_run=True,
+    ...       layers=[str(path_test_dir / 'pizzacutter_test_template_02' / 'PizzaCutterTestConfig_02.py')])
+
+    >>> # Test build through a content store
+    >>> path_store_dir = path_test_dir / 'pizzacutter_test_project_01_result_store'
+    >>> build(conf_file=str(path_conf_file), target_dir=str(path_target_dir), store=str(path_store_dir), store_method='hardlink',
+    ...       state_dir=str(path_state_dir))
+    >>> assert (path_store_dir / 'objects').is_dir()
+    >>> path_target_dir.rmtree()
+    >>> gc_store(str(path_store_dir))
+    removed ... objects (... bytes) from the content store "..."
+    >>> path_store_dir.rmtree()
+
+    >>> # Test build in shards, and merge their reports
+    >>> path_report_files = [path_test_dir / f'pizzacutter_test_project_01_result_{index}.json' for index in (1, 2)]
+    >>> for index, path_report_file in enumerate(path_report_files, 1):
+    ...     build(conf_file=str(path_conf_file), target_dir=str(path_target_dir), dry_run=True, shard=f'{index}/2', report_file=str(path_report_file))
+    >>> merge_reports([str(path_report_file) for path_report_file in path_report_files])
+    PizzaCutter build report:
+    ...
+        shards              : 1/2, 2/2
+    ...
+    >>> for path_report_file in path_report_files:
+    ...     path_report_file.unlink()
+
+    >>> # Test build of a subset of the template
+    >>> build(conf_file=str(path_conf_file), target_dir=str(path_target_dir), only=['*/dir_test_02/*'], exclude=['*.bak'], state_dir=str(path_state_dir))
+    >>> sorted(path.name for path in path_target_dir.glob('**/*.txt'))
+    ['test01.txt', 'test01.txt', 'test02.txt']
+    >>> path_target_dir.rmtree()
+
+    >>> # Test build with report
+    >>> build(conf_file=str(path_conf_file), target_dir=str(path_target_dir), dry_run=True, materialize='reflink', report=True)
+    PizzaCutter build report:
+    ...
+
+    >>> # Teardown
+    >>> path_state_dir.rmtree(ignore_errors=True)
+
     """
 
     path_conf_file = pathlib.Path(conf_file).resolve()
@@ -60,8 +158,296 @@ def build(conf_file: str, template_dir: str = '', target_dir: str = '', dry_run:
     else:
         path_target_dir = pathlib.Path.cwd().resolve()
 
-    pizzacutter.build(path_conf_file=path_conf_file, path_template_dir=path_template_dir, path_target_dir=path_target_dir,
-                      dry_run=dry_run, allow_overwrite=overwrite, allow_outside_write=write_outside)
+    output_sink: Optional[output_sinks.OutputSinkBase] = None
+    if archive:
+        output_sink = output_sinks.get_archive_sink(archive=archive, archive_format=archive_format)
+
+    compiled_template_loaded = compiled_template.CompiledTemplate.load(pathlib.Path(compiled)) if compiled else None
+
+    event_stream = build_events.get_event_stream(events)
+    build_metrics_collected = build_metrics.BuildMetrics() if metrics else None
+    try:
+        build_report = pizzacutter.build(path_conf_file=path_conf_file, path_template_dir=path_template_dir, path_target_dir=path_target_dir,
+                                         dry_run=dry_run, allow_overwrite=overwrite, allow_outside_write=write_outside, output_sink=output_sink,
+                                         materialize=materialize, write_if_changed=write_if_changed, selective_rebuild=selective,
+                                         compiled=compiled_template_loaded, max_render_size=max_render_size, max_build_memory=max_build_memory,
+                                         max_include_size=max_include_size, oversize_action=oversize_action, event_stream=event_stream,
+                                         metrics=build_metrics_collected, layers=[pathlib.Path(layer).resolve() for layer in layers],
+                                         path_content_store=pathlib.Path(store).resolve() if store else None, content_store_method=store_method,
+                                         shard=sharding.parse_shard(shard) if shard else None,
+                                         path_output_cache=pathlib.Path(output_cache).resolve() if output_cache else None,
+                                         output_cache_max_size=output_cache_max_size, output_cache_max_entries=output_cache_max_entries,
+                                         only=only, exclude=exclude, verbose_diagnostics=verbose_diagnostics,
+                                         journal=journal, resume=resume, path_state_dir=pathlib.Path(state_dir).resolve() if state_dir else None)
+    finally:
+        if event_stream is not None:
+            event_stream.close()
+    if build_metrics_collected is not None:
+        build_metrics_collected.save(pathlib.Path(metrics), build_report)
+    if report_file:
+        build_report.save(pathlib.Path(report_file))
+    if report:
+        # if the archive is written to stdout, the report goes to stderr
+        click.echo(build_report.as_text(), err=(archive == '-'))
+
+
+def compile_template(conf_file: str, template_dir: str = '', output: str = '') -> bool:
+    """ compiles and validates the template with its conf file, prints the errors and warnings, returns True if there are no errors
+
+    >>> # Setup
+    >>> path_test_dir = pathlib.Path(__file__).parent.parent.resolve() / 'tests'
+    >>> path_template_dir = path_test_dir / 'pizzacutter_test_template_01'
+    >>> path_conf_file = path_template_dir / 'PizzaCutterTestConfig_01.py'
+    >>> path_compiled_file = path_test_dir / 'pizzacutter_test_template_01_compiled.json'
+    >>> path_target_dir = path_test_dir / 'pizzacutter_test_project_01_result'
+
+    >>> # Test
+    >>> compile_template(conf_file=str(path_conf_file), output=str(path_compiled_file))
+    True
+    >>> build(conf_file=str(path_conf_file), target_dir=str(path_target_dir), dry_run=True, compiled=str(path_compiled_file))
+
+    >>> # Teardown
+    >>> path_compiled_file.unlink()
+
+    """
+    path_conf_file = pathlib.Path(conf_file).resolve()
+
+    if template_dir:
+        path_template_dir = pathlib.Path(template_dir).resolve()
+    else:
+        path_template_dir = path_conf_file.parent
+
+    if output:
+        path_compiled_file = pathlib.Path(output).resolve()
+    else:
+        path_compiled_file = pathlib.Path.cwd().resolve() / 'pizzacutter_compiled.json'
+
+    pizza_cutter = pizzacutter.PizzaCutter(path_conf_file=path_conf_file, path_template_dir=path_template_dir, dry_run=True)
+    compiled = pizza_cutter.compile_template()
+    compiled.save(path_compiled_file)
+    if compiled.errors or compiled.warnings:
+        click.echo(compiled.as_text(), err=True)
+    return not compiled.errors
+
+
+def render(conf_file: str, file: str, template_dir: str = '', target_dir: str = '', compiled: Optional[str] = None, output: str = '') -> None:
+    """ renders one template file, or the target file of it, into output or to stdout - nothing is written into the target directory
+
+    >>> # Setup
+    >>> path_test_dir = pathlib.Path(__file__).parent.parent.resolve() / 'tests'
+    >>> path_template_dir = path_test_dir / 'pizzacutter_test_template_01'
+    >>> path_conf_file = path_template_dir / 'PizzaCutterTestConfig_01.py'
+    >>> path_target_dir = path_test_dir / 'pizzacutter_test_project_01'
+    >>> path_output_file = path_test_dir / 'pizzacutter_test_render_01.txt'
+    >>> path_expected_file = path_test_dir / 'pizzacutter_test_project_01_expected/pizzacutter_test_project/test01.txt'
+
+    >>> # Test
+    >>> render(conf_file=str(path_conf_file), file=str(path_target_dir / 'pizzacutter_test_project/test01.txt'), target_dir=str(path_target_dir),
+    ...        output=str(path_output_file))
+    >>> assert path_output_file.read_bytes() == path_expected_file.read_bytes()
+
+    >>> # Teardown
+    >>> path_output_file.unlink()
+
+    """
+    content = pizzacutter.render_file(path_conf_file=pathlib.Path(conf_file),
+                                      path_file=pathlib.Path(file),
+                                      path_template_dir=pathlib.Path(template_dir) if template_dir else None,
+                                      path_target_dir=pathlib.Path(target_dir) if target_dir else None,
+                                      path_compiled_file=pathlib.Path(compiled) if compiled else None)
+    if output:
+        pathlib.Path(output).write_bytes(content)
+    else:
+        sys.stdout.buffer.write(content)
+        sys.stdout.buffer.flush()
+
+
+def plan(conf_file: str, template_dir: str = '', target_dir: str = '', overwrite: bool = False, write_outside: bool = False,
+         materialize: Optional[str] = None, output: str = '') -> None:
+    """ plans the build of the Project from the Template into the target directory, writes the plan and prints it for the review
+
+    >>> # Setup
+    >>> path_test_dir = pathlib.Path(__file__).parent.parent.resolve() / 'tests'
+    >>> path_template_dir = path_test_dir / 'pizzacutter_test_template_01'
+    >>> path_target_dir = path_test_dir / 'pizzacutter_test_project_01_result'
+    >>> path_conf_file = path_template_dir / 'PizzaCutterTestConfig_01.py'
+    >>> path_plan_file = path_test_dir / 'pizzacutter_test_project_01_result.plan.json'
+
+    >>> # Test
+    >>> plan(conf_file=str(path_conf_file), target_dir=str(path_target_dir), output=str(path_plan_file))
+    mkdir       pizzacutter_test_project
+    ...
+    >>> apply(plan_file=str(path_plan_file), report=True)
+    PizzaCutter build report:
+        directories created : ...
+        files rendered      : 9 ...
+    >>> assert path_target_dir.is_dir()
+
+    >>> # Teardown
+    >>> path_target_dir.rmtree(ignore_errors=True)
+    >>> path_plan_file.unlink()
+
+    """
+    path_conf_file = pathlib.Path(conf_file).resolve()
+
+    if template_dir:
+        path_template_dir = pathlib.Path(template_dir).resolve()
+    else:
+        path_template_dir = path_conf_file.parent
+
+    if target_dir:
+        path_target_dir = pathlib.Path(target_dir).resolve()
+    else:
+        path_target_dir = pathlib.Path.cwd().resolve()
+
+    if output:
+        path_plan_file = pathlib.Path(output).resolve()
+    else:
+        path_plan_file = pathlib.Path.cwd().resolve() / 'pizzacutter_plan.json'
+
+    pizza_cutter = pizzacutter.PizzaCutter(path_conf_file=path_conf_file, path_template_dir=path_template_dir, path_target_dir=path_target_dir,
+                                           allow_overwrite=overwrite, allow_outside_write=write_outside, materialize=materialize)
+    build_plan_made = pizza_cutter.plan()
+    build_plan_made.save(path_plan_file)
+    click.echo(build_plan_made.as_text())
+
+
+def apply(plan_file: str, template_dir: str = '', target_dir: str = '', jobs: Optional[int] = None, report: bool = False) -> None:
+    """ applies a build plan, the template and the target directory of the plan can be overridden """
+    build_report = build_plan.apply_plan(plan=build_plan.BuildPlan.load(pathlib.Path(plan_file)),
+                                         path_template_dir=pathlib.Path(template_dir).resolve() if template_dir else None,
+                                         path_target_dir=pathlib.Path(target_dir).resolve() if target_dir else None,
+                                         jobs=jobs)
+    if report:
+        click.echo(build_report.as_text())
+
+
+def merge_reports(report_files: Sequence[str], output: str = '') -> None:
+    """ merges the build reports of the shards of a build, prints the merged report and saves it as JSON into output """
+    merged_report = sharding.merge_report_files([pathlib.Path(report_file) for report_file in report_files])
+    if output:
+        merged_report.save(pathlib.Path(output))
+    click.echo(merged_report.as_text())
+
+
+def fleet(fleet_file: str, jobs: Optional[int] = None, processes: bool = False, report: bool = False) -> bool:
+    """
+    runs the builds of a fleet file, at most jobs at the same time - prints the builds which failed, or the whole fleet report.
+    returns True if all builds succeeded
+
+    >>> # Setup
+    >>> path_test_dir = pathlib.Path(__file__).parent.parent.resolve() / 'tests'
+    >>> path_fleet_file = path_test_dir / 'pizzacutter_test_fleet_cli.json'
+    >>> _ = path_fleet_file.write_text('[{"conf_file": "pizzacutter_test_template_01/PizzaCutterTestConfig_01.py", "target_dir": "pizzacutter_test_fleet_cli", '
+    ...                                '"dry_run": true}, {"conf_file": "not_existing_conf.py", "name": "not_existing"}]')
+
+    >>> # Test
+    >>> fleet(str(path_fleet_file), jobs=2)
+    failed              : not_existing : FileNotFoundError: ...
+    False
+
+    >>> # Teardown
+    >>> path_fleet_file.unlink()
+
+    """
+    fleet_report = pizzacutter_fleet.run_fleet(pizzacutter_fleet.load_fleet_file(pathlib.Path(fleet_file)), workers=jobs, processes=processes)
+    if report:
+        click.echo(fleet_report.as_text())
+    else:
+        for result in fleet_report.get_failed():
+            click.echo(f'failed              : {result.name} : {result.error}')
+    return not fleet_report.get_failed()
+
+
+def gc_store(store_dir: str) -> None:
+    """ removes the objects of the content store which no target refers to anymore - dont run it while builds write into the store """
+    path_store_dir = pathlib.Path(store_dir).resolve()
+    objects_removed, bytes_removed = content_store.ContentStore(path_store_dir).gc()
+    click.echo(f'removed {objects_removed} objects ({bytes_removed} bytes) from the content store "{path_store_dir}"')
+
+
+def patterns(target_dir: str = '', state_dir: str = '', unused: bool = False, where: str = '') -> None:
+    """ reports the pattern usage of the last build into the target directory, from the persisted pattern index -
+    that is kept by builds with a state directory, or with a selective rebuild
+
+    >>> # Setup
+    >>> path_test_dir = pathlib.Path(__file__).parent.parent.resolve() / 'tests'
+    >>> path_template_dir = path_test_dir / 'pizzacutter_test_template_01'
+    >>> path_target_dir = path_test_dir / 'pizzacutter_test_project_01_result'
+    >>> path_state_dir = path_test_dir / 'pizzacutter_test_state_01_result'
+    >>> path_conf_file = path_template_dir / 'PizzaCutterTestConfig_01.py'
+    >>> _ = pizzacutter.build(path_conf_file=path_conf_file, path_target_dir=path_target_dir, quiet=True, path_state_dir=path_state_dir)
+
+    >>> # Test
+    >>> patterns(state_dir=str(path_state_dir))
+    {{PizzaCutter.True}} : 0 paths, 0 contents
+    {{TestPizzaCutter.project_dir}} : 14 paths, 0 contents
+    >>> patterns(state_dir=str(path_state_dir), unused=True)
+    {{PizzaCutter.True}}
+    >>> patterns(state_dir=str(path_state_dir), where='{{TestPizzaCutter.project_dir}}')
+    path {{TestPizzaCutter.project_dir}} (1)
+    ...
+
+    >>> # Teardown
+    >>> path_target_dir.rmtree(ignore_errors=True)
+    >>> path_state_dir.rmtree(ignore_errors=True)
+
+    """
+    if target_dir:
+        path_target_dir = pathlib.Path(target_dir).resolve()
+    else:
+        path_target_dir = pathlib.Path.cwd().resolve()
+
+    path_state_dir = build_state.get_path_state_dir(path_target_dir, pathlib.Path(state_dir) if state_dir else None)
+    index = pattern_index.PatternIndex.load(path_state_dir / pattern_index.PATTERN_INDEX_FILENAME)
+
+    if unused:
+        for pattern in index.unused():
+            click.echo(pattern)
+    elif where:
+        usage = index.where(where)
+        for template_path, count in sorted(usage['paths'].items()):
+            click.echo(f'path {template_path} ({count})')
+        for template_path, count in sorted(usage['contents'].items()):
+            click.echo(f'content {template_path} ({count})')
+        for referencing_pattern in usage['references']:
+            click.echo(f'pattern {referencing_pattern}')
+    else:
+        for pattern in sorted(index.paths):
+            click.echo(f'{pattern} : {len(index.paths[pattern])} paths, {len(index.contents[pattern])} contents')
+
+
+def lint(paths: Sequence[str], conf_file: str = '', prefixes: Sequence[str] = (), ignore_dirs: Sequence[str] = (), jobs: Optional[int] = None,
+         output_format: str = 'json') -> int:
+    """ lints existing trees for unfilled or malformed patterns, prints one finding per line and returns the number of findings
+
+    the pattern prefixes are taken from the conf file if given, otherwise the default prefixes are used, plus the prefixes passed
+
+    >>> # Setup
+    >>> path_test_dir = pathlib.Path(__file__).parent.parent.resolve() / 'tests'
+    >>> path_template_dir = path_test_dir / 'pizzacutter_test_template_02'
+
+    >>> # Test
+    >>> lint([str(path_template_dir / '{{TestPizzaCutter.project_dir}}/malformed.txt')], prefixes=['{{TestPizzaCutter'], output_format='text')
+    /...malformed.txt:2:27: malformed pattern "{{TestPizzaCutter.missing_brackets"
+    /...malformed.txt:3:20: unfilled pattern "{{TestPizzaCutter.unfilled_pattern}}"
+    2
+    >>> lint([str(path_template_dir / '{{TestPizzaCutter.project_dir}}/malformed.txt')])
+    0
+
+    """
+    if conf_file:
+        pattern_prefixes = list(get_config.PizzaCutterGetConfig(pizza_cutter_path_conf_file=pathlib.Path(conf_file)).conf.pizzacutter_pattern_prefixes)
+    else:
+        pattern_prefixes = list(PizzaCutterConfigBase().pizzacutter_pattern_prefixes)
+    pattern_prefixes.extend(prefixes)
+
+    n_findings = 0
+    for finding in pizzacutter_lint.lint(paths=paths, pattern_prefixes=pattern_prefixes,
+                                         ignore_dirs=list(pizzacutter_lint.DEFAULT_IGNORE_DIRS) + list(ignore_dirs), jobs=jobs):
+        click.echo(finding.as_json() if output_format == 'json' else finding.as_text())
+        n_findings += 1
+    return n_findings
 
 
 @click.group(help=__init__conf__.title, context_settings=CLICK_CONTEXT_SETTINGS)    # type: ignore
@@ -89,15 +475,209 @@ def cli_info() -> None:
 @click.option('-d', '--dry_run', is_flag=True, help='dry run', default=False)
 @click.option('-o', '--overwrite', is_flag=True, help='allow overwriting of files', default=True)
 @click.option('-w', '--write_outside', is_flag=True, help='allow write outside the project dir', default=False)
+@click.option('-a', '--archive', type=str, help='write into that archive instead of the target directory, "-" for stdout', default='')
+@click.option('--archive_format', type=click.Choice(['zip', 'tar', 'tar.gz', 'tar.bz2', 'tar.xz']),
+              help='the archive format, default: derived from the archive name, or zip', default=None)
+@click.option('-m', '--materialize', type=click.Choice(['copy', 'reflink', 'hardlink']),
+              help='how to materialize verbatim files, reflink and hardlink fall back to copy if not possible. '
+                   'hardlinked targets share the inode with the template file', default=None)
+@click.option('--write_if_changed/--always_write', help='leave target files untouched if the content would not change', default=None)
+@click.option('-r', '--report', is_flag=True, help='print the build report', default=False)
+@click.option('--selective/--full', help='only re-render files whose template, target or pattern values changed since the last build', default=None)
+@click.option('-c', '--compiled', type=click.Path(dir_okay=False, file_okay=True, exists=True, readable=True, resolve_path=True),
+              help='use the compiled template instead of scanning the template', default=None)
+@click.option('--max_render_size', type=int, help='the biggest file rendered in memory in bytes, 0 is unlimited', default=None)
+@click.option('--max_build_memory', type=int, help='the memory (rss) the build should stay in, in bytes, 0 is unlimited', default=None)
+@click.option('--max_include_size', type=int, help='the biggest string pattern value in bytes, 0 is unlimited', default=None)
+@click.option('--oversize_action', type=click.Choice(['stream', 'copy']),
+              help='render oversized files line by line, or copy them verbatim, default: stream', default=None)
+@click.option('--events', type=str, help='write the progress as JSON lines events into that file, or file descriptor number', default='')
+@click.option('--metrics', type=click.Path(dir_okay=False, file_okay=True, exists=False, resolve_path=False),
+              help='write the metrics of the build as OpenMetrics text into that file', default='')
+@click.option('-l', '--layer', type=click.Path(dir_okay=False, file_okay=True, exists=True, readable=True, resolve_path=True), multiple=True,
+              help='the conf file of an overlay template, can be given more than once - later layers take precedence')
+@click.option('--store', type=click.Path(dir_okay=True, file_okay=False, exists=False, resolve_path=False),
+              help='write the contents once into that content store, shared with the builds of other targets, and link the targets from there', default='')
+@click.option('--store_method', type=click.Choice(['reflink', 'hardlink']),
+              help='clone the targets from the content store, or hardlink them read-only, default: reflink', default=None)
+@click.option('--shard', type=str, help='only build that shard of the template files, INDEX/COUNT with the index counting from 1', metavar='INDEX/COUNT',
+              default='')
+@click.option('--report_file', type=click.Path(dir_okay=False, file_okay=True, exists=False, resolve_path=False),
+              help='save the build report as JSON into that file - the reports of the shards can be merged with "merge-reports"', default='')
+@click.option('--output_cache', type=click.Path(dir_okay=True, file_okay=False, exists=False, resolve_path=False),
+              help='take the output from that cache, if a build with the same template, patterns and options was cached - otherwise cache it', default='')
+@click.option('--output_cache_max_size', type=int, help='the size of the output cache in bytes, the least recently used outputs are removed, 0 is unlimited',
+              default=None)
+@click.option('--output_cache_max_entries', type=int, help='the number of outputs in the output cache, the least recently used are removed, 0 is unlimited',
+              default=None)
+@click.option('--only', type=str, multiple=True, metavar='GLOB',
+              help='only build the template objects matching that glob on the template path or the target path, can be given more than once')
+@click.option('--exclude', type=str, multiple=True, metavar='GLOB',
+              help='do not build the template objects matching that glob on the template path or the target path, can be given more than once')
+@click.option('--verbose_diagnostics/--summary_diagnostics', help='log every warning when it happens, default: a summary by kind at the end of the build',
+              default=None)
+@click.option('--journal/--no_journal', help='journal the build in the state directory, so it can be resumed if it is interrupted', default=None)
+@click.option('--resume', is_flag=True, help='continue an interrupted journaled build, the target files it completed are verified and kept', default=False)
+@click.option('-s', '--state_dir', type=click.Path(dir_okay=True, file_okay=False, exists=False, resolve_path=False),
+              help='keep the state of the builds (pattern index, ...) in that directory, default: only if a feature needs it, in the user cache', default='')
 def cli_build(conf_file: str, template_dir: str = '', target_dir: str = '',
-              dry_run: bool = False, overwrite: bool = False, write_outside: bool = False) -> None:
+              dry_run: bool = False, overwrite: bool = False, write_outside: bool = False,
+              archive: str = '', archive_format: Optional[str] = None, materialize: Optional[str] = None, write_if_changed: Optional[bool] = None,
+              report: bool = False, selective: Optional[bool] = None, compiled: Optional[str] = None, max_render_size: Optional[int] = None,
+              max_build_memory: Optional[int] = None, max_include_size: Optional[int] = None, oversize_action: Optional[str] = None,
+              events: str = '', metrics: str = '', layer: Sequence[str] = (), store: str = '', store_method: Optional[str] = None,
+              shard: str = '', report_file: str = '', output_cache: str = '', output_cache_max_size: Optional[int] = None,
+              output_cache_max_entries: Optional[int] = None, only: Sequence[str] = (), exclude: Sequence[str] = (),
+              verbose_diagnostics: Optional[bool] = None, journal: Optional[bool] = None, resume: bool = False, state_dir: str = '') -> None:
     """ build or rebuild from CONF_FILE"""
     build(conf_file=conf_file,
           template_dir=template_dir,
           target_dir=target_dir,
           dry_run=dry_run,
           overwrite=overwrite,
-          write_outside=write_outside)
+          write_outside=write_outside,
+          archive=archive,
+          archive_format=archive_format or '',
+          materialize=materialize,
+          write_if_changed=write_if_changed,
+          report=report,
+          selective=selective,
+          compiled=compiled or '',
+          max_render_size=max_render_size,
+          max_build_memory=max_build_memory,
+          max_include_size=max_include_size,
+          oversize_action=oversize_action,
+          events=events,
+          metrics=metrics,
+          layers=layer,
+          store=store,
+          store_method=store_method,
+          shard=shard,
+          report_file=report_file,
+          output_cache=output_cache,
+          output_cache_max_size=output_cache_max_size,
+          output_cache_max_entries=output_cache_max_entries,
+          only=only,
+          exclude=exclude,
+          verbose_diagnostics=verbose_diagnostics,
+          journal=journal,
+          resume=resume,
+          state_dir=state_dir)
+
+
+@cli_main.command('plan', context_settings=CLICK_CONTEXT_SETTINGS)
+@click.argument('conf_file', type=click.Path(dir_okay=False, file_okay=True, exists=True, readable=True, resolve_path=True))
+@click.option('-p', '--template_dir', type=click.Path(dir_okay=True, file_okay=False, exists=False, resolve_path=False),
+              help='use different template Folder with given CONF_FILE', default='')
+@click.option('-t', '--target_dir', type=click.Path(dir_okay=True, file_okay=False, exists=False, resolve_path=False),
+              help='set target directory, default: current directory', default='')
+@click.option('-o', '--overwrite', is_flag=True, help='allow overwriting of files', default=True)
+@click.option('-w', '--write_outside', is_flag=True, help='allow write outside the project dir', default=False)
+@click.option('-m', '--materialize', type=click.Choice(['copy', 'reflink', 'hardlink']),
+              help='how to materialize verbatim files, reflink and hardlink fall back to copy if not possible. '
+                   'hardlinked targets share the inode with the template file', default=None)
+@click.option('--output', type=click.Path(dir_okay=False, file_okay=True, exists=False, resolve_path=False),
+              help='the plan file, default: pizzacutter_plan.json in the current directory', default='')
+def cli_plan(conf_file: str, template_dir: str = '', target_dir: str = '', overwrite: bool = False, write_outside: bool = False,
+             materialize: Optional[str] = None, output: str = '') -> None:
+    """ plan the build from CONF_FILE, without writing into the target """
+    plan(conf_file=conf_file, template_dir=template_dir, target_dir=target_dir, overwrite=overwrite, write_outside=write_outside,
+         materialize=materialize, output=output)
+
+
+@cli_main.command('apply', context_settings=CLICK_CONTEXT_SETTINGS)
+@click.argument('plan_file', type=click.Path(dir_okay=False, file_okay=True, exists=True, readable=True, resolve_path=True))
+@click.option('-p', '--template_dir', type=click.Path(dir_okay=True, file_okay=False, exists=False, resolve_path=False),
+              help='the template checkout, default: the template directory of the plan', default='')
+@click.option('-t', '--target_dir', type=click.Path(dir_okay=True, file_okay=False, exists=False, resolve_path=False),
+              help='the target directory, default: the target directory of the plan', default='')
+@click.option('-j', '--jobs', type=int, help='number of parallel workers, default: depending on the number of CPUs', default=None)
+@click.option('-r', '--report', is_flag=True, help='print the build report', default=False)
+def cli_apply(plan_file: str, template_dir: str = '', target_dir: str = '', jobs: Optional[int] = None, report: bool = False) -> None:
+    """ apply the build plan PLAN_FILE """
+    apply(plan_file=plan_file, template_dir=template_dir, target_dir=target_dir, jobs=jobs, report=report)
+
+
+@cli_main.command('compile', context_settings=CLICK_CONTEXT_SETTINGS)
+@click.argument('conf_file', type=click.Path(dir_okay=False, file_okay=True, exists=True, readable=True, resolve_path=True))
+@click.option('-p', '--template_dir', type=click.Path(dir_okay=True, file_okay=False, exists=False, resolve_path=False),
+              help='use different template Folder with given CONF_FILE', default='')
+@click.option('-o', '--output', type=click.Path(dir_okay=False, file_okay=True, exists=False, resolve_path=False),
+              help='the compiled template file, default: pizzacutter_compiled.json in the current directory', default='')
+def cli_compile(conf_file: str, template_dir: str = '', output: str = '') -> None:
+    """ validate and compile the template of CONF_FILE, exit code 1 if there are errors """
+    if not compile_template(conf_file=conf_file, template_dir=template_dir, output=output):
+        sys.exit(1)
+
+
+@cli_main.command('render', context_settings=CLICK_CONTEXT_SETTINGS)
+@click.argument('conf_file', type=click.Path(dir_okay=False, file_okay=True, exists=True, readable=True, resolve_path=True))
+@click.argument('file', type=click.Path(dir_okay=False, file_okay=True, exists=False, resolve_path=False))
+@click.option('-p', '--template_dir', type=click.Path(dir_okay=True, file_okay=False, exists=False, resolve_path=False),
+              help='use different template Folder with given CONF_FILE', default='')
+@click.option('-t', '--target_dir', type=click.Path(dir_okay=True, file_okay=False, exists=False, resolve_path=False),
+              help='set target directory, default: the target directory of CONF_FILE, or the current directory', default='')
+@click.option('-c', '--compiled', type=click.Path(dir_okay=False, file_okay=True, exists=True, readable=True, resolve_path=True),
+              help='map the target paths with that compiled template (pizzacutter compile), instead of walking the template', default=None)
+@click.option('-o', '--output', type=click.Path(dir_okay=False, file_okay=True, exists=False, resolve_path=False),
+              help='write the rendered file there, default: stdout', default='')
+def cli_render(conf_file: str, file: str, template_dir: str = '', target_dir: str = '', compiled: Optional[str] = None, output: str = '') -> None:
+    """ render FILE, a template file or the target file of it, without building """
+    render(conf_file=conf_file, file=file, template_dir=template_dir, target_dir=target_dir, compiled=compiled, output=output)
+
+
+@cli_main.command('patterns', context_settings=CLICK_CONTEXT_SETTINGS)
+@click.option('-t', '--target_dir', type=click.Path(dir_okay=True, file_okay=False, exists=False, resolve_path=False),
+              help='the target directory of the build, default: current directory', default='')
+@click.option('-s', '--state_dir', type=click.Path(dir_okay=True, file_okay=False, exists=False, resolve_path=False),
+              help='the state directory of the build, default: derived from the target directory', default='')
+@click.option('-u', '--unused', is_flag=True, help='list the patterns which are not used in the template', default=False)
+@click.option('-w', '--where', type=str, help='list the template objects and patterns which use the pattern KEY', metavar='KEY', default='')
+def cli_patterns(target_dir: str = '', state_dir: str = '', unused: bool = False, where: str = '') -> None:
+    """ report the pattern usage of the last build, without rescanning the template """
+    patterns(target_dir=target_dir, state_dir=state_dir, unused=unused, where=where)
+
+
+@cli_main.command('merge-reports', context_settings=CLICK_CONTEXT_SETTINGS)
+@click.argument('report_files', nargs=-1, required=True, type=click.Path(dir_okay=False, file_okay=True, exists=True, readable=True, resolve_path=True))
+@click.option('-o', '--output', type=click.Path(dir_okay=False, file_okay=True, exists=False, resolve_path=False),
+              help='save the merged report as JSON into that file', default='')
+def cli_merge_reports(report_files: Sequence[str], output: str = '') -> None:
+    """ merge the JSON build reports of all shards of a build, REPORT_FILES from "build --shard INDEX/COUNT --report_file FILE" """
+    merge_reports(report_files=report_files, output=output)
+
+
+@cli_main.command('fleet', context_settings=CLICK_CONTEXT_SETTINGS)
+@click.argument('fleet_file', type=click.Path(dir_okay=False, file_okay=True, exists=True, readable=True, resolve_path=True))
+@click.option('-j', '--jobs', type=int, help='number of builds running at the same time, default: depending on the number of CPUs', default=None)
+@click.option('--processes/--threads', help='run each build in a worker process, fully isolated, default: threads', default=False)
+@click.option('-r', '--report', is_flag=True, help='print the fleet report', default=False)
+def cli_fleet(fleet_file: str, jobs: Optional[int] = None, processes: bool = False, report: bool = False) -> None:
+    """ run the builds of the JSON FLEET_FILE, exit code 1 if a build failed """
+    if not fleet(fleet_file=fleet_file, jobs=jobs, processes=processes, report=report):
+        sys.exit(1)
+
+
+@cli_main.command('gc-store', context_settings=CLICK_CONTEXT_SETTINGS)
+@click.argument('store_dir', type=click.Path(dir_okay=True, file_okay=False, exists=True, resolve_path=True))
+def cli_gc_store(store_dir: str) -> None:
+    """ remove the objects of the content store STORE_DIR which no target refers to anymore """
+    gc_store(store_dir=store_dir)
+
+
+@cli_main.command('lint', context_settings=CLICK_CONTEXT_SETTINGS)
+@click.argument('paths', nargs=-1, required=True, type=click.Path(exists=True, resolve_path=False))
+@click.option('-c', '--conf_file', type=click.Path(dir_okay=False, file_okay=True, exists=True, readable=True, resolve_path=True),
+              help='take the pattern prefixes from that conf file', default=None)
+@click.option('--prefix', 'prefixes', type=str, multiple=True, help='additional pattern prefix to look for, can be given multiple times')
+@click.option('--ignore_dir', 'ignore_dirs', type=str, multiple=True, help='additional directory name not to enter, can be given multiple times')
+@click.option('-j', '--jobs', type=int, help='number of parallel workers, default: depending on the number of CPUs', default=None)
+@click.option('-f', '--format', 'output_format', type=click.Choice(['json', 'text']), help='output format, default: json lines', default='json')
+def cli_lint(paths: Sequence[str], conf_file: Optional[str] = None, prefixes: Sequence[str] = (), ignore_dirs: Sequence[str] = (), jobs: Optional[int] = None,
+             output_format: str = 'json') -> None:
+    """ lint PATHS for unfilled or malformed patterns, exit code 1 if there are findings """
+    if lint(paths=paths, conf_file=conf_file or '', prefixes=prefixes, ignore_dirs=ignore_dirs, jobs=jobs, output_format=output_format):
+        sys.exit(1)
 
 
 # entry point if main
@@ -0,0 +1,94 @@
+# STDLIB
+import json
+import logging
+import os
+import time
+from typing import Any, Optional, TextIO
+
+# OWN
+import pathlib3x as pathlib
+
+
+class BuildEventStream(object):
+    """
+    writes the progress of a build as JSON lines : one object per event, with the name of the event, the time and the details.
+    events are : build_started, file_written, file_skipped, warning, phase_finished, build_finished
+
+    >>> import io
+    >>> f_events = io.StringIO()
+    >>> event_stream = BuildEventStream(f_events)
+    >>> event_stream.emit('file_written', target='test.txt', method='render', bytes=10, seconds=0.001)
+    >>> event = json.loads(f_events.getvalue())
+    >>> event['event'], event['target'], event['bytes']
+    ('file_written', 'test.txt', 10)
+    >>> assert event['time'] > 0
+
+    """
+
+    def __init__(self, f_events: TextIO, close_file: bool = False) -> None:
+        self.f_events = f_events
+        self.close_file = close_file
+
+    @classmethod
+    def open(cls, events: str) -> 'BuildEventStream':
+        """
+        open the event stream : a number is a file descriptor which is already open (and stays open), anything else a file which is (re)created
+
+        >>> # Setup
+        >>> path_events_file = pathlib.Path(__file__).parent.parent.parent.resolve() / 'tests' / 'test_build_events.jsonl'
+
+        >>> # Test
+        >>> event_stream = BuildEventStream.open(str(path_events_file))
+        >>> event_stream.emit('build_started')
+        >>> event_stream.close()
+        >>> json.loads(path_events_file.read_text())['event']
+        'build_started'
+
+        >>> # Teardown
+        >>> path_events_file.unlink()
+
+        """
+        if events.isdigit():
+            return cls(os.fdopen(int(events), 'w', encoding='utf-8', closefd=False), close_file=True)
+        path_events_file = pathlib.Path(events)
+        path_events_file.parent.mkdir(parents=True, exist_ok=True)
+        return cls(open(str(path_events_file), 'w', encoding='utf-8'), close_file=True)
+
+    def emit(self, event: str, **details: Any) -> None:
+        details = {'event': event, 'time': time.time(), **details}
+        # one write per event, and flushed - so consumers tailing the stream see complete lines
+        self.f_events.write(json.dumps(details, default=str) + '\n')
+        self.f_events.flush()
+
+    def close(self) -> None:
+        if self.close_file:
+            self.f_events.close()
+
+
+class BuildEventLogHandler(logging.Handler):
+    """
+    forwards the warnings logged during a build into the event stream
+
+    >>> import io
+    >>> f_events = io.StringIO()
+    >>> handler = BuildEventLogHandler(BuildEventStream(f_events))
+    >>> test_logger = logging.getLogger('test_build_events')
+    >>> test_logger.addHandler(handler)
+    >>> test_logger.warning('something to look at')
+    >>> test_logger.removeHandler(handler)
+    >>> json.loads(f_events.getvalue())['message']
+    'something to look at'
+
+    """
+
+    def __init__(self, event_stream: BuildEventStream, level: int = logging.WARNING) -> None:
+        super().__init__(level=level)
+        self.event_stream = event_stream
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.event_stream.emit('warning', level=record.levelname, message=record.getMessage())
+
+
+def get_event_stream(events: Optional[str]) -> Optional[BuildEventStream]:
+    """ the event stream for a file name or file descriptor, None if no events are wanted """
+    return BuildEventStream.open(events) if events else None
@@ -0,0 +1,139 @@
+# STDLIB
+import json
+import time
+from typing import Any, Dict, List, Optional, TextIO
+
+# OWN
+import pathlib3x as pathlib
+
+# the filename of the build journal in the state directory
+BUILD_JOURNAL_FILENAME = 'build_journal.jsonl'
+# a target file written by a build might have an mtime up to that much before the start of the build
+MTIME_GRANULARITY_NS = 1000000000
+
+
+class BuildJournal(object):
+    """
+    a write-ahead journal of a build, in the state directory : the first line is the build - the settings digest and when it started -
+    then one line per target file the build completed, with its build manifest record. the lines are appended in batches, after batch_size
+    records or after max_delay seconds, so the journal costs a write per batch, not per file. the build manifest is only saved when
+    a build finished - if a build is interrupted (CI timeout, OOM kill), the journal tells the next build with resume=True which targets
+    are complete, at most the last batch is lost. a finished build removes its journal.
+
+    >>> # Setup
+    >>> path_test_dir = pathlib.Path(__file__).parent.parent.parent.resolve() / 'tests'
+    >>> path_journal_file = path_test_dir / 'test_build_journal' / BUILD_JOURNAL_FILENAME
+    >>> record = {'target': '/project/test.txt', 'target_stat': [4, 1]}
+
+    >>> # Test the records are written in batches
+    >>> build_journal = BuildJournal(path_journal_file, settings_digest='test', batch_size=2)
+    >>> build_journal.start()
+    >>> build_journal.add_record('{{p.name}}/test01.txt', record)
+    >>> len(path_journal_file.read_text().splitlines())
+    1
+    >>> build_journal.add_record('{{p.name}}/test02.txt', record)
+    >>> len(path_journal_file.read_text().splitlines())
+    3
+
+    >>> # Test an interrupted build - a partly written last line is ignored
+    >>> build_journal.add_record('{{p.name}}/test03.txt', record)
+    >>> build_journal.close()
+    >>> with open(str(path_journal_file), 'a') as f_journal:
+    ...     _ = f_journal.write('{"template": "{{p.name}}/tes')
+    >>> resumed_journal = BuildJournal(path_journal_file, settings_digest='test')
+    >>> sorted(resumed_journal.load())
+    ['{{p.name}}/test01.txt', '{{p.name}}/test02.txt', '{{p.name}}/test03.txt']
+    >>> assert resumed_journal.started == build_journal.started
+
+    >>> # Test a journal of a build with other settings is not resumed
+    >>> BuildJournal(path_journal_file, settings_digest='other').load()
+    {}
+
+    >>> # Test a finished build removes the journal
+    >>> resumed_journal.start(resume=True)
+    >>> resumed_journal.remove()
+    >>> path_journal_file.exists()
+    False
+
+    >>> # Teardown
+    >>> path_journal_file.parent.rmtree()
+
+    """
+
+    def __init__(self, path_journal_file: pathlib.Path, settings_digest: str = '', batch_size: int = 64, max_delay: float = 1.0) -> None:
+        self.path_journal_file = pathlib.Path(path_journal_file)
+        self.settings_digest = settings_digest
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        # when the build of the journal started, in ns - the build which was interrupted, if it is resumed
+        self.started = 0
+        self.lines: List[str] = list()
+        self.last_flush = 0.0
+        self.f_journal: Optional[TextIO] = None
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """ the build manifest records of the target files a journaled build completed, by template path - empty if there is no journal of that build """
+        records: Dict[str, Dict[str, Any]] = dict()
+        try:
+            lines = self.path_journal_file.read_text(encoding='utf-8').splitlines()
+        except OSError:
+            return records
+        try:
+            header = json.loads(lines[0])
+        except (IndexError, ValueError):
+            return records
+        if header.get('version') != 1 or header.get('settings_digest') != self.settings_digest:
+            return records
+        self.started = header['started']
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # a line the build did not finish, when it was interrupted
+                continue
+            records[entry['template']] = entry['record']
+        return records
+
+    def start(self, resume: bool = False) -> None:
+        """ start the journal of a build - a resumed build appends to the journal of the interrupted build, loaded before """
+        self.path_journal_file.parent.mkdir(parents=True, exist_ok=True)
+        if resume and self.started:
+            self.f_journal = open(str(self.path_journal_file), 'a', encoding='utf-8')
+            # a line the interrupted build did not finish must not be continued
+            self.f_journal.write('\n')
+        else:
+            self.started = time.time_ns()
+            self.f_journal = open(str(self.path_journal_file), 'w', encoding='utf-8')
+            self.f_journal.write(json.dumps({'version': 1, 'settings_digest': self.settings_digest, 'started': self.started}) + '\n')
+        self.f_journal.flush()
+        self.last_flush = time.perf_counter()
+
+    def add_record(self, template_path: str, record: Dict[str, Any]) -> None:
+        """ a target file is complete - the record is written with the next batch """
+        if self.f_journal is None:
+            return
+        self.lines.append(json.dumps({'template': template_path, 'record': record}) + '\n')
+        if len(self.lines) >= self.batch_size or time.perf_counter() - self.last_flush >= self.max_delay:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.f_journal is None:
+            return
+        if self.lines:
+            self.f_journal.write(''.join(self.lines))
+            self.lines = list()
+        self.f_journal.flush()
+        self.last_flush = time.perf_counter()
+
+    def close(self) -> None:
+        """ write the records not written yet - for a build which stops with an error, so it can be resumed """
+        self.flush()
+        if self.f_journal is not None:
+            self.f_journal.close()
+            self.f_journal = None
+
+    def remove(self) -> None:
+        """ the build finished and saved its build manifest, the journal is not needed anymore """
+        self.lines = list()
+        self.close()
+        self.path_journal_file.unlink(missing_ok=True)
@@ -0,0 +1,152 @@
+# STDLIB
+import hashlib
+import json
+import os
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple, Union
+
+# OWN
+import pathlib3x as pathlib
+
+# the filename of the build manifest in the state directory
+BUILD_MANIFEST_FILENAME = 'build_manifest.json'
+
+
+def get_patterns_digest(patterns: Mapping[str, Union[str, pathlib.Path]], pattern_keys: Iterable[str]) -> str:
+    """
+    the digest of the (resolved) values of the given pattern keys - string and pathlib patterns with the same text differ,
+    because they are replaced differently. keys which are not (or no more) defined are part of the digest as well.
+
+    >>> patterns = {'{{p.name}}': 'name', '{{p.version}}': '1.0', '{{p.path}}': pathlib.Path('1.0')}
+    >>> digest = get_patterns_digest(patterns, ['{{p.name}}'])
+    >>> assert digest == get_patterns_digest({'{{p.name}}': 'name'}, ['{{p.name}}'])
+    >>> assert digest != get_patterns_digest({'{{p.name}}': 'other name'}, ['{{p.name}}'])
+    >>> assert digest != get_patterns_digest({}, ['{{p.name}}'])
+    >>> assert get_patterns_digest(patterns, ['{{p.version}}']) != get_patterns_digest({'{{p.version}}': pathlib.Path('1.0')}, ['{{p.version}}'])
+
+    """
+    hash_patterns = hashlib.sha256()
+    for pattern_key in sorted(pattern_keys):
+        replacement = patterns.get(pattern_key)
+        if replacement is None:
+            kind = 'undefined'
+        elif isinstance(replacement, str):
+            kind = 'str'
+        else:
+            kind = 'path'
+        hash_patterns.update(f'{pattern_key}\0{kind}\0{replacement}\0'.encode('utf-8'))
+    return hash_patterns.hexdigest()
+
+
+def get_stat_signature(path_object: pathlib.Path) -> Optional[Tuple[int, int]]:
+    """ (size, mtime_ns) of a file, None if it does not exist """
+    try:
+        stat_result = os.stat(str(path_object))
+    except OSError:
+        return None
+    return stat_result.st_size, stat_result.st_mtime_ns
+
+
+class BuildManifest(object):
+    """
+    records per template file what was written to the target : the target path, the pattern keys the file depends on in the path and
+    in the content (with counts), the digest of their values, and the stat signatures of the template file and of the target file.
+    with that, the next build can skip files whose template, dependencies and target did not change - without reading them.
+
+    >>> # Setup
+    >>> path_test_dir = pathlib.Path(__file__).parent.parent.parent.resolve() / 'tests'
+    >>> path_manifest_file = path_test_dir / 'test_build_manifest/build_manifest.json'
+    >>> path_source_file = path_test_dir / 'txt_file_input.txt'
+    >>> patterns = {'{{p.name}}': 'name', '{{p.version}}': '1.0'}
+    >>> build_manifest = BuildManifest(settings_digest='test')
+    >>> build_manifest.add_file('{{p.name}}/test.txt', path_source_file, path_source_file, patterns, {'{{p.name}}': 1}, {'{{p.version}}': 2})
+    >>> build_manifest.save(path_manifest_file)
+
+    >>> # Test up to date
+    >>> previous_manifest = BuildManifest.load(path_manifest_file, settings_digest='test')
+    >>> record = previous_manifest.get_up_to_date_record('{{p.name}}/test.txt', path_source_file, patterns)
+    >>> record['content_patterns']
+    {'{{p.version}}': 2}
+
+    >>> # Test changed pattern value
+    >>> previous_manifest.get_up_to_date_record('{{p.name}}/test.txt', path_source_file, {'{{p.name}}': 'name', '{{p.version}}': '2.0'})
+
+    >>> # Test unknown template file
+    >>> previous_manifest.get_up_to_date_record('{{p.name}}/other.txt', path_source_file, patterns)
+
+    >>> # Test changed settings - the previous manifest is not used
+    >>> BuildManifest.load(path_manifest_file, settings_digest='other').files
+    {}
+
+    >>> # Teardown
+    >>> path_manifest_file.parent.rmtree()
+
+    """
+
+    def __init__(self, settings_digest: str = '') -> None:
+        # the digest of the build settings which affect all files (options, materialize method, ...)
+        self.settings_digest = settings_digest
+        # template path -> record
+        self.files: Dict[str, Dict[str, Any]] = dict()
+
+    def add_file(self, template_path: str, path_source_file: pathlib.Path, path_target_file: pathlib.Path,
+                 patterns: Mapping[str, Union[str, pathlib.Path]], path_patterns: Dict[str, int], content_patterns: Dict[str, int]) -> None:
+        """ record a template file which was just written to the target """
+        self.files[template_path] = {'target': str(path_target_file),
+                                     'template_stat': get_stat_signature(path_source_file),
+                                     'target_stat': get_stat_signature(path_target_file),
+                                     'path_patterns': path_patterns,
+                                     'content_patterns': content_patterns,
+                                     'digest': get_patterns_digest(patterns, set(path_patterns) | set(content_patterns))}
+
+    def add_record(self, template_path: str, record: Dict[str, Any]) -> None:
+        """ carry over the record of a file which was up to date """
+        self.files[template_path] = record
+
+    def get_up_to_date_record(self, template_path: str, path_source_file: pathlib.Path,
+                              patterns: Mapping[str, Union[str, pathlib.Path]]) -> Optional[Dict[str, Any]]:
+        """
+        the record of the template file, if the target file is up to date :
+        the template file and the target file did not change since the last build, and the values of the patterns it depends on are the same
+        """
+        record = self.files.get(template_path)
+        if record is None:
+            return None
+        if record['digest'] != get_patterns_digest(patterns, set(record['path_patterns']) | set(record['content_patterns'])):
+            return None
+        if self.stat_changed(record['template_stat'], path_source_file) or self.stat_changed(record['target_stat'], pathlib.Path(record['target'])):
+            return None
+        return record
+
+    @staticmethod
+    def stat_changed(stat_signature: Optional[Any], path_object: pathlib.Path) -> bool:
+        # after a JSON roundtrip the stat signature is a list
+        return stat_signature is None or tuple(stat_signature) != get_stat_signature(path_object)
+
+    def remove_stale_target(self, template_path: str) -> bool:
+        """
+        removes the target file of a record, if it was not changed since it was written by the last build -
+        used for targets which were renamed by a changed path pattern, or whose template file was removed.
+        returns True if the stale target was removed
+        """
+        record = self.files[template_path]
+        path_target_file = pathlib.Path(record['target'])
+        if self.stat_changed(record['target_stat'], path_target_file):
+            return False
+        path_target_file.unlink()
+        return True
+
+    def save(self, path_manifest_file: pathlib.Path) -> None:
+        path_manifest_file.parent.mkdir(parents=True, exist_ok=True)
+        data = {'version': 1, 'settings_digest': self.settings_digest, 'files': self.files}
+        path_manifest_file.write_text(json.dumps(data, indent=1, sort_keys=True), encoding='utf-8')
+
+    @classmethod
+    def load(cls, path_manifest_file: pathlib.Path, settings_digest: str) -> 'BuildManifest':
+        """ load the manifest of the last build - an empty manifest, if there is none, or if it was built with different settings """
+        build_manifest = cls(settings_digest=settings_digest)
+        if not path_manifest_file.is_file():
+            return build_manifest
+        data = json.loads(path_manifest_file.read_text(encoding='utf-8'))
+        if data.get('version') == 1 and data.get('settings_digest') == settings_digest:
+            build_manifest.files = data['files']
+        return build_manifest
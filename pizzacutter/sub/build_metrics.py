@@ -0,0 +1,148 @@
+# STDLIB
+import bisect
+from typing import Dict, List, Sequence
+
+# OWN
+import pathlib3x as pathlib
+
+# PROJ
+try:
+    from . import build_report
+except (ImportError, ModuleNotFoundError):  # pragma: no cover
+    # imports for doctest
+    import build_report                     # type: ignore  # pragma: no cover
+
+# the bucket limits of the file histograms
+FILE_SECONDS_BUCKETS = (0.0001, 0.001, 0.01, 0.1, 1.0, 10.0)
+FILE_BYTES_BUCKETS = (1024, 16384, 131072, 1048576, 16777216, 268435456)
+
+# the methods of the build report, with the attributes they are counted in
+REPORT_METHODS = (('render', 'rendered'), ('reflink', 'cloned'), ('hardlink', 'linked'), ('copy', 'copied'),
+                  ('unchanged', 'unchanged'), ('up_to_date', 'up_to_date'), ('stream', 'streamed'))
+
+
+class Histogram(object):
+    """
+    a cumulative histogram like OpenMetrics exposes it
+
+    >>> histogram = Histogram([1, 10])
+    >>> for value in (0.5, 5, 50):
+    ...     histogram.observe(value)
+    >>> histogram.as_openmetrics('test')
+    ['test_bucket{le="1"} 1', 'test_bucket{le="10"} 2', 'test_bucket{le="+Inf"} 3', 'test_sum 55.5', 'test_count 3']
+
+    """
+
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self.buckets = list(buckets)
+        # the last count is for the values above the highest bucket
+        self.counts: List[int] = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def as_openmetrics(self, name: str) -> List[str]:
+        lines: List[str] = list()
+        cumulative_count = 0
+        for bucket, count in zip(self.buckets, self.counts):
+            cumulative_count += count
+            lines.append(f'{name}_bucket{{le="{bucket:g}"}} {cumulative_count}')
+        lines.append(f'{name}_bucket{{le="+Inf"}} {self.count}')
+        lines.append(f'{name}_sum {self.sum:g}')
+        lines.append(f'{name}_count {self.count}')
+        return lines
+
+
+class BuildMetrics(object):
+    """
+    the metrics of a build, exported as OpenMetrics text : the counters of the build report, histograms of the duration and the size of
+    the files written, the duration of the build phases, the throughput and the hit rates of the caches (selective rebuild, write_if_changed)
+
+    >>> # Setup
+    >>> report = build_report.BuildReport()
+    >>> report.add_file(method='render', size=100)
+    >>> report.add_file(method='up_to_date', size=100)
+    >>> metrics = BuildMetrics()
+    >>> metrics.observe_file(size=100, seconds=0.002)
+    >>> metrics.phase_seconds['render'] = 0.5
+
+    >>> # Test
+    >>> text = metrics.as_openmetrics(report)
+    >>> print(text)
+    # TYPE pizzacutter_files counter
+    # HELP pizzacutter_files files handled by the build, by method
+    pizzacutter_files_total{method="render"} 1
+    ...
+    pizzacutter_file_seconds_bucket{le="0.01"} 1
+    ...
+    pizzacutter_phase_seconds{phase="render"} 0.5
+    # TYPE pizzacutter_files_per_second gauge
+    ...
+    pizzacutter_cache_hit_ratio{cache="selective_rebuild"} 0.5
+    ...
+    # EOF
+    >>> assert text.endswith('# EOF\\n')
+
+    """
+
+    def __init__(self) -> None:
+        self.file_seconds = Histogram(FILE_SECONDS_BUCKETS)
+        self.file_bytes = Histogram(FILE_BYTES_BUCKETS)
+        # phase -> seconds
+        self.phase_seconds: Dict[str, float] = dict()
+
+    def observe_file(self, size: int, seconds: float) -> None:
+        self.file_seconds.observe(seconds)
+        self.file_bytes.observe(size)
+
+    def as_openmetrics(self, report: build_report.BuildReport) -> str:
+        lines = ['# TYPE pizzacutter_files counter', '# HELP pizzacutter_files files handled by the build, by method']
+        lines.extend(f'pizzacutter_files_total{{method="{method}"}} {getattr(report, "files_" + name)}' for method, name in REPORT_METHODS)
+        lines.extend(['# TYPE pizzacutter_bytes counter', '# HELP pizzacutter_bytes bytes handled by the build, by method'])
+        lines.extend(f'pizzacutter_bytes_total{{method="{method}"}} {getattr(report, "bytes_" + name)}' for method, name in REPORT_METHODS)
+        lines.extend(['# TYPE pizzacutter_directories_created counter', f'pizzacutter_directories_created_total {report.directories_created}',
+                      '# TYPE pizzacutter_files_removed counter', f'pizzacutter_files_removed_total {report.files_removed}'])
+
+        lines.extend(['# TYPE pizzacutter_file_seconds histogram', '# HELP pizzacutter_file_seconds the time to write a file',
+                      '# UNIT pizzacutter_file_seconds seconds'])
+        lines.extend(self.file_seconds.as_openmetrics('pizzacutter_file_seconds'))
+        lines.extend(['# TYPE pizzacutter_file_bytes histogram', '# HELP pizzacutter_file_bytes the size of the files written',
+                      '# UNIT pizzacutter_file_bytes bytes'])
+        lines.extend(self.file_bytes.as_openmetrics('pizzacutter_file_bytes'))
+
+        lines.extend(['# TYPE pizzacutter_phase_seconds gauge', '# HELP pizzacutter_phase_seconds the duration of the build phases',
+                      '# UNIT pizzacutter_phase_seconds seconds'])
+        lines.extend(f'pizzacutter_phase_seconds{{phase="{phase}"}} {seconds:g}' for phase, seconds in self.phase_seconds.items())
+        if report.peak_rss_by_phase:
+            lines.extend(['# TYPE pizzacutter_peak_rss_bytes gauge', '# UNIT pizzacutter_peak_rss_bytes bytes'])
+            lines.extend(f'pizzacutter_peak_rss_bytes{{phase="{phase}"}} {peak_rss}' for phase, peak_rss in report.peak_rss_by_phase.items())
+
+        render_seconds = self.phase_seconds.get('render', 0.0)
+        lines.extend(['# TYPE pizzacutter_files_per_second gauge', f'pizzacutter_files_per_second {get_ratio(self.file_bytes.count, render_seconds):g}',
+                      '# TYPE pizzacutter_bytes_per_second gauge', f'pizzacutter_bytes_per_second {get_ratio(self.file_bytes.sum, render_seconds):g}'])
+
+        files_handled = sum(getattr(report, 'files_' + name) for _, name in REPORT_METHODS)
+        lines.extend(['# TYPE pizzacutter_cache_hit_ratio gauge', '# HELP pizzacutter_cache_hit_ratio the share of files the cache saved a write for',
+                      f'pizzacutter_cache_hit_ratio{{cache="selective_rebuild"}} {get_ratio(report.files_up_to_date, files_handled):g}',
+                      f'pizzacutter_cache_hit_ratio{{cache="write_if_changed"}} {get_ratio(report.files_unchanged, files_handled):g}',
+                      '# EOF'])
+        return '\n'.join(lines) + '\n'
+
+    def save(self, path_metrics_file: pathlib.Path, report: build_report.BuildReport) -> None:
+        path_metrics_file.parent.mkdir(parents=True, exist_ok=True)
+        path_metrics_file.write_text(self.as_openmetrics(report), encoding='utf-8')
+
+
+def get_ratio(numerator: float, denominator: float) -> float:
+    """
+    >>> get_ratio(1, 4)
+    0.25
+    >>> get_ratio(1, 0)
+    0.0
+
+    """
+    return numerator / denominator if denominator else 0.0
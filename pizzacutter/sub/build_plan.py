@@ -0,0 +1,178 @@
+# STDLIB
+import concurrent.futures
+import json
+import os
+from typing import Any, Dict, List, Mapping, Optional, Tuple, Union
+
+# OWN
+import pathlib3x as pathlib
+
+# PROJ
+try:
+    from . import build_report
+    from . import output_sinks
+    from . import renderer
+except (ImportError, ModuleNotFoundError):  # pragma: no cover
+    # imports for doctest
+    import build_report                     # type: ignore  # pragma: no cover
+    import output_sinks                     # type: ignore  # pragma: no cover
+    import renderer                         # type: ignore  # pragma: no cover
+
+# the operations of a build plan
+PLAN_OPERATIONS = ('mkdir', 'render', 'materialize', 'skip')
+
+
+class BuildPlan(object):
+    """
+    the serializable list of filesystem operations of a build : mkdir, render a template file to a target with the resolved patterns,
+    materialize (copy, clone or link) a verbatim file, or skip an object with the reason. it carries the resolved patterns and the options,
+    so it can be reviewed, cached and applied on another machine with the same template checkout, without the conf file.
+    targets inside the target directory are stored relative to it.
+
+    >>> # Setup
+    >>> plan = BuildPlan(path_template_dir='/template', path_target_dir='/target', patterns={'{{p.name}}': 'test', '{{p.path}}': pathlib.Path('/out')},
+    ...                  options={'delete_line_if_empty': '{{p.option.delete_line_if_empty}}'})
+    >>> plan.add_mkdir('{{p.name}}', pathlib.Path('/target/test'))
+    >>> plan.add_render('{{p.name}}/test.txt', pathlib.Path('/target/test/test.txt'), pattern_keys=['{{p.name}}'])
+    >>> plan.add_materialize('{{p.name}}/logo.png', pathlib.Path('/target/test/logo.png'), no_overwrite=True)
+    >>> plan.add_skip('{{p.path}}/test.txt', pathlib.Path('/out/test.txt'), 'outside project directory not allowed')
+
+    >>> # Test
+    >>> print(plan.as_text())
+    mkdir       test
+    render      test/test.txt  <-  {{p.name}}/test.txt
+    materialize test/logo.png  <-  {{p.name}}/logo.png
+    skip        /out/test.txt : outside project directory not allowed
+    >>> plan.get_patterns()['{{p.path}}']
+    <BLANKLINE>
+    ...Path('/out')
+    >>> plan.add_operation('delete', 'test', pathlib.Path('/target/test'))
+    Traceback (most recent call last):
+    ...
+    ValueError: unknown plan operation "delete"
+
+    """
+
+    def __init__(self, path_template_dir: str = '', path_target_dir: str = '', patterns: Optional[Mapping[str, Union[str, pathlib.Path]]] = None,
+                 options: Optional[Mapping[str, str]] = None, materialize: str = 'copy') -> None:
+        self.path_template_dir = path_template_dir
+        self.path_target_dir = path_target_dir
+        # the resolved patterns, as [type, value] - type is 'str' or 'path'
+        self.patterns: Dict[str, List[str]] = dict()
+        self.set_patterns(patterns or dict())
+        self.options: Dict[str, str] = dict(options or dict())
+        self.materialize = materialize
+        self.operations: List[Dict[str, Any]] = list()
+
+    def set_patterns(self, patterns: Mapping[str, Union[str, pathlib.Path]]) -> None:
+        self.patterns = {pattern: ['str' if isinstance(replacement, str) else 'path', str(replacement)] for pattern, replacement in patterns.items()}
+
+    def get_patterns(self) -> Dict[str, Union[str, pathlib.Path]]:
+        return {pattern: (value if kind == 'str' else pathlib.Path(value)) for pattern, (kind, value) in self.patterns.items()}
+
+    def get_target_name(self, path_target_object: pathlib.Path) -> str:
+        """ targets inside the target directory are stored relative to it, with forward slashes """
+        str_target = str(path_target_object)
+        prefix = os.path.join(self.path_target_dir, '')
+        if str_target.startswith(prefix):
+            return str_target[len(prefix):].replace(os.sep, '/')
+        return str_target
+
+    def get_path_target_object(self, target_name: str, path_target_dir: pathlib.Path) -> pathlib.Path:
+        if os.path.isabs(target_name):
+            return pathlib.Path(target_name)
+        return path_target_dir / target_name
+
+    def add_operation(self, operation: str, template_path: str, path_target_object: pathlib.Path, **details: Any) -> None:
+        if operation not in PLAN_OPERATIONS:
+            raise ValueError(f'unknown plan operation "{operation}"')
+        self.operations.append(dict(op=operation, source=template_path, target=self.get_target_name(path_target_object), **details))
+
+    def add_mkdir(self, template_path: str, path_target_dir: pathlib.Path) -> None:
+        self.add_operation('mkdir', template_path, path_target_dir)
+
+    def add_render(self, template_path: str, path_target_file: pathlib.Path, pattern_keys: List[str], no_overwrite: bool = False) -> None:
+        """ pattern_keys are the patterns used in the content - for the review, rendering uses the pattern set of the plan """
+        self.add_operation('render', template_path, path_target_file, patterns=pattern_keys, no_overwrite=no_overwrite)
+
+    def add_materialize(self, template_path: str, path_target_file: pathlib.Path, no_overwrite: bool = False) -> None:
+        self.add_operation('materialize', template_path, path_target_file, no_overwrite=no_overwrite)
+
+    def add_skip(self, template_path: str, path_target_object: pathlib.Path, reason: str) -> None:
+        self.add_operation('skip', template_path, path_target_object, reason=reason)
+
+    def as_text(self) -> str:
+        lines: List[str] = list()
+        for operation in self.operations:
+            if operation['op'] == 'mkdir':
+                lines.append(f'mkdir       {operation["target"]}')
+            elif operation['op'] == 'skip':
+                lines.append(f'skip        {operation["target"]} : {operation["reason"]}')
+            else:
+                lines.append(f'{operation["op"]:<11} {operation["target"]}  <-  {operation["source"]}')
+        return '\n'.join(lines)
+
+    def save(self, path_plan_file: pathlib.Path) -> None:
+        path_plan_file.parent.mkdir(parents=True, exist_ok=True)
+        data = {'version': 1, 'path_template_dir': self.path_template_dir, 'path_target_dir': self.path_target_dir, 'patterns': self.patterns,
+                'options': self.options, 'materialize': self.materialize, 'operations': self.operations}
+        path_plan_file.write_text(json.dumps(data, indent=1), encoding='utf-8')
+
+    @classmethod
+    def load(cls, path_plan_file: pathlib.Path) -> 'BuildPlan':
+        data = json.loads(pathlib.Path(path_plan_file).read_text(encoding='utf-8'))
+        if data.get('version') != 1:
+            raise ValueError(f'unsupported build plan version "{data.get("version")}" in "{path_plan_file}"')
+        plan = cls(path_template_dir=data['path_template_dir'], path_target_dir=data['path_target_dir'], options=data['options'],
+                   materialize=data['materialize'])
+        plan.patterns = data['patterns']
+        plan.operations = data['operations']
+        return plan
+
+
+def apply_plan(plan: BuildPlan, path_template_dir: Optional[pathlib.Path] = None, path_target_dir: Optional[pathlib.Path] = None,
+               jobs: Optional[int] = None) -> build_report.BuildReport:
+    """
+    executes a build plan : all directories are created first, each one once, parents first - then the file operations run in parallel,
+    they are independent of each other. the template and the target directory of the plan can be overridden, for instance on another machine.
+    objects with the option "object_no_overwrite" are skipped if they were created since the plan was made.
+    the hooks of the conf file are not run.
+    """
+    path_template_dir = pathlib.Path(path_template_dir or plan.path_template_dir)
+    path_target_dir = pathlib.Path(path_target_dir or plan.path_target_dir)
+    report = build_report.BuildReport()
+
+    directories = set()
+    file_operations: List[Dict[str, Any]] = list()
+    for operation in plan.operations:
+        if operation['op'] == 'mkdir':
+            directories.add(str(plan.get_path_target_object(operation['target'], path_target_dir)))
+        elif operation['op'] in ('render', 'materialize'):
+            file_operations.append(operation)
+            directories.add(os.path.dirname(str(plan.get_path_target_object(operation['target'], path_target_dir))))
+
+    for directory in sorted(directories, key=lambda str_path: (str_path.count(os.sep), str_path)):
+        if not os.path.isdir(directory):
+            os.makedirs(directory, exist_ok=True)
+            report.directories_created += 1
+
+    template_renderer = renderer.Renderer(plan.get_patterns(), plan.options)
+    sink = output_sinks.FileSystemSink(make_parents=False)
+
+    def apply_file_operation(operation: Dict[str, Any]) -> Optional[Tuple[str, int]]:
+        path_source_file = path_template_dir / operation['source']
+        path_target_file = plan.get_path_target_object(operation['target'], path_target_dir)
+        if operation['no_overwrite'] and path_target_file.exists():
+            return None
+        if operation['op'] == 'render':
+            content = template_renderer.render(path_source_file.read_bytes())
+            sink.write_file(path_target_file, content, path_source_file)
+            return 'render', len(content)
+        method = sink.materialize_file(path_source_file, path_target_file, plan.materialize)
+        return method, path_target_file.stat().st_size
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+        for result in executor.map(apply_file_operation, file_operations):
+            if result is not None:
+                report.add_file(method=result[0], size=result[1])
+    return report
@@ -0,0 +1,231 @@
+# STDLIB
+import json
+from typing import Any, Dict, List
+
+# OWN
+import pathlib3x as pathlib
+
+
+class BuildReport(object):
+    """
+    the statistics of a build
+
+    >>> report = BuildReport()
+    >>> report.add_file(method='render', size=100)
+    >>> report.add_file(method='reflink', size=1000)
+    >>> report.add_file(method='copy', size=10)
+    >>> report.add_file(method='unchanged', size=20)
+    >>> report.add_file(method='up_to_date', size=30)
+    >>> report.add_file(method='stream', size=5000)
+    >>> report.oversize_decisions['big.txt'] = 'stream'
+    >>> report.directories_created = 2
+    >>> print(report.as_text())
+    PizzaCutter build report:
+        directories created : 2
+        files rendered      : 1 (100 bytes)
+        files cloned        : 1 (1000 bytes)
+        files hardlinked    : 0 (0 bytes)
+        files copied        : 1 (10 bytes)
+        files unchanged     : 1 (20 bytes)
+        files up to date    : 1 (30 bytes)
+        files streamed      : 1 (5000 bytes)
+        stale files removed : 0
+        files postprocessed : 0
+        oversize files      : 1 (1 streamed, 0 copied verbatim)
+
+    >>> report.peak_rss_by_phase['render'] = 2048
+    >>> report.memory_budget_exceeded = True
+    >>> report.lazy_patterns_computed = 1
+    >>> report.store_objects_written, report.store_bytes_written, report.store_objects_reused = 1, 100, 2
+    >>> report.output_cache_hits = 1
+    >>> report.add_unfilled_patterns('/target/test.txt', ['unfilled pattern "{{p.unfilled}}"'])
+    >>> report.shards.append('1/2')
+    >>> report.file_layers.update({'{{p.name}}/setup.py': '/template_base', '{{p.name}}/.gitlab-ci.yml': '/template_ci'})
+    >>> print(report.as_text())
+    PizzaCutter build report:
+    ...
+        lazy patterns       : 1 computed, 0 cached
+        content store       : 1 objects written (100 bytes), 2 reused
+        output cache        : 1 hits, 0 misses
+        unfilled patterns   : 1 in 1 objects
+        shards              : 1/2
+        layer files         : 1 from "/template_base"
+        layer files         : 1 from "/template_ci"
+    ...
+        peak rss render     : 2048 bytes
+        memory budget       : exceeded
+
+    >>> # Test add the report of another build
+    >>> total = BuildReport()
+    >>> total.add_report(report)
+    >>> total.add_report(report)
+    >>> total.files_rendered, total.bytes_cloned, total.peak_rss_by_phase, total.memory_budget_exceeded, len(total.file_layers)
+    (2, 2000, {'render': 2048}, True, 2)
+    >>> total.shards
+    ['1/2', '1/2']
+
+    >>> report.add_file(method='unknown', size=10)
+    Traceback (most recent call last):
+    ...
+    ValueError: unknown method "unknown"
+
+    """
+
+    def __init__(self) -> None:
+        self.directories_created = 0
+        # rendered files, written from memory
+        self.files_rendered = 0
+        self.bytes_rendered = 0
+        # verbatim files, cloned with copy-on-write reflinks
+        self.files_cloned = 0
+        self.bytes_cloned = 0
+        # verbatim files, hardlinked - to the template file, or read-only to the content store
+        self.files_linked = 0
+        self.bytes_linked = 0
+        # verbatim files, copied - also if cloning or linking was not possible
+        self.files_copied = 0
+        self.bytes_copied = 0
+        # files which were not written, because the target has already the same content (write_if_changed)
+        self.files_unchanged = 0
+        self.bytes_unchanged = 0
+        # files which were not even read, because template, pattern values and target did not change since the last build (selective_rebuild)
+        self.files_up_to_date = 0
+        self.bytes_up_to_date = 0
+        # oversized files, rendered line by line instead of in memory (max_render_size, max_build_memory)
+        self.files_streamed = 0
+        self.bytes_streamed = 0
+        # template path -> 'stream' or 'copy' : how each oversized file was handled
+        self.oversize_decisions: Dict[str, str] = dict()
+        # phase -> peak resident set size of the process in bytes, at the end of that phase
+        self.peak_rss_by_phase: Dict[str, int] = dict()
+        self.memory_budget_exceeded = False
+        # stale targets which were removed, because they were renamed or their template file was removed (selective_rebuild)
+        self.files_removed = 0
+        # files an interrupted build completed, which were kept by the resumed build - they are counted as up to date as well
+        self.files_resumed = 0
+        # the files handed to the post processors, counted once per processor
+        self.files_post_processed = 0
+        # lazy pattern values which were referenced by the build : computed, or taken from the pattern cache (unchanged input files)
+        self.lazy_patterns_computed = 0
+        self.lazy_patterns_cached = 0
+        # template path -> the template directory of the layer which supplied the file (layered builds)
+        self.file_layers: Dict[str, str] = dict()
+        # the contents written into the content store, and the contents the store had already (from the builds of other targets)
+        self.store_objects_written = 0
+        self.store_bytes_written = 0
+        self.store_objects_reused = 0
+        # builds which were taken from the output cache without rendering, and builds whose output was not in the cache
+        self.output_cache_hits = 0
+        self.output_cache_misses = 0
+        # target object -> the unfilled or malformed patterns in its path or content
+        self.unfilled_patterns: Dict[str, List[str]] = dict()
+        # 'INDEX/COUNT' of the shard, if only a shard of the template was built - the merged report of a sharded build has all of them
+        self.shards: List[str] = list()
+        # kind -> the number of warnings (and infos) of that kind, the details are summarized in the log at the end of the build
+        self.diagnostics: Dict[str, int] = dict()
+
+    def add_file(self, method: str, size: int) -> None:
+        """ count a file, method is 'render', 'reflink', 'hardlink', 'copy', 'unchanged', 'up_to_date' or 'stream' """
+        if method == 'render':
+            self.files_rendered += 1
+            self.bytes_rendered += size
+        elif method == 'reflink':
+            self.files_cloned += 1
+            self.bytes_cloned += size
+        elif method == 'hardlink':
+            self.files_linked += 1
+            self.bytes_linked += size
+        elif method == 'copy':
+            self.files_copied += 1
+            self.bytes_copied += size
+        elif method == 'unchanged':
+            self.files_unchanged += 1
+            self.bytes_unchanged += size
+        elif method == 'up_to_date':
+            self.files_up_to_date += 1
+            self.bytes_up_to_date += size
+        elif method == 'stream':
+            self.files_streamed += 1
+            self.bytes_streamed += size
+        else:
+            raise ValueError(f'unknown method "{method}"')
+
+    def add_unfilled_patterns(self, target: str, unfilled_patterns: List[str]) -> None:
+        self.unfilled_patterns.setdefault(target, list()).extend(unfilled_patterns)
+
+    def add_report(self, report: 'BuildReport') -> None:
+        """
+        add the statistics of another build - for the totals of many builds. the counts are summed (also the diagnostics by kind), the peak rss is the maximum,
+        the details by template path are merged (the later build wins, if the same template path is in both)
+        """
+        for name, value in report.__dict__.items():
+            own_value = getattr(self, name)
+            if isinstance(value, bool):
+                setattr(self, name, own_value or value)
+            elif isinstance(value, int):
+                setattr(self, name, own_value + value)
+            elif isinstance(value, list):
+                own_value.extend(value)
+            elif name == 'peak_rss_by_phase':
+                for phase, peak_rss in value.items():
+                    own_value[phase] = max(own_value.get(phase, 0), peak_rss)
+            elif name == 'diagnostics':
+                for kind, count in value.items():
+                    own_value[kind] = own_value.get(kind, 0) + count
+            else:
+                own_value.update(value)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return dict(self.__dict__)
+
+    def save(self, path_report_file: pathlib.Path) -> None:
+        """ the report as JSON - for instance the partial report of a shard, to be merged later """
+        pathlib.Path(path_report_file).write_text(json.dumps(self.as_dict(), indent=1), encoding='utf-8')
+
+    @classmethod
+    def load(cls, path_report_file: pathlib.Path) -> 'BuildReport':
+        report = cls()
+        for name, value in json.loads(pathlib.Path(path_report_file).read_text(encoding='utf-8')).items():
+            if name in report.__dict__:
+                setattr(report, name, value)
+        return report
+
+    def as_text(self) -> str:
+        lines = ['PizzaCutter build report:',
+                 f'    directories created : {self.directories_created}',
+                 f'    files rendered      : {self.files_rendered} ({self.bytes_rendered} bytes)',
+                 f'    files cloned        : {self.files_cloned} ({self.bytes_cloned} bytes)',
+                 f'    files hardlinked    : {self.files_linked} ({self.bytes_linked} bytes)',
+                 f'    files copied        : {self.files_copied} ({self.bytes_copied} bytes)',
+                 f'    files unchanged     : {self.files_unchanged} ({self.bytes_unchanged} bytes)',
+                 f'    files up to date    : {self.files_up_to_date} ({self.bytes_up_to_date} bytes)',
+                 f'    files streamed      : {self.files_streamed} ({self.bytes_streamed} bytes)',
+                 f'    stale files removed : {self.files_removed}',
+                 f'    files postprocessed : {self.files_post_processed}']
+        if self.files_resumed:
+            lines.append(f'    files resumed       : {self.files_resumed}')
+        if self.lazy_patterns_computed or self.lazy_patterns_cached:
+            lines.append(f'    lazy patterns       : {self.lazy_patterns_computed} computed, {self.lazy_patterns_cached} cached')
+        if self.store_objects_written or self.store_objects_reused:
+            lines.append(f'    content store       : {self.store_objects_written} objects written ({self.store_bytes_written} bytes), '
+                         f'{self.store_objects_reused} reused')
+        if self.output_cache_hits or self.output_cache_misses:
+            lines.append(f'    output cache        : {self.output_cache_hits} hits, {self.output_cache_misses} misses')
+        if self.unfilled_patterns:
+            lines.append(f'    unfilled patterns   : {sum(len(patterns) for patterns in self.unfilled_patterns.values())} '
+                         f'in {len(self.unfilled_patterns)} objects')
+        if self.shards:
+            lines.append(f'    shards              : {", ".join(self.shards)}')
+        if self.diagnostics:
+            lines.append(f'    diagnostics         : {", ".join(f"{count} {kind}" for kind, count in self.diagnostics.items())}')
+        for layer in dict.fromkeys(self.file_layers.values()):
+            lines.append(f'    layer files         : {list(self.file_layers.values()).count(layer)} from "{layer}"')
+        if self.oversize_decisions:
+            files_copied = list(self.oversize_decisions.values()).count('copy')
+            lines.append(f'    oversize files      : {len(self.oversize_decisions)} '
+                         f'({len(self.oversize_decisions) - files_copied} streamed, {files_copied} copied verbatim)')
+        for phase, peak_rss in self.peak_rss_by_phase.items():
+            lines.append(f'    peak rss {phase:<10} : {peak_rss} bytes')
+        if self.memory_budget_exceeded:
+            lines.append('    memory budget       : exceeded')
+        return '\n'.join(lines)
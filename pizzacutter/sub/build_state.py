@@ -0,0 +1,44 @@
+# STDLIB
+import hashlib
+import os
+from typing import Optional
+
+# OWN
+import pathlib3x as pathlib
+
+
+def get_path_state_dir(path_target_dir: pathlib.Path, path_state_dir: Optional[pathlib.Path] = None) -> pathlib.Path:
+    """
+    the directory where the state of the builds into a target directory is kept (pattern index, ...).
+    by default that is outside of the generated project, in the user cache directory, one subdirectory per target directory -
+    so the generated project stays clean and the state survives a "git clean" of the project.
+
+    >>> # Setup
+    >>> path_target_dir = pathlib.Path('/some/project')
+
+    >>> # Test default
+    >>> path_state_dir = get_path_state_dir(path_target_dir)
+    >>> path_state_dir.parent.name
+    'targets'
+    >>> assert path_state_dir == get_path_state_dir(path_target_dir / '.')
+    >>> assert path_state_dir != get_path_state_dir(pathlib.Path('/some/other_project'))
+
+    >>> # Test explicit state directory
+    >>> get_path_state_dir(path_target_dir, pathlib.Path('/some/state'))
+    <BLANKLINE>
+    ...Path('/some/state')
+
+    """
+    if path_state_dir is not None:
+        return pathlib.Path(path_state_dir)
+    str_target_dir = str(pathlib.Path(path_target_dir).resolve())
+    target_id = hashlib.sha256(str_target_dir.encode('utf-8')).hexdigest()[:16]
+    return get_path_cache_dir() / 'targets' / target_id
+
+
+def get_path_cache_dir() -> pathlib.Path:
+    """ the pizzacutter user cache directory, honours XDG_CACHE_HOME and LOCALAPPDATA """
+    path_cache_home = os.environ.get('XDG_CACHE_HOME') or os.environ.get('LOCALAPPDATA')
+    if path_cache_home:
+        return pathlib.Path(path_cache_home) / 'pizzacutter'
+    return pathlib.Path.home() / '.cache' / 'pizzacutter'
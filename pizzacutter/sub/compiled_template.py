@@ -0,0 +1,111 @@
+# STDLIB
+import json
+from typing import Any, Dict, Iterator, List, Optional
+
+# OWN
+import pathlib3x as pathlib
+
+# PROJ
+try:
+    from . import build_manifest
+    from . import template_walker
+except (ImportError, ModuleNotFoundError):  # pragma: no cover
+    # imports for doctest
+    import build_manifest                   # type: ignore  # pragma: no cover
+    import template_walker                  # type: ignore  # pragma: no cover
+
+
+class CompiledTemplate(object):
+    """
+    the result of analyzing a template with its config once : the manifest of template objects with their target paths,
+    the segment list of every file (offset and key of each pattern occurrence), the pattern dependencies,
+    and the errors and warnings found. a build can load it instead of walking and rescanning the template.
+
+    >>> # Setup
+    >>> path_test_dir = pathlib.Path(__file__).parent.parent.parent.resolve() / 'tests'
+    >>> path_source_file = path_test_dir / 'txt_file_input.txt'
+    >>> path_compiled_file = path_test_dir / 'test_compiled_template.json'
+    >>> compiled_template = CompiledTemplate(path_template_dir=str(path_test_dir), template_digest='test')
+    >>> compiled_template.add_entry(template_walker.TemplateEntry('txt_file_input.txt', is_dir=False, no_overwrite=False),
+    ...                             target='txt_file_input.txt', path_source_object=path_source_file, verbatim=True)
+    >>> compiled_template.add_warning('txt_file_input.txt', 'some warning')
+    >>> compiled_template.save(path_compiled_file)
+
+    >>> # Test
+    >>> compiled_template = CompiledTemplate.load(path_compiled_file)
+    >>> list(compiled_template.iter_template_entries())
+    [TemplateEntry('txt_file_input.txt', is_dir=False, no_overwrite=False)]
+    >>> compiled_template.get_verbatim('txt_file_input.txt', path_source_file)
+    True
+    >>> compiled_template.get_verbatim('unknown.txt', path_source_file)
+    >>> print(compiled_template.as_text())
+    warning: txt_file_input.txt: some warning
+
+    >>> # Teardown
+    >>> path_compiled_file.unlink()
+
+    """
+
+    def __init__(self, path_template_dir: str = '', template_digest: str = '') -> None:
+        self.path_template_dir = path_template_dir
+        # the digest of the pattern keys, their types and the options - the compiled template is only valid for the same digest
+        self.template_digest = template_digest
+        self.entries: List[Dict[str, Any]] = list()
+        self.errors: List[Dict[str, str]] = list()
+        self.warnings: List[Dict[str, str]] = list()
+        self._entries_by_path: Dict[str, Dict[str, Any]] = dict()
+
+    def add_entry(self, template_entry: template_walker.TemplateEntry, target: Optional[str], path_source_object: pathlib.Path,
+                  path_patterns: Optional[Dict[str, int]] = None, content_patterns: Optional[Dict[str, int]] = None,
+                  segments: Optional[List[List[Any]]] = None, verbatim: bool = False) -> None:
+        entry = {'path': template_entry.path,
+                 'is_dir': template_entry.is_dir,
+                 'no_overwrite': template_entry.no_overwrite,
+                 'target': target,
+                 'path_patterns': path_patterns or dict(),
+                 'content_patterns': content_patterns or dict(),
+                 'segments': segments or list(),
+                 'verbatim': verbatim,
+                 'template_stat': None if template_entry.is_dir else build_manifest.get_stat_signature(path_source_object)}
+        self.entries.append(entry)
+        self._entries_by_path[template_entry.path] = entry
+
+    def add_error(self, template_path: str, message: str) -> None:
+        self.errors.append({'path': template_path, 'message': message})
+
+    def add_warning(self, template_path: str, message: str) -> None:
+        self.warnings.append({'path': template_path, 'message': message})
+
+    def iter_template_entries(self) -> Iterator[template_walker.TemplateEntry]:
+        for entry in self.entries:
+            yield template_walker.TemplateEntry(entry['path'], is_dir=entry['is_dir'], no_overwrite=entry['no_overwrite'])
+
+    def get_verbatim(self, template_path: str, path_source_file: pathlib.Path) -> Optional[bool]:
+        """ the precompiled verbatim flag of a file - None if unknown, or if the template file changed since it was compiled """
+        entry = self._entries_by_path.get(template_path)
+        if entry is None or build_manifest.BuildManifest.stat_changed(entry['template_stat'], path_source_file):
+            return None
+        return bool(entry['verbatim'])
+
+    def as_text(self) -> str:
+        lines = [f'error: {error["path"]}: {error["message"]}' for error in self.errors]
+        lines.extend(f'warning: {warning["path"]}: {warning["message"]}' for warning in self.warnings)
+        return '\n'.join(lines)
+
+    def save(self, path_compiled_file: pathlib.Path) -> None:
+        path_compiled_file.parent.mkdir(parents=True, exist_ok=True)
+        data = {'version': 1, 'path_template_dir': self.path_template_dir, 'template_digest': self.template_digest,
+                'entries': self.entries, 'errors': self.errors, 'warnings': self.warnings}
+        path_compiled_file.write_text(json.dumps(data, indent=1), encoding='utf-8')
+
+    @classmethod
+    def load(cls, path_compiled_file: pathlib.Path) -> 'CompiledTemplate':
+        data = json.loads(pathlib.Path(path_compiled_file).read_text(encoding='utf-8'))
+        if data.get('version') != 1:
+            raise ValueError(f'unsupported compiled template version "{data.get("version")}" in "{path_compiled_file}"')
+        compiled_template = cls(path_template_dir=data['path_template_dir'], template_digest=data['template_digest'])
+        compiled_template.entries = data['entries']
+        compiled_template.errors = data['errors']
+        compiled_template.warnings = data['warnings']
+        compiled_template._entries_by_path = {entry['path']: entry for entry in compiled_template.entries}
+        return compiled_template
@@ -0,0 +1,183 @@
+# STDLIB
+import hashlib
+import json
+import os
+import shutil
+import stat
+import tempfile
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# OWN
+import pathlib3x as pathlib
+
+# PROJ
+try:
+    from . import build_manifest
+    from . import materialize
+except (ImportError, ModuleNotFoundError):  # pragma: no cover
+    # imports for doctest
+    import build_manifest                   # type: ignore  # pragma: no cover
+    import materialize                      # type: ignore  # pragma: no cover
+
+# how the targets are materialized from the store - both fall back to a copy, if the filesystem or the volume boundary does not allow it
+CONTENT_STORE_METHODS = ('reflink', 'hardlink')
+
+
+class ContentStore(object):
+    """
+    a content addressed store, shared by many target directories : each content is stored once, named by its sha256,
+    and the target files are cloned (reflink) or hardlinked (read-only) from there - so builds of many projects from the same template
+    write only the bytes which differ between them. executable files are stored apart, because hardlinks share the mode.
+
+    every build records its targets in a reference file of the store, with the stat signature of the target.
+    gc() removes the objects no target refers to anymore - a target which was removed or changed since, does not refer to its object.
+
+    >>> # Setup
+    >>> path_test_dir = pathlib.Path(__file__).parent.parent.parent.resolve() / 'tests'
+    >>> path_store_dir = path_test_dir / 'test_content_store'
+    >>> path_target_dirs = [path_test_dir / 'test_content_store_target_01', path_test_dir / 'test_content_store_target_02']
+    >>> content_store = ContentStore(path_store_dir, method='hardlink')
+
+    >>> # Test the same content is stored once
+    >>> for path_target_dir in path_target_dirs:
+    ...     object_name, written = content_store.put(b'license')
+    ...     print(written)
+    ...     _ = content_store.link_file(object_name, path_target_dir / 'LICENSE')
+    ...     content_store.save_references(path_target_dir)
+    True
+    False
+    >>> assert (path_target_dirs[1] / 'LICENSE').read_bytes() == b'license'
+
+    >>> # Test the objects are removed when no target refers to them
+    >>> _ = content_store.put(b'not referenced')
+    >>> content_store.gc()
+    (1, 14)
+    >>> path_target_dirs[0].rmtree()
+    >>> content_store.gc()
+    (0, 0)
+    >>> (path_target_dirs[1] / 'LICENSE').unlink()
+    >>> content_store.gc()
+    (1, 7)
+
+    >>> # Test unknown method
+    >>> ContentStore(path_store_dir, method='symlink')
+    Traceback (most recent call last):
+    ...
+    ValueError: the content store method must be one of ('reflink', 'hardlink'), not "symlink"
+
+    >>> # Teardown
+    >>> path_store_dir.rmtree(ignore_errors=True)
+    >>> path_target_dirs[1].rmtree(ignore_errors=True)
+
+    """
+
+    def __init__(self, path_store_dir: pathlib.Path, method: str = 'reflink') -> None:
+        if method not in CONTENT_STORE_METHODS:
+            raise ValueError(f'the content store method must be one of {CONTENT_STORE_METHODS}, not "{method}"')
+        self.path_store_dir = pathlib.Path(path_store_dir)
+        self.path_objects_dir = self.path_store_dir / 'objects'
+        self.path_refs_dir = self.path_store_dir / 'refs'
+        self.method = method
+        # target file -> [object name, stat signature of the target] - the targets linked since the last save_references()
+        self.references: Dict[str, List[Any]] = dict()
+
+    def get_path_object(self, object_name: str) -> pathlib.Path:
+        return self.path_objects_dir / object_name[:2] / object_name
+
+    def put(self, content: bytes, executable: bool = False) -> Tuple[str, bool]:
+        """ store the content, returns the object name and if it was written - False if the store had it already """
+        object_name = hashlib.sha256(content).hexdigest() + ('.x' if executable else '')
+        path_object = self.get_path_object(object_name)
+        if path_object.is_file():
+            return object_name, False
+        path_object.parent.mkdir(parents=True, exist_ok=True)
+        # written under a temporary name and renamed, so builds running in parallel never see half written objects
+        fd, str_path_temp_file = tempfile.mkstemp(dir=str(path_object.parent), prefix='.tmp_')
+        with os.fdopen(fd, 'wb') as f_temp:
+            f_temp.write(content)
+        # read-only, because hardlinked targets share the object
+        os.chmod(str_path_temp_file, 0o555 if executable else 0o444)
+        os.replace(str_path_temp_file, str(path_object))
+        return object_name, True
+
+    def link_file(self, object_name: str, path_target_file: pathlib.Path, path_source_file: Optional[pathlib.Path] = None) -> str:
+        """
+        materialize the target from the store, returns the method actually used : 'reflink', 'hardlink' or 'copy'.
+        a cloned or copied target gets the mode of the source file (or is made writable), a hardlinked target stays read-only
+        """
+        path_object = self.get_path_object(object_name)
+        path_target_file.parent.mkdir(parents=True, exist_ok=True)
+        path_target_file.unlink(missing_ok=True)
+        if self.method == 'reflink' and materialize.reflink_file(path_object, path_target_file):
+            method = 'reflink'
+        elif self.method == 'hardlink' and materialize.hardlink_file(path_object, path_target_file):
+            method = 'hardlink'
+        else:
+            path_object.copy2(path_target_file)
+            method = 'copy'
+        if method != 'hardlink':
+            if path_source_file is not None:
+                shutil.copymode(str(path_source_file), str(path_target_file))
+            else:
+                os.chmod(str(path_target_file), stat.S_IMODE(path_target_file.stat().st_mode) | stat.S_IWUSR)
+        self.references[str(path_target_file)] = [object_name, get_signature(path_target_file)]
+        return method
+
+    def get_path_refs_file(self, path_target_dir: pathlib.Path) -> pathlib.Path:
+        return self.path_refs_dir / (hashlib.sha256(str(path_target_dir).encode('utf-8')).hexdigest()[:32] + '.json')
+
+    def save_references(self, path_target_dir: pathlib.Path) -> None:
+        """ add the targets linked since the last call to the reference file of the target directory - the targets of former builds are kept """
+        path_refs_file = self.get_path_refs_file(path_target_dir)
+        files = load_references(path_refs_file)['files']
+        files.update(self.references)
+        self.references = dict()
+        save_references(path_refs_file, path_target_dir, files)
+
+    def gc(self) -> Tuple[int, int]:
+        """
+        removes the objects which are not referred to by any target, returns the number of objects removed and their size in bytes.
+        references of targets which were removed or changed are dropped. dont run it while builds write into the store.
+        """
+        objects_referenced: Set[str] = set()
+        if self.path_refs_dir.is_dir():
+            for path_refs_file in sorted(self.path_refs_dir.glob('*.json')):
+                references = load_references(path_refs_file)
+                files = references['files']
+                files_alive = {target: reference for target, reference in files.items() if get_signature(pathlib.Path(target)) == reference[1]}
+                objects_referenced.update(object_name for object_name, _ in files_alive.values())
+                if not files_alive:
+                    path_refs_file.unlink()
+                elif len(files_alive) != len(files):
+                    save_references(path_refs_file, pathlib.Path(references['target_dir']), files_alive)
+
+        objects_removed = 0
+        bytes_removed = 0
+        if self.path_objects_dir.is_dir():
+            for path_object in sorted(self.path_objects_dir.glob('*/*')):
+                if path_object.name not in objects_referenced and not path_object.name.startswith('.tmp_'):
+                    bytes_removed += path_object.stat().st_size
+                    path_object.unlink()
+                    objects_removed += 1
+        return objects_removed, bytes_removed
+
+
+def get_signature(path_target_file: pathlib.Path) -> List[int]:
+    """ the stat signature of a target as stored in the reference files, empty if the target does not exist """
+    return list(build_manifest.get_stat_signature(path_target_file) or ())
+
+
+def load_references(path_refs_file: pathlib.Path) -> Dict[str, Any]:
+    """ the reference file of a target directory : {'target_dir': ..., 'files': {target file: [object name, stat signature]}} """
+    try:
+        references: Dict[str, Any] = json.loads(path_refs_file.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        references = dict()
+    references.setdefault('target_dir', '')
+    references.setdefault('files', dict())
+    return references
+
+
+def save_references(path_refs_file: pathlib.Path, path_target_dir: pathlib.Path, files: Dict[str, List[Any]]) -> None:
+    path_refs_file.parent.mkdir(parents=True, exist_ok=True)
+    path_refs_file.write_text(json.dumps({'target_dir': str(path_target_dir), 'files': files}, indent=1), encoding='utf-8')
@@ -0,0 +1,117 @@
+# STDLIB
+import logging
+import os
+from typing import Any, Dict, List, Tuple, Union
+
+# OWN
+import pathlib3x as pathlib
+
+
+class DiagnosticKind(object):
+    """ the diagnostics of one kind during a build : how often, in which directories, and the first one with its message arguments """
+    __slots__ = ('level', 'summary', 'count', 'directories', 'first_message', 'first_args')
+
+    def __init__(self, level: int, summary: str, first_message: str, first_args: Tuple[Any, ...]) -> None:
+        self.level = level
+        self.summary = summary
+        self.count = 0
+        # directory -> number of diagnostics for objects in there
+        self.directories: Dict[str, int] = dict()
+        self.first_message = first_message
+        self.first_args = first_args
+
+
+class Diagnostics(object):
+    """
+    collects the warnings (and infos, debug messages) a build gives per object, instead of logging each of them : at the end of the build,
+    each kind is logged once, with the number of objects and the directories with the most of them. a kind which happened only once
+    is logged with its full message. the messages are formatted by logging only if they are logged at all, and not before the level is checked.
+    with verbose=True every diagnostic is logged at once, with the full detail, like before.
+    the diagnostics are counted regardless of verbose and of the log level, so counts() (and the build report) does not depend on the logging setup.
+
+    >>> # Setup
+    >>> import sys
+    >>> test_logger = logging.getLogger('test_diagnostics')
+    >>> test_handler = logging.StreamHandler(sys.stdout)
+    >>> test_logger.addHandler(test_handler)
+    >>> test_logger.setLevel(logging.INFO)
+    >>> test_logger.propagate = False
+    >>> diagnostics = Diagnostics(test_logger)
+
+    >>> # Test the summary
+    >>> for number in range(5):
+    ...     diagnostics.add('outside_not_allowed', logging.WARNING, 'objects outside the project directory, not written',
+    ...                     'object outside project directory not allowed: "%s"', f'/outside/dir_{number % 2}/file_{number}.txt')
+    >>> diagnostics.add('stale_target_changed', logging.WARNING, 'stale targets changed since the last build, not removed',
+    ...                 'stale target was changed since the last build, it is not removed: "%s"', '/project/old.txt')
+    >>> diagnostics.add('overwrite', logging.DEBUG, 'objects overwritten', 'object will be overwritten: "%s"', '/project/test.txt')
+    >>> diagnostics.counts()
+    {'outside_not_allowed': 5, 'stale_target_changed': 1}
+    >>> diagnostics.emit()
+    objects outside the project directory, not written: 5 objects in 2 directories - "/outside/dir_0" (3), "/outside/dir_1" (2)
+    stale target was changed since the last build, it is not removed: "/project/old.txt"
+    >>> diagnostics.counts()
+    {}
+
+    >>> # Test the counts do not depend on the log level
+    >>> test_logger.setLevel(logging.ERROR)
+    >>> diagnostics.add('stale_target_changed', logging.WARNING, 'stale targets changed since the last build, not removed',
+    ...                 'stale target was changed since the last build, it is not removed: "%s"', '/project/old.txt')
+    >>> diagnostics.counts()
+    {'stale_target_changed': 1}
+    >>> diagnostics.emit()
+    >>> test_logger.setLevel(logging.INFO)
+
+    >>> # Test verbose
+    >>> diagnostics = Diagnostics(test_logger, verbose=True)
+    >>> diagnostics.add('outside_not_allowed', logging.WARNING, 'objects outside the project directory, not written',
+    ...                 'object outside project directory not allowed: "%s"', '/outside/dir_0/file_0.txt')
+    object outside project directory not allowed: "/outside/dir_0/file_0.txt"
+    >>> diagnostics.counts()
+    {'outside_not_allowed': 1}
+    >>> diagnostics.emit()
+
+    >>> # Teardown
+    >>> test_logger.removeHandler(test_handler)
+
+    """
+
+    def __init__(self, target_logger: logging.Logger, verbose: bool = False, max_directories: int = 3) -> None:
+        self.logger = target_logger
+        self.verbose = verbose
+        # the number of directories listed in the summary of a kind
+        self.max_directories = max_directories
+        self.kinds: Dict[str, DiagnosticKind] = dict()
+
+    def add(self, kind: str, level: int, summary: str, message: str, path_object: Union[str, pathlib.Path], *args: Any) -> None:
+        """
+        a diagnostic about the object at path_object - message is a logging format string, with path_object as first argument, followed by args.
+        summary describes all diagnostics of that kind, for the summary at the end of the build
+        """
+        if self.verbose and self.logger.isEnabledFor(level):
+            self.logger.log(level, message, path_object, *args)
+        diagnostic_kind = self.kinds.get(kind)
+        if diagnostic_kind is None:
+            diagnostic_kind = self.kinds[kind] = DiagnosticKind(level, summary, message, (path_object, ) + args)
+        diagnostic_kind.count += 1
+        directory = os.path.dirname(str(path_object))
+        diagnostic_kind.directories[directory] = diagnostic_kind.directories.get(directory, 0) + 1
+
+    def counts(self) -> Dict[str, int]:
+        """ the number of diagnostics by kind, without the debug messages """
+        return {kind: diagnostic_kind.count for kind, diagnostic_kind in self.kinds.items() if diagnostic_kind.level > logging.DEBUG}
+
+    def emit(self) -> None:
+        """ logs the summary of the diagnostics collected since the last emit(), one line per kind - in verbose mode they are logged already """
+        for diagnostic_kind in self.kinds.values():
+            if self.verbose or not self.logger.isEnabledFor(diagnostic_kind.level):
+                continue
+            if diagnostic_kind.count == 1:
+                self.logger.log(diagnostic_kind.level, diagnostic_kind.first_message, *diagnostic_kind.first_args)
+                continue
+            directories: List[Tuple[str, int]] = sorted(diagnostic_kind.directories.items(), key=lambda directory: (-directory[1], directory[0]))
+            most_directories = ', '.join(f'"{directory}" ({count})' for directory, count in directories[:self.max_directories])
+            more = ', ...' if len(directories) > self.max_directories else ''
+            self.logger.log(diagnostic_kind.level, '%s: %d objects in %d directories - %s%s',
+                            diagnostic_kind.summary, diagnostic_kind.count, len(directories), most_directories, more)
+        self.kinds = dict()
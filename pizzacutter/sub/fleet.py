@@ -0,0 +1,201 @@
+# STDLIB
+import concurrent.futures
+import inspect
+import json
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+# OWN
+import pathlib3x as pathlib
+
+# PROJ
+try:
+    from . import build_report
+except (ImportError, ModuleNotFoundError):  # pragma: no cover
+    # imports for doctest
+    import build_report                     # type: ignore  # pragma: no cover
+
+try:
+    from .. import pizzacutter
+except (ImportError, ModuleNotFoundError):  # pragma: no cover
+    # imports for the cli script, the sub package is top level there
+    import pizzacutter                      # type: ignore  # pragma: no cover
+
+
+class FleetJob(object):
+    """
+    one build of a fleet : the conf file, the template and target directory, and more keyword arguments for pizzacutter.build().
+    with a process pool the build options must be picklable (no output sinks or event streams)
+
+    >>> FleetJob(pathlib.Path('/templates/conf.py'), path_target_dir=pathlib.Path('/projects/project_01'), dry_run=True)
+    FleetJob('/projects/project_01')
+
+    """
+
+    def __init__(self, path_conf_file: pathlib.Path, path_template_dir: Optional[pathlib.Path] = None, path_target_dir: Optional[pathlib.Path] = None,
+                 name: str = '', **build_options: Any) -> None:
+        self.path_conf_file = pathlib.Path(path_conf_file)
+        self.path_template_dir = None if path_template_dir is None else pathlib.Path(path_template_dir)
+        self.path_target_dir = None if path_target_dir is None else pathlib.Path(path_target_dir)
+        self.name = name or str(path_target_dir or path_conf_file)
+        self.build_options = build_options
+
+    def __repr__(self) -> str:
+        return f'FleetJob({self.name!r})'
+
+
+class FleetResult(object):
+    """ the outcome of one build of a fleet : its build report, or the error which stopped it """
+
+    def __init__(self, name: str, report: Optional[build_report.BuildReport] = None, error: str = '', seconds: float = 0.0) -> None:
+        self.name = name
+        self.report = report
+        self.error = error
+        self.seconds = seconds
+
+
+class FleetReport(object):
+    """
+    the results of all builds of a fleet, in the order of the jobs, and the totals of the builds which succeeded
+
+    >>> fleet_report = FleetReport()
+    >>> fleet_report.add_result(FleetResult('project_01', build_report.BuildReport(), seconds=0.5))
+    >>> fleet_report.add_result(FleetResult('project_02', error='FileNotFoundError: conf.py'))
+    >>> print(fleet_report.as_text())
+    PizzaCutter fleet report: 2 builds, 1 succeeded, 1 failed in 0.00 seconds
+        built               : project_01 (0.50 seconds)
+        failed              : project_02 : FileNotFoundError: conf.py
+    PizzaCutter build report:
+    ...
+
+    """
+
+    def __init__(self) -> None:
+        self.results: List[FleetResult] = list()
+        # the totals of the builds which succeeded
+        self.build_report = build_report.BuildReport()
+        self.seconds = 0.0
+
+    def add_result(self, result: FleetResult) -> None:
+        self.results.append(result)
+        if result.report is not None:
+            self.build_report.add_report(result.report)
+
+    def get_failed(self) -> List[FleetResult]:
+        return [result for result in self.results if result.error]
+
+    def as_text(self) -> str:
+        results_failed = self.get_failed()
+        lines = [f'PizzaCutter fleet report: {len(self.results)} builds, {len(self.results) - len(results_failed)} succeeded, '
+                 f'{len(results_failed)} failed in {self.seconds:.2f} seconds']
+        for result in self.results:
+            if result.error:
+                lines.append(f'    failed              : {result.name} : {result.error}')
+            else:
+                lines.append(f'    built               : {result.name} ({result.seconds:.2f} seconds)')
+        lines.append(self.build_report.as_text())
+        return '\n'.join(lines)
+
+
+def run_fleet(jobs: Sequence[FleetJob], workers: Optional[int] = None, processes: bool = False) -> FleetReport:
+    """
+    runs many builds, at most workers at the same time - each build loads its conf files isolated, under module names unique for their path,
+    without leaving their directories in sys.path. with processes=True each build runs in a worker process, fully isolated from the others
+    (hooks which change the process state, the GIL, ...). a failing build does not stop the others, its error is in the fleet report.
+
+    >>> # Setup
+    >>> path_test_dir = pathlib.Path(__file__).parent.parent.parent.resolve() / 'tests'
+    >>> path_template_dir = path_test_dir / 'pizzacutter_test_template_01'
+    >>> path_conf_file = path_template_dir / 'PizzaCutterTestConfig_01.py'
+    >>> path_fleet_dir = path_test_dir / 'pizzacutter_test_fleet'
+    >>> def get_jobs(numbers):
+    ...     return [FleetJob(path_conf_file, path_template_dir, path_fleet_dir / f'project_{number}', path_state_dir=path_fleet_dir / f'state_{number}')
+    ...             for number in numbers]
+    >>> jobs = get_jobs(range(3))
+    >>> jobs.append(FleetJob(path_template_dir / 'not_existing_conf.py', name='not_existing'))
+
+    >>> # Test threads
+    >>> fleet_report = run_fleet(jobs, workers=2)
+    >>> [result.name for result in fleet_report.get_failed()]
+    ['not_existing']
+    >>> assert fleet_report.build_report.files_rendered == 3 * fleet_report.results[0].report.files_rendered > 0
+
+    >>> # Test processes
+    >>> fleet_report = run_fleet(get_jobs(range(3, 5)), workers=2, processes=True)
+    >>> assert not fleet_report.get_failed() and fleet_report.build_report.files_rendered > 0
+
+    >>> # Teardown
+    >>> path_fleet_dir.rmtree(ignore_errors=True)
+
+    """
+    fleet_report = FleetReport()
+    started = time.perf_counter()
+    executor_class = concurrent.futures.ProcessPoolExecutor if processes else concurrent.futures.ThreadPoolExecutor
+    with executor_class(max_workers=workers) as executor:
+        for result in executor.map(run_fleet_job, jobs):
+            fleet_report.add_result(result)
+    fleet_report.seconds = time.perf_counter() - started
+    return fleet_report
+
+
+def run_fleet_job(job: FleetJob) -> FleetResult:
+    """ runs one build of the fleet - a module level function, so it can be passed to a process pool """
+    started = time.perf_counter()
+    build_options: Dict[str, Any] = dict(quiet=True)
+    build_options.update(job.build_options)
+    try:
+        report = pizzacutter.build(path_conf_file=job.path_conf_file, path_template_dir=job.path_template_dir, path_target_dir=job.path_target_dir,
+                                   isolated_config=True, **build_options)
+    except Exception as exc:
+        return FleetResult(job.name, error=f'{exc.__class__.__name__}: {exc}', seconds=time.perf_counter() - started)
+    return FleetResult(job.name, report=report, seconds=time.perf_counter() - started)
+
+
+def load_fleet_file(path_fleet_file: pathlib.Path) -> List[FleetJob]:
+    """
+    reads the jobs of a fleet from a JSON file : a list of builds, each with "conf_file" and optional "template_dir", "target_dir", "name",
+    and more options of pizzacutter.build(), for instance "dry_run" or "materialize". relative paths are relative to the fleet file.
+
+    [{"conf_file": "templates/python/conf.py", "target_dir": "projects/project_01"},
+     {"conf_file": "templates/python/conf.py", "target_dir": "projects/project_02", "materialize": "reflink"}]
+
+    >>> # Setup
+    >>> path_fleet_file = pathlib.Path(__file__).parent.parent.parent.resolve() / 'tests' / 'pizzacutter_test_fleet.json'
+    >>> _ = path_fleet_file.write_text('[{"conf_file": "conf.py", "target_dir": "project_01", "path_state_dir": "state_01", "dry_run": true}]')
+
+    >>> # Test
+    >>> jobs = load_fleet_file(path_fleet_file)
+    >>> jobs[0].path_conf_file == path_fleet_file.parent / 'conf.py', jobs[0].build_options['path_state_dir'].name, jobs[0].build_options['dry_run']
+    (True, 'state_01', True)
+    >>> _ = path_fleet_file.write_text('[{"conf_file": "conf.py", "unknown_option": true}]')
+    >>> load_fleet_file(path_fleet_file)
+    Traceback (most recent call last):
+    ...
+    ValueError: unknown build option "unknown_option" in the fleet file "...pizzacutter_test_fleet.json"
+
+    >>> # Teardown
+    >>> path_fleet_file.unlink()
+
+    """
+    path_fleet_file = pathlib.Path(path_fleet_file).resolve()
+    build_parameters = inspect.signature(pizzacutter.build).parameters
+
+    def get_path(value: Optional[str]) -> Optional[pathlib.Path]:
+        return None if value is None else path_fleet_file.parent / value
+
+    jobs: List[FleetJob] = list()
+    for entry in json.loads(path_fleet_file.read_text(encoding='utf-8')):
+        entry = dict(entry)
+        if 'conf_file' not in entry:
+            raise ValueError(f'"conf_file" is missing for a build in the fleet file "{path_fleet_file}"')
+        path_conf_file = path_fleet_file.parent / entry.pop('conf_file')
+        path_template_dir = get_path(entry.pop('template_dir', None))
+        path_target_dir = get_path(entry.pop('target_dir', None))
+        name = entry.pop('name', '')
+        for option, value in entry.items():
+            if option not in build_parameters or option in ('path_conf_file', 'path_template_dir', 'path_target_dir', 'isolated_config'):
+                raise ValueError(f'unknown build option "{option}" in the fleet file "{path_fleet_file}"')
+            if option.startswith('path_') and value is not None:
+                entry[option] = get_path(value)
+        jobs.append(FleetJob(path_conf_file, path_template_dir, path_target_dir, name=name, **entry))
+    return jobs
@@ -17,6 +17,8 @@ class PizzaCutterGetConfig(object):
     >>> pizza_cutter_path_conf_file = path_test_dir / 'pizzacutter_test_template_01/PizzaCutterTestConfig_01.py'
     >>> pizza_cutter_conf = PizzaCutterGetConfig(pizza_cutter_path_conf_file = pizza_cutter_path_conf_file)
     >>> assert pizza_cutter_conf.conf.project_dir == 'pizzacutter_test_project'
+    >>> pizza_cutter_conf = PizzaCutterGetConfig(pizza_cutter_path_conf_file = pizza_cutter_path_conf_file, isolated=True)
+    >>> assert pizza_cutter_conf.conf.project_dir == 'pizzacutter_test_project'
 
     """
     def __init__(self,
@@ -25,12 +27,17 @@ class PizzaCutterGetConfig(object):
                  # the path to the Template Folder - can be set by the conf File to the Directory the conf file sits - can be overridden by conf file
                  pizza_cutter_path_template_dir: Optional[pathlib.Path] = None,
                  # the target path of the Project Folder - this should be the current Directory - can be overridden by conf file
-                 pizza_cutter_path_target_dir: Optional[pathlib.Path] = None):
+                 pizza_cutter_path_target_dir: Optional[pathlib.Path] = None,
+                 # load the conf file under a module name unique for its path, without leaving its directory in sys.path
+                 isolated: bool = False):
 
         # make sure it is a pathlib3x instance
         pizza_cutter_path_conf_file = pathlib.Path(pizza_cutter_path_conf_file)
         self.conf = pizzacutter_config.PizzaCutterConfigBase()
-        reloaded_mod_conf = import_module.import_module_from_file(module_fullpath=pizza_cutter_path_conf_file, reload=True)
+        if isolated:
+            reloaded_mod_conf = import_module.import_module_isolated(module_fullpath=pizza_cutter_path_conf_file)
+        else:
+            reloaded_mod_conf = import_module.import_module_from_file(module_fullpath=pizza_cutter_path_conf_file, reload=True)
         self.conf = reloaded_mod_conf.PizzaCutterConfig(pizza_cutter_path_conf_file=pizza_cutter_path_conf_file,
                                                         pizza_cutter_path_template_dir=pizza_cutter_path_template_dir,
                                                         pizza_cutter_path_target_dir=pizza_cutter_path_target_dir)
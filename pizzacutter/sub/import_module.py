@@ -1,10 +1,16 @@
 # STDLIB
+import hashlib
 import importlib
 import importlib.util
 import pathlib3x as pathlib
 import sys
+import threading
+import types
 from typing import Union
 
+# the isolated imports are serialized : the directory of the module is only in sys.path while the module is executed
+isolated_import_lock = threading.RLock()
+
 
 def import_module_from_file(module_fullpath: Union[pathlib.Path, str], reload: bool = False):   # type: ignore
     """
@@ -48,11 +54,16 @@ def import_module_from_file(module_fullpath: Union[pathlib.Path, str], reload: b
         # see https://docs.python.org/3/library/importlib.html
         importlib.invalidate_caches()
 
-    sys.path.append(str(module_fullpath.parent))
+    # the directory stays in sys.path for the imports of the module at runtime - but only once, also if the module is imported again
+    str_module_dir = str(module_fullpath.parent)
+    path_added = str_module_dir not in sys.path
+    if path_added:
+        sys.path.append(str_module_dir)
 
     spec = importlib.util.spec_from_file_location(module_name, module_fullpath)
     if spec is None:
-        sys.path.pop()
+        if path_added:
+            sys.path.remove(str_module_dir)
         raise ImportError(f'can not get spec from file location "{module_fullpath}"')
 
     try:
@@ -60,14 +71,60 @@ def import_module_from_file(module_fullpath: Union[pathlib.Path, str], reload: b
         sys.modules[module_name] = mod
     except Exception as exc:
         raise ImportError(f'can not load module "{module_name}"') from exc
-    finally:
-        sys.path.pop()
-        sys.path.append(str(module_fullpath.parent))
 
     try:
         spec.loader.exec_module(mod)    # type: ignore
     except Exception as exc:
-        sys.path.pop()
+        if path_added:
+            sys.path.remove(str_module_dir)
         raise ImportWarning(f'module "{module_name}" reloaded, but can not be executed') from exc
 
     return mod
+
+
+def import_module_isolated(module_fullpath: Union[pathlib.Path, str]) -> types.ModuleType:
+    """
+    imports a module from a file under a module name which is unique for its full path, and executes it on every call -
+    so conf files with the same file name in different directories dont collide, and an import always gets the actual content of the file.
+    the directory of the module is only in sys.path while the module is executed, so many imports dont make sys.path grow.
+    that is how builds which run side by side in one interpreter load their conf files.
+
+    >>> sys_path = list(sys.path)
+    >>> mod_1 = import_module_isolated(pathlib.Path(__file__))
+    >>> mod_2 = import_module_isolated(pathlib.Path(__file__))
+    >>> mod_1.__name__
+    'pizzacutter_isolated_..._import_module'
+    >>> assert mod_1.__name__ == mod_2.__name__ and mod_1 is not mod_2
+    >>> assert sys.path == sys_path
+
+    >>> import_module_isolated(pathlib.Path(__file__).with_suffix('.non_existing'))
+    Traceback (most recent call last):
+    ...
+    FileNotFoundError: module "...import_module.non_existing.py" not found
+
+    """
+    module_fullpath = pathlib.Path(module_fullpath)
+    if not module_fullpath.suffix == '.py':
+        module_fullpath = pathlib.Path(str(module_fullpath) + '.py')
+    if not module_fullpath.is_file():
+        raise FileNotFoundError(f'module "{module_fullpath}" not found')
+    module_fullpath = module_fullpath.resolve()
+
+    module_name = f'pizzacutter_isolated_{hashlib.sha256(str(module_fullpath).encode("utf-8")).hexdigest()[:16]}_{module_fullpath.stem}'
+    spec = importlib.util.spec_from_file_location(module_name, module_fullpath)
+    if spec is None or spec.loader is None:
+        raise ImportError(f'can not get spec from file location "{module_fullpath}"')
+    mod = importlib.util.module_from_spec(spec)
+
+    str_module_dir = str(module_fullpath.parent)
+    with isolated_import_lock:
+        sys.path.insert(0, str_module_dir)
+        # registered, because some code (dataclasses, pickle, ...) looks the module up while it is executed
+        sys.modules[module_name] = mod
+        try:
+            spec.loader.exec_module(mod)
+        except Exception as exc:
+            raise ImportWarning(f'module "{module_fullpath}" can not be executed') from exc
+        finally:
+            sys.path.remove(str_module_dir)
+    return mod
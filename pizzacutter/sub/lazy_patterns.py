@@ -0,0 +1,161 @@
+# STDLIB
+import json
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Sequence, Union
+
+# OWN
+import pathlib3x as pathlib
+
+# PROJ
+try:
+    from . import build_manifest
+except (ImportError, ModuleNotFoundError):  # pragma: no cover
+    # imports for doctest
+    import build_manifest                   # type: ignore  # pragma: no cover
+
+# the filename of the cache of the lazy pattern values in the state directory
+PATTERN_CACHE_FILENAME = 'pattern_cache.json'
+
+
+class LazyPattern(object):
+    """
+    a pattern value which is only computed when the build needs it, at most once per build :
+        compute     : returns the value, a string or a pathlib.Path
+        input_files : the files the value is computed from - if given, the value is cached in the state directory
+                      and only computed again if one of the files changed (size or mtime)
+        cache_key   : change it, to invalidate the cached values - for instance if the computation changes
+
+    in the conf file :
+        self.pizza_cutter_patterns['{{PizzaCutter.version}}'] = LazyPattern(lambda: find_version_number_in_file(path_changes), [path_changes])
+    a zero-argument callable can be used as well, it is never cached.
+
+    >>> lazy_pattern = LazyPattern(lambda: '1.0.0')
+    >>> lazy_pattern.compute()
+    '1.0.0'
+    >>> get_lazy_pattern(lambda: 'test').compute()
+    'test'
+    >>> get_lazy_pattern('test')
+
+    """
+    __slots__ = ('compute', 'input_files', 'cache_key')
+
+    def __init__(self, compute: Callable[[], Union[str, pathlib.Path]], input_files: Sequence[pathlib.Path] = (), cache_key: str = '') -> None:
+        self.compute = compute
+        self.input_files = [pathlib.Path(input_file) for input_file in input_files]
+        self.cache_key = cache_key
+
+    def __repr__(self) -> str:
+        return f'LazyPattern({self.compute!r})'
+
+    def get_input_signature(self) -> List[Any]:
+        """ what the cached value is valid for : the cache key, the input files and their stat signatures """
+        return [self.cache_key] + [[str(input_file), build_manifest.get_stat_signature(input_file)] for input_file in self.input_files]
+
+
+# the values a conf file can put into pizza_cutter_patterns
+PatternValue = Union[str, pathlib.Path, LazyPattern, Callable[[], Union[str, pathlib.Path]]]
+
+
+def get_lazy_pattern(replacement: Any) -> Optional[LazyPattern]:
+    """ the lazy pattern for a pattern value which is computed lazily, None for a string or pathlib.Path value """
+    if isinstance(replacement, LazyPattern):
+        return replacement
+    if callable(replacement):
+        return LazyPattern(replacement)
+    return None
+
+
+def is_lazy(replacement: Any) -> bool:
+    return isinstance(replacement, LazyPattern) or callable(replacement)
+
+
+class ResolvingPatterns(Mapping[str, Union[str, pathlib.Path]]):
+    """
+    a read only view of the patterns which computes a lazy value when it is accessed - for code which looks up only the patterns it needs
+
+    >>> evaluated = list()
+    >>> def get_value(pattern):
+    ...     evaluated.append(pattern)
+    ...     return 'value'
+    >>> patterns = ResolvingPatterns({'{{p.eager}}': 'eager', '{{p.lazy}}': LazyPattern(lambda: 'lazy')}, get_value)
+    >>> patterns.get('{{p.lazy}}'), patterns.get('{{p.unknown}}'), len(patterns)
+    ('value', None, 2)
+    >>> evaluated
+    ['{{p.lazy}}']
+
+    """
+
+    def __init__(self, patterns: Mapping[str, PatternValue], get_value: Callable[[str], Union[str, pathlib.Path]]) -> None:
+        self.patterns = patterns
+        self.get_value = get_value
+
+    def __getitem__(self, pattern: str) -> Union[str, pathlib.Path]:
+        replacement = self.patterns[pattern]
+        if is_lazy(replacement):
+            return self.get_value(pattern)
+        return replacement      # type: ignore
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.patterns)
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+
+class PatternCache(object):
+    """
+    the values of the lazy patterns with input files, from the last builds
+
+    >>> # Setup
+    >>> path_test_dir = pathlib.Path(__file__).parent.parent.parent.resolve() / 'tests'
+    >>> path_cache_file = path_test_dir / 'test_pattern_cache' / PATTERN_CACHE_FILENAME
+    >>> lazy_pattern = LazyPattern(lambda: pathlib.Path('test'), [path_test_dir / 'txt_file_input.txt'])
+    >>> pattern_cache = PatternCache()
+    >>> pattern_cache.put('{{p.path}}', lazy_pattern, pathlib.Path('test'))
+    >>> pattern_cache.save(path_cache_file)
+
+    >>> # Test
+    >>> pattern_cache = PatternCache.load(path_cache_file)
+    >>> pattern_cache.get('{{p.path}}', lazy_pattern)
+    <BLANKLINE>
+    ...Path('test')
+    >>> pattern_cache.get('{{p.path}}', LazyPattern(lambda: 'test', [path_test_dir / 'txt_file_input.txt'], cache_key='2'))
+    >>> pattern_cache.get('{{p.unknown}}', lazy_pattern)
+
+    >>> # Teardown
+    >>> path_cache_file.parent.rmtree()
+
+    """
+
+    def __init__(self) -> None:
+        # pattern -> {'signature': ..., 'kind': 'str' or 'path', 'value': ...}
+        self.values: Dict[str, Dict[str, Any]] = dict()
+
+    def get(self, pattern: str, lazy_pattern: LazyPattern) -> Optional[Union[str, pathlib.Path]]:
+        """ the cached value, None if it is not cached or one of the input files changed """
+        if not lazy_pattern.input_files:
+            return None
+        entry = self.values.get(pattern)
+        # json makes lists of tuples
+        if entry is None or entry['signature'] != json.loads(json.dumps(lazy_pattern.get_input_signature())):
+            return None
+        return entry['value'] if entry['kind'] == 'str' else pathlib.Path(entry['value'])
+
+    def put(self, pattern: str, lazy_pattern: LazyPattern, value: Union[str, pathlib.Path]) -> None:
+        if lazy_pattern.input_files:
+            self.values[pattern] = {'signature': lazy_pattern.get_input_signature(), 'kind': 'str' if isinstance(value, str) else 'path', 'value': str(value)}
+
+    def save(self, path_cache_file: pathlib.Path) -> None:
+        path_cache_file.parent.mkdir(parents=True, exist_ok=True)
+        path_cache_file.write_text(json.dumps({'version': 1, 'values': self.values}, indent=1), encoding='utf-8')
+
+    @classmethod
+    def load(cls, path_cache_file: pathlib.Path) -> 'PatternCache':
+        """ an empty cache if there is none, or if it is from another version """
+        pattern_cache = cls()
+        try:
+            data = json.loads(pathlib.Path(path_cache_file).read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return pattern_cache
+        if data.get('version') == 1:
+            pattern_cache.values = data['values']
+        return pattern_cache
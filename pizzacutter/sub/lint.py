@@ -0,0 +1,197 @@
+# STDLIB
+import concurrent.futures
+import itertools
+import json
+import os
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Pattern, Tuple, Union
+
+# OWN
+import pathlib3x as pathlib
+
+# directories which are never linted
+DEFAULT_IGNORE_DIRS = ('.git', '.hg', '.svn', '.tox', '.nox', '.eggs', '.venv', '.mypy_cache', '.pytest_cache', '__pycache__', 'node_modules')
+
+# a file with a NUL byte in the first block is considered binary
+BINARY_CHECK_SIZE = 8192
+
+# the number of objects handed to the thread pool at once
+LINT_BATCH_SIZE = 1024
+
+# we think a pattern never will be that long
+MAX_PATTERN_LENGTH = 160
+
+
+class LintFinding(object):
+    """
+    an unfilled or malformed pattern found by the linter, line and column are 1-based - line 0 is a finding in the file or directory name
+
+    >>> finding = LintFinding('test.txt', 2, 5, '{{PizzaCutter.name}}', 'unfilled')
+    >>> finding
+    LintFinding('test.txt', line=2, column=5, pattern='{{PizzaCutter.name}}', kind='unfilled')
+    >>> finding.as_json()
+    '{"file": "test.txt", "line": 2, "column": 5, "pattern": "{{PizzaCutter.name}}", "kind": "unfilled"}'
+    >>> finding.as_text()
+    'test.txt:2:5: unfilled pattern "{{PizzaCutter.name}}"'
+
+    """
+    __slots__ = ('file', 'line', 'column', 'pattern', 'kind')
+
+    def __init__(self, file: str, line: int, column: int, pattern: str, kind: str) -> None:
+        self.file = file
+        self.line = line
+        self.column = column
+        self.pattern = pattern
+        # 'unfilled' or 'malformed'
+        self.kind = kind
+
+    def __repr__(self) -> str:
+        return f'LintFinding({self.file!r}, line={self.line}, column={self.column}, pattern={self.pattern!r}, kind={self.kind!r})'
+
+    def as_dict(self) -> Dict[str, Union[str, int]]:
+        return {'file': self.file, 'line': self.line, 'column': self.column, 'pattern': self.pattern, 'kind': self.kind}
+
+    def as_json(self) -> str:
+        return json.dumps(self.as_dict())
+
+    def as_text(self) -> str:
+        return f'{self.file}:{self.line}:{self.column}: {self.kind} pattern "{self.pattern}"'
+
+
+def get_pattern_matcher(pattern_prefixes: Iterable[str]) -> 'Pattern[bytes]':
+    """
+    one combined matcher for all pattern prefixes, so every file is scanned once, whatever the number of prefixes
+
+    >>> matcher = get_pattern_matcher(['{{PizzaCutter', '{{PizzaCutter.', '{{cookiecutter'])
+    >>> [match.group() for match in matcher.finditer(b'{{PizzaCutter.x}} {{cookiecutter.y}}')]
+    [b'{{PizzaCutter.', b'{{cookiecutter']
+
+    """
+    # the longest prefix first, so overlapping prefixes match only once
+    prefixes = sorted(set(pattern_prefixes), key=len, reverse=True)
+    return re.compile(b'|'.join(re.escape(prefix.encode('utf-8')) for prefix in prefixes))
+
+
+def lint_content(content: bytes, matcher: 'Pattern[bytes]', file: str = '') -> List[LintFinding]:
+    """
+    find the unfilled and malformed patterns in the content of a file
+
+    >>> matcher = get_pattern_matcher(['{{PizzaCutter'])
+    >>> for finding in lint_content(b'line 1\\nline 2 {{PizzaCutter.name}} {{PizzaCutter.broken\\n{{PizzaCutter}}', matcher, 'test.txt'):
+    ...     print(finding.as_text())
+    test.txt:2:8: unfilled pattern "{{PizzaCutter.name}}"
+    test.txt:2:29: malformed pattern "{{PizzaCutter.broken"
+    test.txt:3:1: unfilled pattern "{{PizzaCutter}}"
+    >>> lint_content(b'no patterns', matcher)
+    []
+
+    """
+    findings: List[LintFinding] = list()
+    line = 1
+    line_start = 0
+    position_counted = 0
+    for match in matcher.finditer(content):
+        position = match.start()
+        newlines = content.count(b'\n', position_counted, position)
+        if newlines:
+            line += newlines
+            line_start = content.rfind(b'\n', position_counted, position) + 1
+        position_counted = position
+        current_slice = content[position: position + MAX_PATTERN_LENGTH].split(b'\n', 1)[0]
+        if b'}}' in current_slice:
+            kind = 'unfilled'
+            pattern_bytes = current_slice.split(b'}}', 1)[0] + b'}}'
+        else:
+            kind = 'malformed'
+            pattern_bytes = b'{{' + current_slice[2:].split(b'{{', 1)[0].split(b'}', 1)[0].rstrip()
+        findings.append(LintFinding(file, line, position - line_start + 1, pattern_bytes.decode('utf-8', errors='replace'), kind))
+    return findings
+
+
+def is_binary(content: bytes) -> bool:
+    return b'\0' in content[:BINARY_CHECK_SIZE]
+
+
+def lint_object(path_object: str, is_dir: bool, matcher: 'Pattern[bytes]') -> List[LintFinding]:
+    """
+    lint the name of a file or directory (reported as line 0), and the content of a file - binary or unreadable files are skipped
+    """
+    findings = [LintFinding(path_object, 0, finding.column, finding.pattern, finding.kind)
+                for finding in lint_content(os.path.basename(path_object).encode('utf-8', errors='replace'), matcher)]
+    if is_dir:
+        return findings
+    try:
+        with open(path_object, 'rb') as f_source:
+            content = f_source.read()
+    except OSError:
+        return findings
+    if is_binary(content):
+        return findings
+    return findings + lint_content(content, matcher, path_object)
+
+
+def iter_lint_objects(paths: Iterable[Union[str, pathlib.Path]], ignore_dirs: Iterable[str] = DEFAULT_IGNORE_DIRS) -> Iterator[Tuple[str, bool]]:
+    """
+    yields (path, is_dir) of the files and directories to lint, depth first, sorted by name.
+    directories are walked with os.scandir, ignored directories are not entered, symlinked directories are not followed.
+
+    >>> path_test_dir = pathlib.Path(__file__).parent.parent.parent.resolve() / 'tests'
+    >>> lint_objects = list(iter_lint_objects([path_test_dir / 'pizzacutter_test_template_02']))
+    >>> assert any(path.endswith('malformed.txt') and not is_dir for path, is_dir in lint_objects)
+    >>> assert any(path.endswith('{{TestPizzaCutter.project_dir}}') and is_dir for path, is_dir in lint_objects)
+
+    """
+    set_ignore_dirs = set(ignore_dirs)
+    for path in paths:
+        str_path = str(path)
+        if not os.path.isdir(str_path):
+            yield str_path, False
+            continue
+        stack = [str_path]
+        while stack:
+            with os.scandir(stack.pop()) as dir_entries:
+                sorted_dir_entries = sorted(dir_entries, key=lambda entry: entry.name)
+            subdirs: List[str] = list()
+            for dir_entry in sorted_dir_entries:
+                if dir_entry.is_dir(follow_symlinks=False):
+                    if dir_entry.name not in set_ignore_dirs:
+                        yield dir_entry.path, True
+                        subdirs.append(dir_entry.path)
+                elif dir_entry.is_file():
+                    yield dir_entry.path, False
+            stack.extend(reversed(subdirs))
+
+
+def lint(paths: Iterable[Union[str, pathlib.Path]], pattern_prefixes: Iterable[str], ignore_dirs: Iterable[str] = DEFAULT_IGNORE_DIRS,
+         jobs: Optional[int] = None) -> Iterator[LintFinding]:
+    """
+    lints the files and directory trees for unfilled or malformed patterns, in parallel - findings are yielded in the order of the files.
+    the threads overlap the file reads, that is what counts for many trees on disk
+
+    >>> # Setup
+    >>> path_test_dir = pathlib.Path(__file__).parent.parent.parent.resolve() / 'tests'
+    >>> path_template_dir = path_test_dir / 'pizzacutter_test_template_02'
+
+    >>> # Test
+    >>> findings = list(lint([path_template_dir], ['{{TestPizzaCutter']))
+    >>> for finding in findings:
+    ...     if finding.file.endswith('malformed.txt'):
+    ...         print(finding.line, finding.column, finding.pattern, finding.kind)
+    2 27 {{TestPizzaCutter.missing_brackets malformed
+    3 20 {{TestPizzaCutter.unfilled_pattern}} unfilled
+    >>> [finding.kind for finding in findings if finding.file.endswith('{{TestPizzaCutter.project_dir}}')]
+    ['unfilled']
+
+    """
+    matcher = get_pattern_matcher(pattern_prefixes)
+    lint_objects = iter_lint_objects(paths, ignore_dirs)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+        # submit in batches, so huge trees are not queued up in memory at once
+        while True:
+            batch = list(itertools.islice(lint_objects, LINT_BATCH_SIZE))
+            if not batch:
+                break
+            batch_paths = [path for path, _ in batch]
+            batch_is_dirs = [is_dir for _, is_dir in batch]
+            for findings in executor.map(lint_object, batch_paths, batch_is_dirs, itertools.repeat(matcher)):
+                yield from findings
@@ -0,0 +1,88 @@
+# STDLIB
+import errno
+import os
+import shutil
+
+# OWN
+import pathlib3x as pathlib
+
+# the methods to materialize verbatim files
+MATERIALIZE_METHODS = ('copy', 'reflink', 'hardlink')
+
+# linux ioctl to clone a file with copy-on-write (btrfs, xfs, ...), see "man ioctl_ficlone"
+FICLONE = 0x40049409
+
+# the errors we get if the filesystem or the volume boundary does not allow to clone or to link
+ERRNOS_NOT_SUPPORTED = {errno.EXDEV, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EINVAL, errno.ENOTTY, errno.EPERM, errno.EMLINK, errno.ENOSYS, errno.EBADF}
+
+
+def reflink_file(path_source_file: pathlib.Path, path_target_file: pathlib.Path) -> bool:
+    """
+    clones the file with a copy-on-write reflink, the target must not exist.
+    returns False if the platform, the filesystem or the volume boundary does not support it.
+    at the moment only supported on linux (FICLONE)
+
+    >>> # Setup
+    >>> path_test_dir = pathlib.Path(__file__).parent.parent.parent.resolve() / 'tests'
+    >>> path_source_file = path_test_dir / 'txt_file_input.txt'
+    >>> path_target_file = path_test_dir / 'test_reflink_file.txt'
+
+    >>> # Test - result depends on the filesystem
+    >>> if reflink_file(path_source_file, path_target_file):
+    ...     assert path_target_file.read_bytes() == path_source_file.read_bytes()
+    ... else:
+    ...     assert not path_target_file.exists()
+
+    >>> # Teardown
+    >>> path_target_file.unlink(missing_ok=True)
+
+    """
+    try:
+        import fcntl
+    except ImportError:                                     # pragma: no cover
+        return False                                        # pragma: no cover
+
+    with open(str(path_source_file), 'rb') as f_source:
+        try:
+            with open(str(path_target_file), 'xb') as f_target:
+                fcntl.ioctl(f_target.fileno(), FICLONE, f_source.fileno())
+        except OSError as exc:
+            path_target_file.unlink(missing_ok=True)
+            if exc.errno in ERRNOS_NOT_SUPPORTED:
+                return False
+            raise                                           # pragma: no cover
+    shutil.copystat(str(path_source_file), str(path_target_file))
+    return True
+
+
+def hardlink_file(path_source_file: pathlib.Path, path_target_file: pathlib.Path) -> bool:
+    """
+    hardlinks the file, the target must not exist. the mode of the source file is left alone.
+    source and target share the same inode - editing the generated file edits the template file as well.
+    the content store makes its own objects read-only before it links them.
+    returns False if the filesystem or the volume boundary does not support it.
+
+    >>> # Setup
+    >>> path_test_dir = pathlib.Path(__file__).parent.parent.parent.resolve() / 'tests'
+    >>> path_source_file = path_test_dir / 'test_hardlink_file_source.txt'
+    >>> path_target_file = path_test_dir / 'test_hardlink_file_target.txt'
+    >>> _ = path_source_file.write_bytes(b'test')
+    >>> source_mode = path_source_file.stat().st_mode
+
+    >>> # Test
+    >>> if hardlink_file(path_source_file, path_target_file):
+    ...     assert path_target_file.stat().st_ino == path_source_file.stat().st_ino
+    ...     assert path_source_file.stat().st_mode == source_mode
+
+    >>> # Teardown
+    >>> path_target_file.unlink(missing_ok=True)
+    >>> path_source_file.unlink(missing_ok=True)
+
+    """
+    try:
+        os.link(str(path_source_file), str(path_target_file))
+    except OSError as exc:
+        if exc.errno in ERRNOS_NOT_SUPPORTED:
+            return False
+        raise                                               # pragma: no cover
+    return True
@@ -0,0 +1,164 @@
+# STDLIB
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+
+# OWN
+import pathlib3x as pathlib
+
+# PROJ
+try:
+    from . import materialize
+except (ImportError, ModuleNotFoundError):  # pragma: no cover
+    # imports for doctest
+    import materialize                      # type: ignore  # pragma: no cover
+
+OUTPUT_CACHE_MANIFEST_FILENAME = 'manifest.json'
+
+
+class OutputCacheEntry(object):
+    """
+    the output of one build in the cache : the target objects in the order the build wrote them, as
+    [template path, target name relative to the target directory, is_dir, no_overwrite], and the details of the build
+    which can not be taken from the target tree (unfilled patterns, pattern index)
+    """
+
+    def __init__(self, path_entry_dir: pathlib.Path, objects: List[List[Any]], details: Dict[str, Any]) -> None:
+        self.path_entry_dir = path_entry_dir
+        self.objects = objects
+        self.details = details
+
+    def get_path_object(self, target_name: str) -> pathlib.Path:
+        return self.path_entry_dir / 'tree' / target_name
+
+
+class OutputCache(object):
+    """
+    a cache of whole build outputs, keyed by a fingerprint of everything the output depends on : the pizzacutter version, the conf files,
+    the template files, the pattern values and the options. a build whose fingerprint is in the cache does not render anything,
+    the target tree is cloned (reflink) or copied from the cache. when the cache grows over max_size bytes or over max_entries entries,
+    the least recently used entries are removed - 0 is unlimited.
+
+    >>> # Setup
+    >>> path_test_dir = pathlib.Path(__file__).parent.parent.parent.resolve() / 'tests'
+    >>> path_cache_dir = path_test_dir / 'test_output_cache'
+    >>> path_target_dir = path_test_dir / 'test_output_cache_target'
+    >>> (path_target_dir / 'sub').mkdir(parents=True, exist_ok=True)
+    >>> _ = (path_target_dir / 'sub/test.txt').write_text('test')
+    >>> objects = [['{{p.dir}}', 'sub', True, False], ['{{p.dir}}/test.txt', 'sub/test.txt', False, False]]
+    >>> output_cache = OutputCache(path_cache_dir, max_entries=2)
+
+    >>> # Test store and get an entry
+    >>> output_cache.put('fingerprint_01', path_target_dir, objects, {'unfilled_patterns': {}})
+    True
+    >>> output_cache.put('fingerprint_01', path_target_dir, objects, {'unfilled_patterns': {}})
+    False
+    >>> entry = output_cache.get('fingerprint_01')
+    >>> entry.objects[1], entry.get_path_object('sub/test.txt').read_text()
+    (['{{p.dir}}/test.txt', 'sub/test.txt', False, False], 'test')
+    >>> output_cache.get('fingerprint_02') is None
+    True
+
+    >>> # Test the least recently used entry is removed
+    >>> for fingerprint in ('fingerprint_02', 'fingerprint_01', 'fingerprint_03'):
+    ...     _ = output_cache.put(fingerprint, path_target_dir, objects, dict())
+    ...     _ = output_cache.get(fingerprint)
+    >>> sorted(path_entry_dir.name for path_entry_dir in path_cache_dir.iterdir())
+    ['fingerprint_01', 'fingerprint_03']
+
+    >>> # Teardown
+    >>> path_cache_dir.rmtree(ignore_errors=True)
+    >>> path_target_dir.rmtree(ignore_errors=True)
+
+    """
+
+    def __init__(self, path_cache_dir: pathlib.Path, max_size: int = 0, max_entries: int = 0) -> None:
+        if max_size < 0 or max_entries < 0:
+            raise ValueError('the limits of the output cache must not be negative, 0 is unlimited')
+        self.path_cache_dir = pathlib.Path(path_cache_dir)
+        self.max_size = max_size
+        self.max_entries = max_entries
+        # fingerprint -> the order of the last use, for the entries used since the cache object was created. they are more recent than
+        # the others, and their order does not depend on the resolution of the mtimes
+        self.entries_used: Dict[str, int] = dict()
+
+    def get(self, fingerprint: str) -> Optional[OutputCacheEntry]:
+        """ the entry of the fingerprint, None if it is not in the cache. the entry is marked as recently used """
+        path_manifest_file = self.path_cache_dir / fingerprint / OUTPUT_CACHE_MANIFEST_FILENAME
+        try:
+            manifest = json.loads(path_manifest_file.read_text(encoding='utf-8'))
+            # the mtime of the manifest is the last use of the entry
+            os.utime(str(path_manifest_file))
+        except (OSError, ValueError):
+            return None
+        self.mark_used(fingerprint)
+        return OutputCacheEntry(path_manifest_file.parent, manifest['objects'], manifest['details'])
+
+    def mark_used(self, fingerprint: str) -> None:
+        self.entries_used[fingerprint] = max(self.entries_used.values(), default=0) + 1
+
+    def put(self, fingerprint: str, path_target_dir: pathlib.Path, objects: List[List[Any]], details: Dict[str, Any]) -> bool:
+        """
+        copy the target objects of a build into the cache - returns False if the entry is there already.
+        the entry is written into a temporary directory and renamed, so builds running in parallel never see half written entries
+        """
+        path_entry_dir = self.path_cache_dir / fingerprint
+        if (path_entry_dir / OUTPUT_CACHE_MANIFEST_FILENAME).is_file():
+            return False
+        self.path_cache_dir.mkdir(parents=True, exist_ok=True)
+        path_temp_dir = pathlib.Path(tempfile.mkdtemp(dir=str(self.path_cache_dir), prefix='.tmp_'))
+        try:
+            size = 0
+            for _, target_name, is_dir, _ in objects:
+                path_cached_object = path_temp_dir / 'tree' / target_name
+                if is_dir:
+                    path_cached_object.mkdir(parents=True, exist_ok=True)
+                    continue
+                path_cached_object.parent.mkdir(parents=True, exist_ok=True)
+                path_target_file = path_target_dir / target_name
+                if not materialize.reflink_file(path_target_file, path_cached_object):
+                    path_target_file.copy2(path_cached_object)
+                size += path_cached_object.stat().st_size
+            manifest = {'fingerprint': fingerprint, 'size': size, 'objects': objects, 'details': details}
+            (path_temp_dir / OUTPUT_CACHE_MANIFEST_FILENAME).write_text(json.dumps(manifest, indent=1), encoding='utf-8')
+            os.rename(str(path_temp_dir), str(path_entry_dir))
+        except OSError:
+            # another build stored the same entry meanwhile, or the target was changed during the build
+            path_temp_dir.rmtree(ignore_errors=True)
+            return False
+        self.mark_used(fingerprint)
+        self.evict()
+        return True
+
+    def evict(self) -> Tuple[int, int]:
+        """ removes the least recently used entries until the cache is within its limits, returns the number of entries removed and their size """
+        entries: List[Tuple[float, int, pathlib.Path]] = list()
+        for path_entry_dir in self.path_cache_dir.iterdir():
+            path_manifest_file = path_entry_dir / OUTPUT_CACHE_MANIFEST_FILENAME
+            try:
+                entries.append((path_manifest_file.stat().st_mtime, json.loads(path_manifest_file.read_text(encoding='utf-8'))['size'], path_entry_dir))
+            except (OSError, ValueError, KeyError):
+                # temporary directories of builds running in parallel
+                continue
+        entries.sort(key=lambda entry: (self.entries_used.get(entry[2].name, 0), entry[0]))
+        size = sum(entry[1] for entry in entries)
+        entries_removed = 0
+        bytes_removed = 0
+        while entries and ((self.max_size and size > self.max_size) or (self.max_entries and len(entries) > self.max_entries)):
+            _, entry_size, path_entry_dir = entries.pop(0)
+            path_entry_dir.rmtree(ignore_errors=True)
+            size -= entry_size
+            entries_removed += 1
+            bytes_removed += entry_size
+        return entries_removed, bytes_removed
+
+
+def get_file_digest(path_file: pathlib.Path) -> str:
+    """ the sha256 of the content of a file, read in chunks """
+    file_hash = hashlib.sha256()
+    with open(str(path_file), 'rb') as f_file:
+        for chunk in iter(lambda: f_file.read(1024 * 1024), b''):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
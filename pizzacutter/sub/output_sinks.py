@@ -0,0 +1,459 @@
+# STDLIB
+import abc
+import io
+import shutil
+import sys
+import tarfile
+import tempfile
+import zipfile
+from typing import BinaryIO, Callable, Dict, Optional, Set, Union
+
+# OWN
+import pathlib3x as pathlib
+
+# PROJ
+try:
+    from . import materialize
+    from . import target_snapshot
+except (ImportError, ModuleNotFoundError, ValueError):  # pragma: no cover
+    import materialize                  # type: ignore  # pragma: no cover
+    import target_snapshot              # type: ignore  # pragma: no cover
+
+
+class OutputSinkBase(abc.ABC):
+    """
+    the base class for the output of a build - every target object is written exactly once into the sink.
+    subclass it to implement custom backends (object stores, databases, ...) - make_dir and write_file must be implemented,
+    otherwise the sink can not be instantiated, so an incomplete sink fails before anything is written.
+
+    >>> class IncompleteSink(OutputSinkBase):
+    ...     def make_dir(self, path_target_dir, path_source_dir=None):
+    ...         pass
+    >>> IncompleteSink()
+    Traceback (most recent call last):
+    ...
+    TypeError: Can't instantiate abstract class IncompleteSink with abstract method write_file
+
+    >>> class NullSink(IncompleteSink):
+    ...     def write_file(self, path_target_file, content, path_source_file=None):
+    ...         pass
+    >>> sink = NullSink()
+    >>> sink.begin(pathlib.Path('/target'))
+    >>> sink.relative_name(pathlib.Path('/target/project/test.txt'))
+    'project/test.txt'
+
+    """
+    # sinks which can not represent objects outside the target directory (archives, memory) keep that False
+    supports_outside_write = False
+
+    def __init__(self) -> None:
+        self.path_target_dir = pathlib.Path()
+
+    def begin(self, path_target_dir: pathlib.Path) -> None:
+        """ called once at the start of a build, with the resolved target directory """
+        self.path_target_dir = pathlib.Path(path_target_dir).resolve()
+
+    def finish(self) -> None:
+        """ called once at the end of a build, even if the build failed """
+        pass
+
+    def relative_name(self, path_target_object: pathlib.Path) -> str:
+        """ the name of the target object relative to the target directory, always with forward slashes """
+        return str(pathlib.Path(path_target_object).relative_to(self.path_target_dir).as_posix())
+
+    def exists(self, path_target_object: pathlib.Path) -> bool:
+        """ if the target object already exists in the sink - needed for the overwrite checks """
+        return False
+
+    def is_unchanged(self, path_target_file: pathlib.Path, content: bytes) -> bool:
+        """ if the target file already exists in the sink with exactly that content - needed for write_if_changed """
+        return False
+
+    @abc.abstractmethod
+    def make_dir(self, path_target_dir: pathlib.Path, path_source_dir: Optional[pathlib.Path] = None) -> None:
+        """ create the target directory - path_source_dir is the template directory, if there is one """
+
+    @abc.abstractmethod
+    def write_file(self, path_target_file: pathlib.Path, content: bytes, path_source_file: Optional[pathlib.Path] = None) -> None:
+        """ write the target file with that content - path_source_file is the template file, if there is one """
+
+    def write_file_streamed(self, path_target_file: pathlib.Path, write_content: Callable[[BinaryIO], None],
+                            path_source_file: Optional[pathlib.Path] = None) -> int:
+        """
+        write a file whose content is too big to be held in memory - write_content writes the content into the file object passed.
+        returns the size written. the default spools the content to a temporary file and passes it to write_file -
+        sinks which can write incrementally should override that.
+        """
+        with tempfile.TemporaryFile() as f_spool:
+            write_content(f_spool)
+            size = f_spool.tell()
+            f_spool.seek(0)
+            self.write_file(path_target_file, f_spool.read(), path_source_file)
+        return size
+
+    def copy_file(self, path_source_file: pathlib.Path, path_target_file: pathlib.Path) -> None:
+        """ copy a file verbatim - sinks might override that with a more efficient method """
+        self.write_file(path_target_file, path_source_file.read_bytes(), path_source_file)
+
+    def materialize_file(self, path_source_file: pathlib.Path, path_target_file: pathlib.Path, method: str = 'copy') -> str:
+        """
+        materialize a verbatim file with the given method ('copy', 'reflink', 'hardlink') - if the sink can not do that, the file is copied.
+        returns the method actually used
+        """
+        self.copy_file(path_source_file, path_target_file)
+        return 'copy'
+
+
+class FileSystemSink(OutputSinkBase):
+    """
+    writes the target objects to the filesystem - the default sink.
+    which objects exist in the target is answered from a snapshot of the target tree, which is taken during the build and follows its writes -
+    so there is no exists/mkdir/unlink round trip per object, that matters on network filesystems.
+
+    >>> # Setup
+    >>> path_test_dir = pathlib.Path(__file__).parent.parent.parent.resolve() / 'tests'
+    >>> path_target_dir = path_test_dir / 'test_file_system_sink'
+    >>> path_source_file = path_test_dir / 'txt_file_input.txt'
+
+    >>> # Test
+    >>> sink = FileSystemSink()
+    >>> sink.begin(path_target_dir)
+    >>> sink.write_file(path_target_dir / 'sub/test.txt', b'test', path_source_file)
+    >>> assert sink.exists(path_target_dir / 'sub/test.txt')
+    >>> (path_target_dir / 'sub/test.txt').read_bytes()
+    b'test'
+
+    >>> # Teardown
+    >>> path_target_dir.rmtree(ignore_errors=True)
+
+    """
+    supports_outside_write = True
+    # chunk size for comparing existing files
+    compare_chunk_size = 1024 * 1024
+
+    def __init__(self, make_parents: bool = True) -> None:
+        super().__init__()
+        # create the parent directory before every file - can be switched off, if all directories are created up front
+        self.make_parents = make_parents
+        self.target_snapshot = target_snapshot.TargetSnapshot()
+
+    def begin(self, path_target_dir: pathlib.Path) -> None:
+        super().begin(path_target_dir)
+        self.reset_target_snapshot()
+
+    def reset_target_snapshot(self) -> None:
+        """ forget what was seen in the target, it is listed again when needed - for a new build or plan """
+        self.target_snapshot = target_snapshot.TargetSnapshot()
+
+    def exists(self, path_target_object: pathlib.Path) -> bool:
+        return self.target_snapshot.exists(path_target_object)
+
+    def is_unchanged(self, path_target_file: pathlib.Path, content: bytes) -> bool:
+        """
+        compares the size first, then the content in chunks - so we dont need to read big files which differ in size
+
+        >>> # Setup
+        >>> path_test_dir = pathlib.Path(__file__).parent.parent.parent.resolve() / 'tests'
+        >>> path_test_file = path_test_dir / 'test_find_version_number_in_file.txt'
+        >>> content = path_test_file.read_bytes()
+        >>> sink = FileSystemSink()
+
+        >>> # Test
+        >>> sink.is_unchanged(path_test_file, content)
+        True
+        >>> sink.is_unchanged(path_test_file, content[:-1] + b'x')
+        False
+        >>> sink.is_unchanged(path_test_file, content + b'x')
+        False
+        >>> sink.is_unchanged(path_test_dir / 'non_existing_file.txt', content)
+        False
+        >>> sink.is_unchanged(path_test_dir, content)
+        False
+
+        """
+        try:
+            if not self.target_snapshot.is_file(path_target_file) or path_target_file.stat().st_size != len(content):
+                return False
+            content_view = memoryview(content)
+            position = 0
+            with open(str(path_target_file), 'rb') as f_target:
+                chunk = f_target.read(self.compare_chunk_size)
+                while chunk:
+                    if content_view[position: position + len(chunk)] != chunk:
+                        return False
+                    position += len(chunk)
+                    chunk = f_target.read(self.compare_chunk_size)
+            return position == len(content)
+        except OSError:
+            return False
+
+    def make_dir(self, path_target_dir: pathlib.Path, path_source_dir: Optional[pathlib.Path] = None) -> None:
+        if not self.target_snapshot.is_dir(path_target_dir):
+            path_target_dir.mkdir(parents=True, exist_ok=True)
+            self.target_snapshot.add(path_target_dir, is_dir=True)
+
+    def prepare_file(self, path_target_file: pathlib.Path) -> None:
+        """ create the parent directory if it does not exist, and remove the existing target """
+        if self.make_parents and not self.target_snapshot.is_dir(path_target_file.parent):
+            path_target_file.parent.mkdir(parents=True, exist_ok=True)
+        # because sometimes we receive "permission denied" when overwriting the file (weired)
+        if self.target_snapshot.needs_unlink(path_target_file):
+            path_target_file.unlink(missing_ok=True)
+
+    def write_file(self, path_target_file: pathlib.Path, content: bytes, path_source_file: Optional[pathlib.Path] = None) -> None:
+        self.prepare_file(path_target_file)
+        path_target_file.write_bytes(content)
+        self.target_snapshot.add(path_target_file)
+        if path_source_file is not None:
+            # keep the executable bits of scripts
+            shutil.copymode(str(path_source_file), str(path_target_file))
+
+    def write_file_streamed(self, path_target_file: pathlib.Path, write_content: Callable[[BinaryIO], None],
+                            path_source_file: Optional[pathlib.Path] = None) -> int:
+        self.prepare_file(path_target_file)
+        with open(str(path_target_file), 'wb') as f_target:
+            self.target_snapshot.add(path_target_file)
+            write_content(f_target)
+            size = f_target.tell()
+        if path_source_file is not None:
+            shutil.copymode(str(path_source_file), str(path_target_file))
+        return size
+
+    def copy_file(self, path_source_file: pathlib.Path, path_target_file: pathlib.Path) -> None:
+        self.prepare_file(path_target_file)
+        path_source_file.copy2(path_target_file)
+        self.target_snapshot.add(path_target_file)
+
+    def materialize_file(self, path_source_file: pathlib.Path, path_target_file: pathlib.Path, method: str = 'copy') -> str:
+        """ clone or hardlink the file, fall back to a normal copy if the filesystem or the volume boundary does not allow it """
+        self.prepare_file(path_target_file)
+        if method == 'reflink' and materialize.reflink_file(path_source_file, path_target_file):
+            method_used = 'reflink'
+        elif method == 'hardlink' and materialize.hardlink_file(path_source_file, path_target_file):
+            method_used = 'hardlink'
+        else:
+            path_source_file.copy2(path_target_file)
+            method_used = 'copy'
+        self.target_snapshot.add(path_target_file)
+        return method_used
+
+
+class MemorySink(OutputSinkBase):
+    """
+    keeps the target files in memory, as a mapping of the relative (posix) path to the file content
+
+    >>> sink = MemorySink()
+    >>> sink.begin(pathlib.Path('/target'))
+    >>> sink.make_dir(pathlib.Path('/target/project'))
+    >>> sink.write_file(pathlib.Path('/target/project/test.txt'), b'test')
+    >>> sink.files
+    {'project/test.txt': b'test'}
+    >>> sink.directories
+    {'project'}
+    >>> assert sink.exists(pathlib.Path('/target/project'))
+
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.files: Dict[str, bytes] = dict()
+        self.directories: Set[str] = set()
+
+    def exists(self, path_target_object: pathlib.Path) -> bool:
+        name = self.relative_name(path_target_object)
+        return name in self.files or name in self.directories
+
+    def make_dir(self, path_target_dir: pathlib.Path, path_source_dir: Optional[pathlib.Path] = None) -> None:
+        self.directories.add(self.relative_name(path_target_dir))
+
+    def write_file(self, path_target_file: pathlib.Path, content: bytes, path_source_file: Optional[pathlib.Path] = None) -> None:
+        self.files[self.relative_name(path_target_file)] = content
+
+
+class ZipSink(OutputSinkBase):
+    """
+    streams the target objects into a zip archive - the archive can be a filename or a (non-seekable) binary file object like stdout
+
+    >>> # Setup
+    >>> path_test_dir = pathlib.Path(__file__).parent.parent.parent.resolve() / 'tests'
+    >>> path_source_file = path_test_dir / 'txt_file_input.txt'
+    >>> f_archive = io.BytesIO()
+
+    >>> # Test
+    >>> sink = ZipSink(f_archive)
+    >>> sink.begin(path_test_dir)
+    >>> sink.make_dir(path_test_dir / 'project', path_test_dir)
+    >>> sink.write_file(path_test_dir / 'project/test.txt', b'test', path_source_file)
+    >>> sink.finish()
+    >>> with zipfile.ZipFile(f_archive) as zip_file:
+    ...     zip_file.namelist()
+    ...     zip_file.read('project/test.txt')
+    ['project/', 'project/test.txt']
+    b'test'
+
+    """
+
+    def __init__(self, archive: Union[str, pathlib.Path, BinaryIO], compression: int = zipfile.ZIP_DEFLATED) -> None:
+        super().__init__()
+        if isinstance(archive, (str, pathlib.Path)):
+            archive = str(archive)
+        self.archive = archive
+        self.compression = compression
+        self.zip_file: Optional[zipfile.ZipFile] = None
+
+    def begin(self, path_target_dir: pathlib.Path) -> None:
+        super().begin(path_target_dir)
+        self.zip_file = zipfile.ZipFile(self.archive, mode='w', compression=self.compression)
+
+    def finish(self) -> None:
+        if self.zip_file is not None:
+            self.zip_file.close()
+            self.zip_file = None
+
+    def get_zip_info(self, name: str, path_source_object: Optional[pathlib.Path], is_dir: bool) -> zipfile.ZipInfo:
+        if is_dir:
+            name = name + '/'
+        if path_source_object is None:
+            zip_info = zipfile.ZipInfo(name)
+            zip_info.external_attr = (0o40755 if is_dir else 0o100644) << 16
+        else:
+            zip_info = zipfile.ZipInfo.from_file(str(path_source_object), name, strict_timestamps=False)
+        zip_info.compress_type = zipfile.ZIP_STORED if is_dir else self.compression
+        return zip_info
+
+    def make_dir(self, path_target_dir: pathlib.Path, path_source_dir: Optional[pathlib.Path] = None) -> None:
+        assert self.zip_file is not None, 'ZipSink.begin() was not called'
+        self.zip_file.writestr(self.get_zip_info(self.relative_name(path_target_dir), path_source_dir, is_dir=True), b'')
+
+    def write_file(self, path_target_file: pathlib.Path, content: bytes, path_source_file: Optional[pathlib.Path] = None) -> None:
+        assert self.zip_file is not None, 'ZipSink.begin() was not called'
+        self.zip_file.writestr(self.get_zip_info(self.relative_name(path_target_file), path_source_file, is_dir=False), content)
+
+    def write_file_streamed(self, path_target_file: pathlib.Path, write_content: Callable[[BinaryIO], None],
+                            path_source_file: Optional[pathlib.Path] = None) -> int:
+        assert self.zip_file is not None, 'ZipSink.begin() was not called'
+        zip_info = self.get_zip_info(self.relative_name(path_target_file), path_source_file, is_dir=False)
+        with self.zip_file.open(zip_info, mode='w', force_zip64=True) as f_target:
+            write_content(f_target)         # type: ignore
+        return int(zip_info.file_size)
+
+
+class TarSink(OutputSinkBase):
+    """
+    streams the target objects into a tar archive - the archive can be a filename or a (non-seekable) binary file object like stdout
+    compression can be '', 'gz', 'bz2' or 'xz'
+
+    >>> # Setup
+    >>> path_test_dir = pathlib.Path(__file__).parent.parent.parent.resolve() / 'tests'
+    >>> path_source_file = path_test_dir / 'txt_file_input.txt'
+    >>> f_archive = io.BytesIO()
+
+    >>> # Test
+    >>> sink = TarSink(f_archive, compression='gz')
+    >>> sink.begin(path_test_dir)
+    >>> sink.make_dir(path_test_dir / 'project', path_test_dir)
+    >>> sink.write_file(path_test_dir / 'project/test.txt', b'test', path_source_file)
+    >>> sink.finish()
+    >>> f_archive.seek(0)
+    0
+    >>> with tarfile.open(fileobj=f_archive, mode='r:gz') as tar_file:
+    ...     tar_file.getnames()
+    ...     tar_file.extractfile('project/test.txt').read()
+    ['project', 'project/test.txt']
+    b'test'
+
+    """
+
+    def __init__(self, archive: Union[str, pathlib.Path, BinaryIO], compression: str = '') -> None:
+        super().__init__()
+        self.archive = archive
+        self.compression = compression
+        self.tar_file: Optional[tarfile.TarFile] = None
+
+    def begin(self, path_target_dir: pathlib.Path) -> None:
+        super().begin(path_target_dir)
+        if isinstance(self.archive, (str, pathlib.Path)):
+            self.tar_file = tarfile.open(name=str(self.archive), mode=f'w:{self.compression}')     # type: ignore
+        else:
+            # stream mode, the file object does not need to be seekable
+            self.tar_file = tarfile.open(fileobj=self.archive, mode=f'w|{self.compression}')      # type: ignore
+
+    def finish(self) -> None:
+        if self.tar_file is not None:
+            self.tar_file.close()
+            self.tar_file = None
+
+    def get_tar_info(self, name: str, path_source_object: Optional[pathlib.Path], is_dir: bool) -> tarfile.TarInfo:
+        assert self.tar_file is not None, 'TarSink.begin() was not called'
+        if path_source_object is None:
+            tar_info = tarfile.TarInfo(name)
+            tar_info.mode = 0o755 if is_dir else 0o644
+        else:
+            tar_info = self.tar_file.gettarinfo(str(path_source_object), name)
+        # template symlinks are written as regular objects
+        tar_info.type = tarfile.DIRTYPE if is_dir else tarfile.REGTYPE
+        tar_info.linkname = ''
+        tar_info.size = 0
+        return tar_info
+
+    def make_dir(self, path_target_dir: pathlib.Path, path_source_dir: Optional[pathlib.Path] = None) -> None:
+        assert self.tar_file is not None, 'TarSink.begin() was not called'
+        self.tar_file.addfile(self.get_tar_info(self.relative_name(path_target_dir), path_source_dir, is_dir=True))
+
+    def write_file(self, path_target_file: pathlib.Path, content: bytes, path_source_file: Optional[pathlib.Path] = None) -> None:
+        assert self.tar_file is not None, 'TarSink.begin() was not called'
+        tar_info = self.get_tar_info(self.relative_name(path_target_file), path_source_file, is_dir=False)
+        tar_info.size = len(content)
+        self.tar_file.addfile(tar_info, io.BytesIO(content))
+
+    def write_file_streamed(self, path_target_file: pathlib.Path, write_content: Callable[[BinaryIO], None],
+                            path_source_file: Optional[pathlib.Path] = None) -> int:
+        """ the tar header needs the size before the content, so the content is spooled to a temporary file first """
+        assert self.tar_file is not None, 'TarSink.begin() was not called'
+        tar_info = self.get_tar_info(self.relative_name(path_target_file), path_source_file, is_dir=False)
+        with tempfile.TemporaryFile() as f_spool:
+            write_content(f_spool)
+            tar_info.size = f_spool.tell()
+            f_spool.seek(0)
+            self.tar_file.addfile(tar_info, f_spool)
+        return int(tar_info.size)
+
+
+def get_archive_sink(archive: str, archive_format: str = '') -> OutputSinkBase:
+    """
+    get an archive sink for the given filename, or for stdout if the filename is '-'
+    the format is one of 'zip', 'tar', 'tar.gz', 'tar.bz2', 'tar.xz' - if not given, it is derived from the filename, default is 'zip'
+
+    >>> get_archive_sink('project.tar.gz').compression
+    'gz'
+    >>> get_archive_sink('project.tgz').compression
+    'gz'
+    >>> get_archive_sink('project.tar').compression
+    ''
+    >>> get_archive_sink('project.tar.xz', 'zip').__class__.__name__
+    'ZipSink'
+    >>> get_archive_sink('project.zip', 'rar')
+    Traceback (most recent call last):
+    ...
+    ValueError: unknown archive format "rar"
+
+    """
+    if not archive_format:
+        archive_format = 'zip'
+        archive_lower = archive.lower()
+        for suffix, suffix_archive_format in (('.tar', 'tar'), ('.tar.gz', 'tar.gz'), ('.tgz', 'tar.gz'), ('.tar.bz2', 'tar.bz2'), ('.tar.xz', 'tar.xz')):
+            if archive_lower.endswith(suffix):
+                archive_format = suffix_archive_format
+
+    target: Union[str, BinaryIO] = archive
+    if archive == '-':
+        target = sys.stdout.buffer
+
+    if archive_format == 'zip':
+        return ZipSink(target)
+    elif archive_format == 'tar':
+        return TarSink(target)
+    elif archive_format in ('tar.gz', 'tar.bz2', 'tar.xz'):
+        return TarSink(target, compression=archive_format.split('.', 1)[1])
+    else:
+        raise ValueError(f'unknown archive format "{archive_format}"')
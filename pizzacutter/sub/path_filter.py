@@ -0,0 +1,69 @@
+# STDLIB
+import fnmatch
+import re
+from typing import Optional, Sequence
+
+# the characters which start a wildcard in a glob
+GLOB_WILDCARDS = re.compile(r'[*?\[]')
+
+
+class PathFilter(object):
+    """
+    selects a subset of the template with globs, each matched against the template path and against the target path of an object
+    (both relative, with forward slashes). like in the post processors, a glob matches the whole path and '*' matches '/' too.
+    an object is selected if it, or one of its directories, matches an 'only' glob (or there are none), and if neither it nor one of its
+    directories matches an 'exclude' glob. a directory which does not match an 'only' glob is still walked, if a glob might match below it.
+
+    >>> path_filter = PathFilter(only=['project/.github/*', 'project/setup.py'], exclude=['*.bak'])
+
+    >>> # Test directories
+    >>> path_filter.select('{{p.name}}', 'project', is_dir=True, parent_selected=False) is False
+    True
+    >>> path_filter.select('{{p.name}}/tests', 'project/tests', is_dir=True, parent_selected=False) is None
+    True
+
+    >>> # Test files
+    >>> path_filter.select('{{p.name}}/setup.py', 'project/setup.py', is_dir=False, parent_selected=False)
+    True
+    >>> path_filter.select('{{p.name}}/.github/ci.yml.bak', 'project/.github/ci.yml.bak', is_dir=False, parent_selected=False) is None
+    True
+
+    >>> # Test everything below a directory which matches an 'only' glob is selected
+    >>> PathFilter(only=['{{p.name}}/docs']).select('{{p.name}}/docs/index.md', 'project/docs/index.md', is_dir=False, parent_selected=True)
+    True
+
+    """
+
+    def __init__(self, only: Sequence[str] = (), exclude: Sequence[str] = ()) -> None:
+        self.only = list(only)
+        self.exclude = list(exclude)
+        # the part of the 'only' globs before the first wildcard - objects below a directory can only match, if its path and that prefix overlap
+        self.only_prefixes = [GLOB_WILDCARDS.split(glob, 1)[0] for glob in self.only]
+
+    def select(self, template_path: str, target_name: str, is_dir: bool, parent_selected: bool) -> Optional[bool]:
+        """
+        True if the object is selected, with everything below it - False for a directory which is not selected itself,
+        but might have selected objects below it - None if the object is not selected, and nothing below it
+        """
+        if self.matches_any(self.exclude, template_path, target_name):
+            return None
+        if parent_selected or not self.only or self.matches_any(self.only, template_path, target_name):
+            return True
+        if is_dir and (self.might_contain_selected(template_path) or self.might_contain_selected(target_name)):
+            return False
+        return None
+
+    @staticmethod
+    def matches_any(globs: Sequence[str], template_path: str, target_name: str) -> bool:
+        return any(fnmatch.fnmatchcase(template_path, glob) or fnmatch.fnmatchcase(target_name, glob) for glob in globs)
+
+    def might_contain_selected(self, dir_name: str) -> bool:
+        dir_prefix = dir_name + '/'
+        return any(only_prefix.startswith(dir_prefix) or dir_prefix.startswith(only_prefix) for only_prefix in self.only_prefixes)
+
+
+def get_path_filter(only: Sequence[str] = (), exclude: Sequence[str] = ()) -> Optional[PathFilter]:
+    """ the path filter of a build, None if it builds the whole template """
+    if not only and not exclude:
+        return None
+    return PathFilter(only=only, exclude=exclude)
@@ -0,0 +1,195 @@
+# STDLIB
+import json
+from typing import Any, BinaryIO, Dict, Iterable, List, Mapping, Tuple
+
+# OWN
+import pathlib3x as pathlib
+
+# the filename of the pattern index in the state directory
+PATTERN_INDEX_FILENAME = 'pattern_index.json'
+
+
+class PatternIndex(object):
+    """
+    the reverse mapping from each pattern key to the template objects which reference it, in the path or in the content, with counts.
+    it is built during the template walk, persisted with the build and can be queried later without rescanning the template.
+
+    >>> # Setup
+    >>> patterns = {'{{p.name}}': 'name', '{{p.full_name}}': 'full {{p.name}}', '{{p.version}}': '1.0', '{{p.unused}}': 'unused'}
+    >>> pattern_index = PatternIndex(patterns.keys())
+    >>> pattern_index.add_pattern_references(patterns)
+    >>> pattern_index.add_template_object('{{p.name}}', b'')
+    ({'{{p.name}}': 1}, {})
+    >>> _ = pattern_index.add_template_object('{{p.name}}/setup.py', b'version={{p.version}}\\nname={{p.full_name}}\\n{{p.version}}')
+
+    >>> # Test
+    >>> pattern_index.where('{{p.version}}')
+    {'paths': {}, 'contents': {'{{p.name}}/setup.py': 2}, 'references': []}
+    >>> pattern_index.where('{{p.name}}')['paths']
+    {'{{p.name}}': 1, '{{p.name}}/setup.py': 1}
+    >>> pattern_index.unused()
+    ['{{p.unused}}']
+    >>> pattern_index.files_depending_on('{{p.version}}')
+    ['{{p.name}}/setup.py']
+
+    >>> # Test pattern only used in the value of another pattern
+    >>> pattern_index.add_pattern_references({'{{p.full_name}}': 'full {{p.unused}}'})
+    >>> pattern_index.unused()
+    []
+
+    >>> # Test unknown pattern
+    >>> pattern_index.where('{{p.unknown}}')
+    Traceback (most recent call last):
+    ...
+    KeyError: 'pattern "{{p.unknown}}" is not in the pattern index'
+
+    """
+
+    def __init__(self, patterns: Iterable[str] = ()) -> None:
+        # pattern -> {template path: count}
+        self.paths: Dict[str, Dict[str, int]] = dict()
+        self.contents: Dict[str, Dict[str, int]] = dict()
+        # pattern -> the patterns referenced in its value (before the values are resolved)
+        self.references: Dict[str, List[str]] = dict()
+        self._patterns_bytes: List[Tuple[str, bytes]] = list()
+        for pattern in patterns:
+            self.add_pattern(pattern)
+
+    def add_pattern(self, pattern: str) -> None:
+        if pattern not in self.paths:
+            self._patterns_bytes.append((pattern, pattern.encode('utf-8')))
+        self.paths.setdefault(pattern, dict())
+        self.contents.setdefault(pattern, dict())
+        self.references.setdefault(pattern, list())
+
+    def add_pattern_references(self, patterns: Mapping[str, Any]) -> None:
+        """ record which patterns are referenced in the (string) values of other patterns - call it before the patterns are resolved """
+        for pattern, replacement in patterns.items():
+            if isinstance(replacement, str):
+                self.add_pattern(pattern)
+                for sub_pattern in self.paths:
+                    if sub_pattern in replacement and sub_pattern not in self.references[pattern]:
+                        self.references[pattern].append(sub_pattern)
+
+    def add_template_object(self, template_path: str, content: bytes) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """
+        count the pattern keys in the path (relative to the template directory) and in the content of a template object.
+        returns the counts of the pattern keys in the path and in the content of that object
+        """
+        path_counts: Dict[str, int] = dict()
+        content_counts: Dict[str, int] = dict()
+        for pattern, pattern_bytes in self._patterns_bytes:
+            count = template_path.count(pattern)
+            if count:
+                path_counts[pattern] = count
+            if content:
+                count = content.count(pattern_bytes)
+                if count:
+                    content_counts[pattern] = count
+        self.add_counts(template_path, path_counts, content_counts)
+        return path_counts, content_counts
+
+    def add_template_stream(self, template_path: str, f_source: BinaryIO, line_limit: int = -1) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """
+        like add_template_object, for files which are too big to be read at once - the content is counted line by line,
+        lines longer than line_limit in pieces. a pattern across the border of two pieces is not counted.
+
+        >>> import io
+        >>> pattern_index = PatternIndex(['{{p.name}}'])
+        >>> pattern_index.add_template_stream('test.txt', io.BytesIO(b'{{p.name}}\\n{{p.name}} {{p.name}}'), line_limit=100)
+        ({}, {'{{p.name}}': 3})
+
+        """
+        path_counts, content_counts = self.add_template_object(template_path, b'')
+        source_line = f_source.readline(line_limit)
+        while source_line:
+            if b'{{' in source_line:
+                for pattern, pattern_bytes in self._patterns_bytes:
+                    count = source_line.count(pattern_bytes)
+                    if count:
+                        content_counts[pattern] = content_counts.get(pattern, 0) + count
+            source_line = f_source.readline(line_limit)
+        self.add_counts(template_path, dict(), content_counts)
+        return path_counts, content_counts
+
+    def add_counts(self, template_path: str, path_counts: Mapping[str, int], content_counts: Mapping[str, int]) -> None:
+        """ add the counts of a template object which were already known, for instance from the last build """
+        for pattern, count in path_counts.items():
+            self.add_pattern(pattern)
+            self.paths[pattern][template_path] = count
+        for pattern, count in content_counts.items():
+            self.add_pattern(pattern)
+            self.contents[pattern][template_path] = count
+
+    def where(self, pattern: str) -> Dict[str, Any]:
+        """ where is the pattern used : in paths, in contents, and in the values of other patterns """
+        if pattern not in self.paths:
+            raise KeyError(f'pattern "{pattern}" is not in the pattern index')
+        return {'paths': self.paths[pattern],
+                'contents': self.contents[pattern],
+                'references': [referencing for referencing, referenced in self.references.items() if pattern in referenced]}
+
+    def is_used_in_template(self, pattern: str) -> bool:
+        return bool(self.paths[pattern] or self.contents[pattern])
+
+    def unused(self) -> List[str]:
+        """ the patterns which are not used in the template, neither directly nor through the value of a used pattern """
+        used = set(pattern for pattern in self.paths if self.is_used_in_template(pattern))
+        stack = list(used)
+        while stack:
+            for sub_pattern in self.references.get(stack.pop(), list()):
+                if sub_pattern not in used:
+                    used.add(sub_pattern)
+                    stack.append(sub_pattern)
+        return sorted(pattern for pattern in self.paths if pattern not in used)
+
+    def files_depending_on(self, pattern: str) -> List[str]:
+        """ the template objects which reference the pattern in the path or in the content """
+        return sorted(set(self.paths[pattern]) | set(self.contents[pattern]))
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {'version': 1,
+                'patterns': {pattern: {'paths': self.paths[pattern], 'contents': self.contents[pattern], 'references': self.references[pattern]}
+                             for pattern in self.paths}}
+
+    def save(self, path_index_file: pathlib.Path) -> None:
+        path_index_file.parent.mkdir(parents=True, exist_ok=True)
+        path_index_file.write_text(json.dumps(self.as_dict(), indent=1, sort_keys=True), encoding='utf-8')
+
+    @classmethod
+    def load(cls, path_index_file: pathlib.Path) -> 'PatternIndex':
+        """
+        load a persisted pattern index
+
+        >>> # Setup
+        >>> path_test_dir = pathlib.Path(__file__).parent.parent.parent.resolve() / 'tests'
+        >>> path_index_file = path_test_dir / 'test_pattern_index/pattern_index.json'
+        >>> pattern_index = PatternIndex(['{{p.name}}'])
+        >>> _ = pattern_index.add_template_object('{{p.name}}/test.txt', b'{{p.name}}')
+        >>> pattern_index.save(path_index_file)
+
+        >>> # Test
+        >>> PatternIndex.load(path_index_file).where('{{p.name}}')
+        {'paths': {'{{p.name}}/test.txt': 1}, 'contents': {'{{p.name}}/test.txt': 1}, 'references': []}
+        >>> PatternIndex.load(path_test_dir / 'not_existing.json')
+        Traceback (most recent call last):
+        ...
+        FileNotFoundError: no pattern index found at "...not_existing.json", build the project first
+
+        >>> # Teardown
+        >>> path_index_file.parent.rmtree()
+
+        """
+        if not path_index_file.is_file():
+            raise FileNotFoundError(f'no pattern index found at "{path_index_file}", build the project first')
+        return cls.from_dict(json.loads(path_index_file.read_text(encoding='utf-8')))
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'PatternIndex':
+        """ the pattern index from as_dict() """
+        pattern_index = cls()
+        for pattern, usage in data['patterns'].items():
+            pattern_index.paths[pattern] = usage['paths']
+            pattern_index.contents[pattern] = usage['contents']
+            pattern_index.references[pattern] = usage['references']
+        return pattern_index
@@ -1,6 +1,15 @@
 # stdlib
 import pathlib3x as pathlib
-from typing import Dict, Optional, Union
+from typing import Dict, List, Optional
+
+# proj
+try:
+    from . import lazy_patterns
+    from . import post_processing
+except (ImportError, ModuleNotFoundError):  # pragma: no cover
+    # imports for doctest
+    import lazy_patterns                    # type: ignore  # pragma: no cover
+    import post_processing                  # type: ignore  # pragma: no cover
 
 
 # we need this construction to be able to override path_conf_file, path_template_dir, path_target_dir by commandline
@@ -64,6 +73,48 @@ class PizzaCutterConfigBase(object):
         self.pizza_cutter_allow_outside_write = False
         self.pizza_cutter_dry_run = False
         self.pizza_cutter_quiet = False
+        # log every warning of the build when it happens - by default the warnings given per object (outside the project directory,
+        # unfilled patterns, absolute pathlib patterns, ...) are collected, and logged as one summary line per kind at the end of the build
+        self.pizza_cutter_verbose_diagnostics = False
+        # how to materialize verbatim files (no pattern in the content, only string patterns in the path) : 'copy', 'reflink' or 'hardlink'
+        # 'reflink' clones the file copy-on-write where the filesystem supports it, 'hardlink' links it to the template file
+        # (the target shares the inode with the template file - editing one edits both)
+        # if the filesystem or the volume boundary does not allow it, the file is copied.
+        self.pizza_cutter_materialize = 'copy'
+        # leave target files untouched if the content would not change - that keeps the mtimes, so make, IDE indexes, etc. dont rebuild
+        self.pizza_cutter_write_if_changed = False
+        # only re-render the target files whose template file, target file or the values of the patterns they depend on changed since the last build.
+        # targets which were renamed by a changed path pattern, or whose template file was removed, are deleted if they were not changed since.
+        self.pizza_cutter_selective_rebuild = False
+        # where the state of the builds into the target directory is kept (the pattern index, ...)
+        # None : no state is kept, except for a selective rebuild, a journaled or a resumed build - in a subdirectory of the user cache directory,
+        # derived from the target directory
+        self.pizza_cutter_path_state_dir: Optional[pathlib.Path] = None
+        # journal the target files in the state directory as they are completed - a build which was interrupted (CI timeout, OOM kill)
+        # can then be resumed, without rendering the completed files again
+        self.pizza_cutter_build_journal = False
+        # resource budgets in bytes, 0 is unlimited : files bigger than max_render_size, or which would not fit into max_build_memory (rss),
+        # are not rendered in memory, but handled according to oversize_action : 'stream' renders them line by line, 'copy' copies them verbatim.
+        # string pattern values (for instance the content of included files) bigger than max_include_size stop the build.
+        self.pizza_cutter_max_render_size = 0
+        self.pizza_cutter_max_build_memory = 0
+        self.pizza_cutter_max_include_size = 0
+        self.pizza_cutter_oversize_action = 'stream'
+        # the post processors which get batches of the target files matching their globs : formatters, chmod +x on scripts, line endings, ...
+        # processors in memory change the content before it is written, the others process the written files (only with the filesystem sink)
+        # for instance : post_processing.PostProcessor('black', ['*.py'], run_black, depends_on=['isort'])
+        self.pizza_cutter_post_processors: List[post_processing.PostProcessor] = list()
+        # a content addressed store shared by the builds of many target directories : each rendered content is written once into the store,
+        # the target files are cloned ('reflink') or hardlinked read-only ('hardlink') from there. None : the target files are written directly.
+        # the objects no target refers to anymore are removed with the CLI command 'gc-store'
+        self.pizza_cutter_path_content_store: Optional[pathlib.Path] = None
+        self.pizza_cutter_content_store_method = 'reflink'
+        # a cache of whole build outputs, keyed by a fingerprint of the pizzacutter version, the conf files, the template files and the pattern values :
+        # a build whose fingerprint is in the cache is cloned or copied from there, without rendering. None : no output cache.
+        # the least recently used outputs are removed, when the cache grows over max_size bytes or max_entries outputs - 0 is unlimited
+        self.pizza_cutter_path_output_cache: Optional[pathlib.Path] = None
+        self.pizza_cutter_output_cache_max_size = 0
+        self.pizza_cutter_output_cache_max_entries = 0
 
         # for patterns to look out after all replacements, in order to find unfilled patterns
         self.pizzacutter_pattern_prefixes = ['{{PizzaCutter', '{{cookiecutter', '{{pizzacutter', '{{Pizzacutter']
@@ -123,9 +174,14 @@ class PizzaCutterConfigBase(object):
         # /test3/test4/test.txt
         # by that way You might even write configuration files into /usr/etc or similar (depending on Your rights)!
 
+        # values which are expensive to compute (read files, call git, ...) can be lazy : a lazy_patterns.LazyPattern or a function without arguments,
+        # returning a string or a pathlib.Path. it is only called if the template uses that pattern, at most once per build.
+        # a LazyPattern with input files is cached in the state directory, and only called again if one of the input files changed :
+        # self.pizza_cutter_patterns['{{PizzaCutter.version}}'] = lazy_patterns.LazyPattern(lambda: get_version(path_setup_py), [path_setup_py])
+
         # ######################################################################################################################################################
 
-        self.pizza_cutter_patterns: Dict[str, Union[str, pathlib.Path]] = dict()
+        self.pizza_cutter_patterns: Dict[str, lazy_patterns.PatternValue] = dict()
         # this is useful in scripts, to detect if cutting already happened
         # for instance bash:  if [[ "{{PizzaCutter.True}}" == "True" ]]; then ...
         self.pizza_cutter_patterns['{{PizzaCutter.True}}'] = 'True'
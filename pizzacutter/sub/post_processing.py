@@ -0,0 +1,240 @@
+# STDLIB
+import concurrent.futures
+import fnmatch
+import os
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+# OWN
+import pathlib3x as pathlib
+
+# the default number of files a processor gets at once
+POST_PROCESS_BATCH_SIZE = 100
+
+
+class PostProcessFile(object):
+    """
+    a target file handed to a post processor : name is the path relative to the target directory, with forward slashes.
+    in memory processors get the content before it is written and can change it, processors on disk get the written file, content is None then.
+    """
+    __slots__ = ('path_target_file', 'name', 'content')
+
+    def __init__(self, path_target_file: pathlib.Path, name: str, content: Optional[bytes] = None) -> None:
+        self.path_target_file = path_target_file
+        self.name = name
+        self.content = content
+
+    def __repr__(self) -> str:
+        return f'PostProcessFile({self.name!r})'
+
+
+def get_target_name(path_target_file: pathlib.Path, path_target_dir: pathlib.Path) -> str:
+    """
+    the name of a target file for the globs : relative to the target directory with forward slashes - the full path, if it is outside
+
+    >>> get_target_name(pathlib.Path('/target/sub/test.py'), pathlib.Path('/target'))
+    'sub/test.py'
+    >>> get_target_name(pathlib.Path('/outside/test.py'), pathlib.Path('/target'))
+    '/outside/test.py'
+
+    """
+    str_target_file = str(path_target_file)
+    prefix = os.path.join(str(path_target_dir), '')
+    if str_target_file.startswith(prefix):
+        return str_target_file[len(prefix):].replace(os.sep, '/')
+    return str_target_file.replace(os.sep, '/')
+
+
+class PostProcessor(object):
+    """
+    a post processor, registered in the conf file with pizza_cutter_post_processors :
+        name        : the name the other processors refer to in depends_on
+        globs       : the target files it processes, matched against the name relative to the target directory - '*' matches also '/'
+        process     : called with batches of up to batch_size PostProcessFile, so one formatter call can handle many files
+        in_memory   : True : process the content before it is written - otherwise process the written files
+        depends_on  : the names of the processors which must have processed all their files before this one starts.
+                      processors on disk without dependencies run in parallel with the rendering.
+
+    >>> def add_newline(batch):
+    ...     for post_process_file in batch:
+    ...         post_process_file.content += b'\\n'
+    >>> processor = PostProcessor('add_newline', ['*.py', 'README'], add_newline, in_memory=True)
+    >>> processor.matches('sub/test.py'), processor.matches('README'), processor.matches('test.txt')
+    (True, True, False)
+
+    """
+
+    def __init__(self, name: str, globs: Sequence[str], process: Callable[[List[PostProcessFile]], None], in_memory: bool = False,
+                 batch_size: int = POST_PROCESS_BATCH_SIZE, depends_on: Sequence[str] = ()) -> None:
+        self.name = name
+        self.globs = list(globs)
+        self.process = process
+        self.in_memory = in_memory
+        self.batch_size = batch_size
+        self.depends_on = list(depends_on)
+
+    def __repr__(self) -> str:
+        return f'PostProcessor({self.name!r})'
+
+    def matches(self, name: str) -> bool:
+        return any(fnmatch.fnmatchcase(name, glob) for glob in self.globs)
+
+    def process_batches(self, post_process_files: Iterable[PostProcessFile]) -> int:
+        """ process the matching files in batches, returns the number of files processed """
+        batch = [post_process_file for post_process_file in post_process_files if self.matches(post_process_file.name)]
+        for position in range(0, len(batch), self.batch_size):
+            self.process(batch[position: position + self.batch_size])
+        return len(batch)
+
+
+def get_processor_stages(post_processors: Sequence[PostProcessor]) -> List[List[PostProcessor]]:
+    """
+    orders the processors by their dependencies : each stage only depends on the stages before it.
+    processors in memory can only depend on processors in memory, because they run before the files are written
+
+    >>> def process(batch):
+    ...     pass
+    >>> get_processor_stages([PostProcessor('b', ['*'], process, depends_on=['a']), PostProcessor('a', ['*'], process), PostProcessor('c', ['*'], process)])
+    [[PostProcessor('a'), PostProcessor('c')], [PostProcessor('b')]]
+    >>> get_processor_stages([PostProcessor('a', ['*'], process, depends_on=['a'])])
+    Traceback (most recent call last):
+    ...
+    ValueError: the post processors have circular dependencies: "a"
+    >>> get_processor_stages([PostProcessor('a', ['*'], process, depends_on=['unknown'])])
+    Traceback (most recent call last):
+    ...
+    ValueError: post processor "a" depends on the unknown post processor "unknown"
+    >>> get_processor_stages([PostProcessor('a', ['*'], process, in_memory=True, depends_on=['b']), PostProcessor('b', ['*'], process)])
+    Traceback (most recent call last):
+    ...
+    ValueError: post processor "a" runs in memory, it can not depend on "b" which runs on the written files
+
+    """
+    processors_by_name: Dict[str, PostProcessor] = dict()
+    for post_processor in post_processors:
+        if post_processor.name in processors_by_name:
+            raise ValueError(f'the post processor name "{post_processor.name}" is used twice')
+        processors_by_name[post_processor.name] = post_processor
+    for post_processor in post_processors:
+        for dependency in post_processor.depends_on:
+            if dependency not in processors_by_name:
+                raise ValueError(f'post processor "{post_processor.name}" depends on the unknown post processor "{dependency}"')
+            if post_processor.in_memory and not processors_by_name[dependency].in_memory:
+                raise ValueError(f'post processor "{post_processor.name}" runs in memory, it can not depend on "{dependency}" which runs on the written files')
+
+    stages: List[List[PostProcessor]] = list()
+    done: List[str] = list()
+    remaining = list(post_processors)
+    while remaining:
+        stage = [post_processor for post_processor in remaining if all(dependency in done for dependency in post_processor.depends_on)]
+        if not stage:
+            names = '", "'.join(post_processor.name for post_processor in remaining)
+            raise ValueError(f'the post processors have circular dependencies: "{names}"')
+        stages.append(stage)
+        done.extend(post_processor.name for post_processor in stage)
+        remaining = [post_processor for post_processor in remaining if post_processor not in stage]
+    return stages
+
+
+class PostProcessing(object):
+    """
+    runs the post processors of a build : the processors in memory on batches of rendered content before it is written,
+    the processors on disk on batches of written files - those without dependencies in a thread pool while the rendering goes on,
+    the others stage by stage after the rendering, when their dependencies are done.
+
+    >>> # Setup
+    >>> processed = list()
+    >>> def upper(batch):
+    ...     for post_process_file in batch:
+    ...         post_process_file.content = post_process_file.content.upper()
+    >>> def record(batch):
+    ...     processed.extend(post_process_file.name for post_process_file in batch)
+    >>> post_processing = PostProcessing([PostProcessor('upper', ['*.txt'], upper, in_memory=True),
+    ...                                   PostProcessor('record', ['*'], record, batch_size=2),
+    ...                                   PostProcessor('record_after', ['*.txt'], record, depends_on=['record'])])
+
+    >>> # Test
+    >>> post_process_file = PostProcessFile(pathlib.Path('/target/test.txt'), 'test.txt', b'content')
+    >>> post_processing.wants_content('test.txt'), post_processing.wants_content('test.py')
+    (True, False)
+    >>> post_processing.process_in_memory([post_process_file])
+    >>> post_process_file.content
+    b'CONTENT'
+    >>> for name in ('test.txt', 'a.py', 'b.py'):
+    ...     post_processing.add_written_file(PostProcessFile(pathlib.Path('/target') / name, name))
+    >>> post_processing.finish()
+    >>> sorted(processed)
+    ['a.py', 'b.py', 'test.txt', 'test.txt']
+    >>> post_processing.files_processed
+    5
+
+    """
+
+    def __init__(self, post_processors: Sequence[PostProcessor], jobs: Optional[int] = None) -> None:
+        stages = get_processor_stages(post_processors)
+        # the processors in memory, in the order of their dependencies
+        self.in_memory_processors = [post_processor for stage in stages for post_processor in stage if post_processor.in_memory]
+        self.on_disk_stages = [[post_processor for post_processor in stage if not post_processor.in_memory] for stage in stages]
+        self.on_disk_stages = [stage for stage in self.on_disk_stages if stage]
+        self.on_disk_processors = [post_processor for stage in self.on_disk_stages for post_processor in stage]
+        self.in_memory_batch_size = max([post_processor.batch_size for post_processor in self.in_memory_processors] or [POST_PROCESS_BATCH_SIZE])
+        self.jobs = jobs
+        self.written_files: List[PostProcessFile] = list()
+        # the files of the first stage which were not handed over yet
+        self._pending: Dict[str, List[PostProcessFile]] = {post_processor.name: list() for post_processor in self.on_disk_processors}
+        self._futures: List['concurrent.futures.Future[None]'] = list()
+        self._executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self.files_processed = 0
+
+    def wants_content(self, name: str) -> bool:
+        """ if a processor in memory wants to process that file """
+        return any(post_processor.matches(name) for post_processor in self.in_memory_processors)
+
+    def wants_file(self, name: str) -> bool:
+        """ if a processor on disk wants to process that file """
+        return any(post_processor.matches(name) for post_processor in self.on_disk_processors)
+
+    def process_in_memory(self, post_process_files: List[PostProcessFile]) -> None:
+        for post_processor in self.in_memory_processors:
+            self.files_processed += post_processor.process_batches(post_process_files)
+
+    def add_written_file(self, post_process_file: PostProcessFile) -> None:
+        """ a written file - full batches of the first stage are processed right away, in parallel with the rendering """
+        self.written_files.append(post_process_file)
+        if not self.on_disk_stages:
+            return
+        for post_processor in self.on_disk_stages[0]:
+            if post_processor.matches(post_process_file.name):
+                pending = self._pending[post_processor.name]
+                pending.append(post_process_file)
+                if len(pending) >= post_processor.batch_size:
+                    self.submit(post_processor, pending)
+                    self._pending[post_processor.name] = list()
+
+    def submit(self, post_processor: PostProcessor, batch: List[PostProcessFile]) -> None:
+        if self._executor is None:
+            self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.jobs)
+        self._futures.append(self._executor.submit(post_processor.process, batch))
+        self.files_processed += len(batch)
+
+    def wait(self) -> None:
+        """ wait for the submitted batches - the first exception of a processor is raised """
+        futures, self._futures = self._futures, list()
+        for future in futures:
+            future.result()
+
+    def finish(self) -> None:
+        """ process the rest of the first stage, then the following stages one after the other """
+        try:
+            for stage_number, stage in enumerate(self.on_disk_stages):
+                for post_processor in stage:
+                    if stage_number == 0:
+                        batch = self._pending[post_processor.name]
+                    else:
+                        batch = [post_process_file for post_process_file in self.written_files if post_processor.matches(post_process_file.name)]
+                    for position in range(0, len(batch), post_processor.batch_size):
+                        self.submit(post_processor, batch[position: position + post_processor.batch_size])
+                self.wait()
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
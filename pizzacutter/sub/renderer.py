@@ -0,0 +1,231 @@
+# STDLIB
+import types
+from typing import Any, BinaryIO, Callable, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+
+# OWN
+import pathlib3x as pathlib
+
+# PROJ
+try:
+    from . import lazy_patterns
+except (ImportError, ModuleNotFoundError):  # pragma: no cover
+    # imports for doctest
+    import lazy_patterns                    # type: ignore  # pragma: no cover
+
+
+class RendererBase(object):
+    """
+    the rendering of the lines, shared by Renderer and FrozenRenderer : first the string patterns are replaced, then the pathlib patterns
+    (with the str() of the path), then the option patterns are removed - a line with the option "delete_line_if_empty" is deleted
+    if nothing else is left. patterns are only replaced on lines with '{{'.
+    """
+    str_replacements: Sequence[Tuple[bytes, bytes]]
+    path_replacements: Sequence[Tuple[bytes, bytes]]
+    option_patterns: Sequence[Tuple[str, bytes]]
+
+    def replace_str_patterns_in_line(self, source_line: bytes) -> bytes:
+        for pattern_bytes, replacement_bytes in self.str_replacements:
+            source_line = source_line.replace(pattern_bytes, replacement_bytes)
+        return source_line
+
+    def replace_pathlib_patterns_in_line(self, source_line: bytes) -> bytes:
+        for pattern_bytes, replacement_bytes in self.path_replacements:
+            source_line = source_line.replace(pattern_bytes, replacement_bytes)
+        return source_line
+
+    def replace_option_patterns_in_line(self, source_line: bytes) -> bytes:
+        for option, pattern_bytes in self.option_patterns:
+            if pattern_bytes in source_line:
+                source_line = source_line.replace(pattern_bytes, b'')
+                if option == 'delete_line_if_empty' and source_line.strip() == b'':
+                    source_line = b''
+        return source_line
+
+    def render_line(self, source_line: bytes) -> bytes:
+        if b'{{' in source_line:
+            source_line = self.replace_str_patterns_in_line(source_line)
+            source_line = self.replace_pathlib_patterns_in_line(source_line)
+            source_line = self.replace_option_patterns_in_line(source_line)
+        return source_line
+
+    def render(self, content: bytes) -> bytes:
+        """ render the whole content - content without '{{' is returned as it is """
+        if b'{{' not in content:
+            return content
+        source_lines = content.split(b'\n')
+        last_line = source_lines.pop()
+        rendered_lines = [self.render_line(source_line + b'\n') for source_line in source_lines]
+        if last_line:
+            rendered_lines.append(self.render_line(last_line))
+        return b''.join(rendered_lines)
+
+    def render_stream(self, f_source: BinaryIO, f_target: BinaryIO, line_limit: int = -1) -> None:
+        """
+        render line by line from one file object to another - with a line_limit, lines longer than that are rendered in pieces,
+        so the memory stays bounded also for files without newlines. a pattern across the border of two pieces is not replaced.
+
+        >>> import io
+        >>> renderer = FrozenRenderer({'{{p.name}}': 'doctest'}, dict())
+        >>> f_target = io.BytesIO()
+        >>> renderer.render_stream(io.BytesIO(b'{{p.name}}\\n0123456789{{p.name}}'), f_target, line_limit=10)
+        >>> f_target.getvalue()
+        b'doctest\\n0123456789doctest'
+
+        """
+        for target_line in self.iter_render_stream(f_source, line_limit):
+            f_target.write(target_line)
+
+    def iter_render_stream(self, f_source: BinaryIO, line_limit: int = -1) -> Iterator[bytes]:
+        """ yields the rendered lines of a file object, see render_stream """
+        source_line = f_source.readline(line_limit)
+        while source_line:
+            yield self.render_line(source_line)
+            source_line = f_source.readline(line_limit)
+
+
+class Renderer(RendererBase):
+    """
+    replaces the patterns in the content of template files - it only needs the resolved patterns and the options, not the conf file,
+    so it can also render a serialized build plan on another machine.
+
+    lazy values are resolved when they are found in a line the first time, so the renderer changes while it renders -
+    a renderer shared by threads must be a FrozenRenderer.
+
+    >>> patterns = {'{{p.name}}': 'doctest', '{{p.empty}}': '', '{{p.path}}': pathlib.Path('/test/doctest')}
+    >>> options = {'delete_line_if_empty': '{{p.option.delete_line_if_empty}}'}
+    >>> renderer = Renderer(patterns, options)
+
+    >>> renderer.render(b'name={{p.name}}\\n{{p.empty}}{{p.option.delete_line_if_empty}}\\n{{p.empty}}\\npath={{p.path}}')
+    b'name=doctest\\n\\npath=/test/doctest'
+    >>> renderer.render(b'{{p.name}}{{p.option.delete_line_if_empty}}\\n')
+    b'doctest\\n'
+    >>> renderer.render(b'no pattern')
+    b'no pattern'
+
+    >>> # lazy values (LazyPattern or callables) are resolved with resolve, when they are found in a line the first time
+    >>> resolved = list()
+    >>> def resolve(pattern):
+    ...     resolved.append(pattern)
+    ...     return 'lazy'
+    >>> renderer = Renderer({'{{p.lazy}}': lambda: 'lazy', '{{p.unused}}': lambda: 'unused'}, options, resolve=resolve)
+    >>> renderer.render(b'{{p.lazy}}\\n{{p.lazy}}')
+    b'lazy\\nlazy'
+    >>> resolved
+    ['{{p.lazy}}']
+
+    """
+
+    def __init__(self, patterns: Mapping[str, Any], options: Mapping[str, str], resolve: Optional[Callable[[str], Union[str, pathlib.Path]]] = None) -> None:
+        self.str_replacements: List[Tuple[bytes, bytes]] = list()
+        self.path_replacements: List[Tuple[bytes, bytes]] = list()
+        # the lazy patterns, which are not resolved yet
+        self.lazy_patterns: List[Tuple[str, bytes]] = list()
+        self.resolve = resolve
+        for pattern, replacement in patterns.items():
+            if isinstance(replacement, str):
+                self.str_replacements.append((pattern.encode('utf-8'), replacement.encode('utf-8')))
+            elif lazy_patterns.is_lazy(replacement):
+                if resolve is None:
+                    raise ValueError(f'the value of pattern "{pattern}" is computed lazily, the renderer needs a resolve function for it')
+                self.lazy_patterns.append((pattern, pattern.encode('utf-8')))
+            else:
+                self.path_replacements.append((pattern.encode('utf-8'), str(replacement).encode('utf-8')))
+        self.option_patterns: List[Tuple[str, bytes]] = [(option, pattern.encode('utf-8')) for option, pattern in options.items()]
+
+    def resolve_lazy_patterns_in_line(self, source_line: bytes) -> None:
+        """ resolve the lazy patterns found in the line - from then on they are replaced like the other patterns """
+        for pattern, pattern_bytes in list(self.lazy_patterns):
+            if pattern_bytes in source_line and self.resolve is not None:
+                replacement = self.resolve(pattern)
+                if isinstance(replacement, str):
+                    self.str_replacements.append((pattern_bytes, replacement.encode('utf-8')))
+                else:
+                    self.path_replacements.append((pattern_bytes, str(replacement).encode('utf-8')))
+                self.lazy_patterns.remove((pattern, pattern_bytes))
+
+    def render_line(self, source_line: bytes) -> bytes:
+        if self.lazy_patterns and b'{{' in source_line:
+            self.resolve_lazy_patterns_in_line(source_line)
+        return super().render_line(source_line)
+
+
+class FrozenRenderer(RendererBase):
+    """
+    an immutable renderer for a fixed set of patterns : it is compiled once, and renders content (bytes -> bytes) and template paths
+    (str -> str) without changing any state - so one FrozenRenderer can be shared by any number of threads, without locks.
+    lazy values are resolved with resolve when the renderer is compiled, all of them, since it can not resolve them later.
+
+    >>> patterns = {'{{p.name}}': 'doctest', '{{p.lazy}}': lambda: 'lazy', '{{p.dir}}': pathlib.Path('sub/dir')}
+    >>> options = {'delete_line_if_empty': '{{p.option.delete_line_if_empty}}', 'object_no_overwrite': '{{p.option.no_overwrite}}'}
+    >>> frozen_renderer = FrozenRenderer(patterns, options, resolve=lambda pattern: patterns[pattern]())
+
+    >>> # Test content
+    >>> frozen_renderer.render(b'name={{p.name}}-{{p.lazy}}\\npath={{p.dir}}\\n{{p.option.delete_line_if_empty}}\\n')
+    b'name=doctest-lazy\\npath=sub/dir\\n'
+
+    >>> # Test paths
+    >>> frozen_renderer.render_path('{{p.dir}}/{{p.name}}_{{p.lazy}}{{p.option.no_overwrite}}.txt')
+    'sub/dir/doctest_lazy.txt'
+    >>> frozen_renderer.render_path('{{p.dir}}_{{p.name}}.txt')
+    Traceback (most recent call last):
+        ...
+    RuntimeError: pathlib.Path patterns can only be one complete part of a path : Path: "{{p.dir}}_{{p.name}}.txt", Pattern: {{p.dir}}
+
+    >>> # Test it can not be changed
+    >>> frozen_renderer.str_replacements = ()
+    Traceback (most recent call last):
+        ...
+    AttributeError: a FrozenRenderer can not be changed
+
+    """
+    __slots__ = ('str_replacements', 'path_replacements', 'option_patterns', 'str_path_replacements', 'path_part_replacements')
+    str_path_replacements: Sequence[Tuple[str, str]]
+    path_part_replacements: Mapping[str, str]
+
+    def __init__(self, patterns: Mapping[str, Any], options: Mapping[str, str], resolve: Optional[Callable[[str], Union[str, pathlib.Path]]] = None) -> None:
+        str_replacements: List[Tuple[str, str]] = list()
+        path_replacements: List[Tuple[str, str]] = list()
+        for pattern, replacement in patterns.items():
+            if lazy_patterns.is_lazy(replacement):
+                if resolve is None:
+                    raise ValueError(f'the value of pattern "{pattern}" is computed lazily, the renderer needs a resolve function for it')
+                replacement = resolve(pattern)
+            if isinstance(replacement, str):
+                str_replacements.append((pattern, replacement))
+            else:
+                path_replacements.append((pattern, str(replacement)))
+        set_attribute = super().__setattr__
+        set_attribute('str_replacements', tuple((pattern.encode('utf-8'), replacement.encode('utf-8')) for pattern, replacement in str_replacements))
+        set_attribute('path_replacements', tuple((pattern.encode('utf-8'), replacement.encode('utf-8')) for pattern, replacement in path_replacements))
+        set_attribute('option_patterns', tuple((option, pattern.encode('utf-8')) for option, pattern in options.items()))
+        # the same as str, for the paths
+        set_attribute('str_path_replacements', tuple(str_replacements))
+        set_attribute('path_part_replacements', types.MappingProxyType(dict(path_replacements)))
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError('a FrozenRenderer can not be changed')
+
+    def render_path(self, template_path: str) -> str:
+        """
+        the target path of a template path, relative like the template path - unless a pathlib pattern is absolute, then the last
+        absolute one is the start of the target path. like in a build, string patterns are replaced within the parts of the path,
+        option patterns are removed, and a pathlib pattern must be a whole part of the path.
+        """
+        target_parts: List[str] = list()
+        for part in pathlib.PurePath(template_path).parts:
+            for pattern, replacement in self.str_path_replacements:
+                part = part.replace(pattern, replacement)
+            for _, option_pattern in self.option_patterns:
+                part = part.replace(option_pattern.decode('utf-8'), '')
+            if not part:
+                raise RuntimeError(f'No part of the path must consist ONLY of option patterns: "{template_path}"')
+            for pattern, replacement in self.path_part_replacements.items():
+                if pattern not in part:
+                    continue
+                if part != pattern:
+                    raise RuntimeError(f'pathlib.Path patterns can only be one complete part of a path : Path: "{template_path}", Pattern: {pattern}')
+                part = replacement
+                if pathlib.PurePath(replacement).is_absolute():
+                    target_parts.clear()
+            target_parts.append(part)
+        return pathlib.PurePath(*target_parts).as_posix()
@@ -0,0 +1,133 @@
+# STDLIB
+import os
+import sys
+from typing import Any, List, Mapping
+
+# OWN
+import pathlib3x as pathlib
+
+# PROJ
+try:
+    from . import lint
+except (ImportError, ModuleNotFoundError):  # pragma: no cover
+    # imports for doctest
+    import lint                             # type: ignore  # pragma: no cover
+
+# what to do with files above the in-memory limit : render them in a bounded stream, or copy them verbatim
+OVERSIZE_ACTIONS = ('stream', 'copy')
+
+# the longest line the streaming renderer reads at once - longer lines are processed in pieces of that size
+STREAM_LINE_LIMIT = 1024 * 1024
+
+# the most pattern candidates collected from a streamed file, to look for unfilled patterns without holding the file
+MAX_PATTERN_EXCERPTS = 1000
+
+
+def get_peak_rss() -> int:
+    """
+    the peak resident set size of the process in bytes, 0 if not available on the platform
+
+    >>> assert get_peak_rss() >= 0
+
+    """
+    try:
+        import resource
+    except ImportError:                                     # pragma: no cover
+        return 0                                            # pragma: no cover
+    peak_rss = int(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+    # linux reports kilobytes, macOS bytes
+    return peak_rss if sys.platform == 'darwin' else peak_rss * 1024
+
+
+def get_current_rss() -> int:
+    """
+    the current resident set size of the process in bytes - falls back to the peak rss, where /proc is not available
+
+    >>> assert 0 <= get_current_rss()
+
+    """
+    try:
+        with open('/proc/self/statm', 'rb') as f_statm:
+            return int(f_statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):   # pragma: no cover
+        return get_peak_rss()                                   # pragma: no cover
+
+
+def add_pattern_excerpts(line: bytes, excerpts: List[bytes]) -> None:
+    """
+    collect the text after each '{{' of a line (up to the length of a pattern, or the next '{{') into excerpts, up to MAX_PATTERN_EXCERPTS
+
+    >>> excerpts = [b'{{p.first}}']
+    >>> add_pattern_excerpts(b'no pattern', excerpts)
+    >>> add_pattern_excerpts(b'x {{p.second}} y {{p.third', excerpts)
+    >>> excerpts
+    [b'{{p.first}}', b'{{p.second}} y ', b'{{p.third']
+
+    """
+    position = line.find(b'{{')
+    while position >= 0 and len(excerpts) < MAX_PATTERN_EXCERPTS:
+        # each excerpt ends before the next '{{', so a pattern is not found twice
+        next_position = line.find(b'{{', position + 2)
+        end_position = position + lint.MAX_PATTERN_LENGTH if next_position < 0 else min(next_position, position + lint.MAX_PATTERN_LENGTH)
+        excerpts.append(line[position: end_position].rstrip(b'\n'))
+        position = next_position
+
+
+class ResourceLimits(object):
+    """
+    the resource budgets of a build, 0 means unlimited :
+        max_render_size     : the biggest file which is rendered in memory
+        max_build_memory    : the memory the build should stay in (rss) - files are only rendered in memory if that fits into the budget
+        max_include_size    : the biggest string pattern value - conf files read included files into string patterns,
+                              and those values are held in memory and replaced in every line
+        oversize_action     : 'stream' renders oversized files in a bounded stream, 'copy' copies them verbatim without replacing patterns
+
+    >>> limits = ResourceLimits(max_render_size=100, oversize_action='copy')
+    >>> limits.get_render_mode(50)
+    'memory'
+    >>> limits.get_render_mode(101)
+    'copy'
+    >>> ResourceLimits().get_render_mode(10 ** 12)
+    'memory'
+    >>> ResourceLimits(max_build_memory=1).get_render_mode(1)
+    'stream'
+    >>> ResourceLimits(oversize_action='skip')
+    Traceback (most recent call last):
+    ...
+    ValueError: oversize_action must be one of ('stream', 'copy'), not "skip"
+    >>> ResourceLimits(max_include_size=3).check_pattern_sizes({'{{p.ok}}': 'abc', '{{p.path}}': pathlib.Path('/abcd')})
+    >>> ResourceLimits(max_include_size=3).check_pattern_sizes({'{{p.too_big}}': 'abcd'})
+    Traceback (most recent call last):
+    ...
+    ValueError: the value of pattern "{{p.too_big}}" has 4 bytes, more than max_include_size = 3 bytes
+
+    """
+
+    def __init__(self, max_render_size: int = 0, max_build_memory: int = 0, max_include_size: int = 0, oversize_action: str = 'stream') -> None:
+        if oversize_action not in OVERSIZE_ACTIONS:
+            raise ValueError(f'oversize_action must be one of {OVERSIZE_ACTIONS}, not "{oversize_action}"')
+        self.max_render_size = max_render_size
+        self.max_build_memory = max_build_memory
+        self.max_include_size = max_include_size
+        self.oversize_action = oversize_action
+
+    def get_render_mode(self, size: int) -> str:
+        """ 'memory' if a file of that size can be rendered in memory, otherwise the oversize action """
+        if self.max_render_size and size > self.max_render_size:
+            return self.oversize_action
+        # the content and the rendered content are held at the same time
+        if self.max_build_memory and get_current_rss() + 2 * size > self.max_build_memory:
+            return self.oversize_action
+        return 'memory'
+
+    def check_pattern_sizes(self, patterns: Mapping[str, Any]) -> None:
+        if not self.max_include_size:
+            return
+        for pattern, replacement in patterns.items():
+            if isinstance(replacement, str):
+                size = len(replacement.encode('utf-8'))
+                if size > self.max_include_size:
+                    raise ValueError(f'the value of pattern "{pattern}" has {size} bytes, more than max_include_size = {self.max_include_size} bytes')
+
+    def is_memory_budget_exceeded(self, peak_rss: int) -> bool:
+        return bool(self.max_build_memory) and peak_rss > self.max_build_memory
@@ -0,0 +1,111 @@
+# STDLIB
+import hashlib
+from typing import Optional, Sequence, Tuple
+
+# OWN
+import pathlib3x as pathlib
+
+# PROJ
+try:
+    from . import build_report
+except (ImportError, ModuleNotFoundError):  # pragma: no cover
+    # imports for doctest
+    import build_report                     # type: ignore  # pragma: no cover
+
+
+def parse_shard(shard: str) -> Tuple[int, int]:
+    """
+    the shard of a build from 'INDEX/COUNT' - the index counts from 1, like the job index of most CI matrices
+
+    >>> parse_shard('2/4')
+    (2, 4)
+    >>> parse_shard('5/4')
+    Traceback (most recent call last):
+    ...
+    ValueError: the shard must be given as INDEX/COUNT with 1 <= INDEX <= COUNT, not "5/4"
+
+    """
+    try:
+        str_index, str_count = shard.split('/')
+        index, count = int(str_index), int(str_count)
+    except ValueError:
+        index, count = 0, 0
+    if not 1 <= index <= count:
+        raise ValueError(f'the shard must be given as INDEX/COUNT with 1 <= INDEX <= COUNT, not "{shard}"')
+    return index, count
+
+
+def check_shard(shard: Optional[Tuple[int, int]]) -> Optional[Tuple[int, int]]:
+    """
+    >>> check_shard((1, 2))
+    (1, 2)
+    >>> check_shard(None)
+    >>> check_shard((0, 2))
+    Traceback (most recent call last):
+    ...
+    ValueError: the shard must be given as INDEX/COUNT with 1 <= INDEX <= COUNT, not "0/2"
+
+    """
+    if shard is None:
+        return None
+    return parse_shard(f'{shard[0]}/{shard[1]}')
+
+
+def get_shard_index(template_path: str, shard_count: int) -> int:
+    """
+    the shard a template object belongs to - from a hash of its template path, so it is the same on every machine and every run,
+    and does not depend on the order of the directory listings
+
+    >>> get_shard_index('{{PizzaCutter.project_dir}}/setup.py', 4)
+    2
+    >>> get_shard_index('{{PizzaCutter.project_dir}}/setup.py', 1)
+    1
+
+    """
+    path_hash = hashlib.sha256(template_path.encode('utf-8')).digest()
+    return int.from_bytes(path_hash[:8], 'big') % shard_count + 1
+
+
+def in_shard(template_path: str, shard: Optional[Tuple[int, int]]) -> bool:
+    """ if the template object belongs to the shard - every object belongs to a build without shard """
+    if shard is None:
+        return True
+    index, count = shard
+    return get_shard_index(template_path, count) == index
+
+
+def merge_reports(reports: Sequence[build_report.BuildReport]) -> build_report.BuildReport:
+    """
+    merges the partial reports of the shards of a build into the report of the whole build. if the reports are from shards,
+    all shards of the build must be there, each once - otherwise the merged report would not describe the whole build
+
+    >>> reports = list()
+    >>> for index in (1, 2):
+    ...     report = build_report.BuildReport()
+    ...     report.shards.append(f'{index}/2')
+    ...     report.add_file(method='render', size=10)
+    ...     report.unfilled_patterns[f'/target/file_{index}.txt'] = ['unfilled pattern "{{PizzaCutter.unfilled}}"']
+    ...     reports.append(report)
+    >>> merged_report = merge_reports(reports)
+    >>> merged_report.files_rendered, sorted(merged_report.unfilled_patterns), merged_report.shards
+    (2, ['/target/file_1.txt', '/target/file_2.txt'], ['1/2', '2/2'])
+
+    >>> merge_reports(reports[:1])
+    Traceback (most recent call last):
+    ...
+    ValueError: the reports are not from all shards of the build, shards merged: 1/2
+
+    """
+    merged_report = build_report.BuildReport()
+    for report in reports:
+        merged_report.add_report(report)
+    if merged_report.shards:
+        shards = [parse_shard(shard) for shard in merged_report.shards]
+        shard_count = shards[0][1]
+        if len(shards) != len(set(shards)) or len(reports) != len(shards) or sorted(shards) != [(index, shard_count) for index in range(1, shard_count + 1)]:
+            raise ValueError(f'the reports are not from all shards of the build, shards merged: {", ".join(merged_report.shards)}')
+    return merged_report
+
+
+def merge_report_files(path_report_files: Sequence[pathlib.Path]) -> build_report.BuildReport:
+    return merge_reports([build_report.BuildReport.load(pathlib.Path(path_report_file)) for path_report_file in path_report_files])
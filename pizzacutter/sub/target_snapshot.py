@@ -0,0 +1,165 @@
+# STDLIB
+import os
+import threading
+from typing import Dict, Optional
+
+# OWN
+import pathlib3x as pathlib
+
+# the kinds of the objects in a directory listing - 'broken' is a symlink whose target does not exist
+KIND_FILE = 'file'
+KIND_DIR = 'dir'
+KIND_OTHER = 'other'
+KIND_BROKEN = 'broken'
+
+
+class TargetSnapshot(object):
+    """
+    what exists in the target tree, so the existence and overwrite checks of a build dont need a filesystem round trip per object.
+    each directory is listed once with os.scandir, when the build first asks about an object in it - a directory whose parent is known
+    not to contain it is not even listed. the snapshot is updated as the build writes and removes objects, so it stays valid during the build.
+    objects which are changed by others during the build are not noticed.
+
+    >>> # Setup
+    >>> path_test_dir = pathlib.Path(__file__).parent.parent.parent.resolve() / 'tests'
+    >>> path_target_dir = path_test_dir / 'test_target_snapshot'
+    >>> (path_target_dir / 'sub').mkdir(parents=True, exist_ok=True)
+    >>> _ = (path_target_dir / 'sub/test.txt').write_text('test')
+    >>> snapshot = TargetSnapshot()
+
+    >>> # Test
+    >>> snapshot.exists(path_target_dir / 'sub/test.txt'), snapshot.is_file(path_target_dir / 'sub/test.txt'), snapshot.is_dir(path_target_dir / 'sub')
+    (True, True, True)
+    >>> snapshot.exists(path_target_dir / 'new/deeper/test.txt')
+    False
+
+    >>> # Test the snapshot follows the writes of the build, without listing the directory again
+    >>> (path_target_dir / 'sub/test.txt').unlink()
+    >>> snapshot.exists(path_target_dir / 'sub/test.txt')
+    True
+    >>> snapshot.remove(path_target_dir / 'sub/test.txt')
+    >>> snapshot.exists(path_target_dir / 'sub/test.txt')
+    False
+    >>> (path_target_dir / 'new/deeper').mkdir(parents=True)
+    >>> _ = (path_target_dir / 'new/deeper/test.txt').write_text('test')
+    >>> snapshot.add(path_target_dir / 'new/deeper/test.txt')
+    >>> snapshot.is_file(path_target_dir / 'new/deeper/test.txt'), snapshot.is_dir(path_target_dir / 'new/deeper')
+    (True, True)
+
+    >>> # Teardown
+    >>> path_target_dir.rmtree(ignore_errors=True)
+
+    """
+
+    def __init__(self) -> None:
+        # directory -> {name: kind}, None if the directory does not exist - directories which were not asked about are not in there
+        self.listings: Dict[str, Optional[Dict[str, str]]] = dict()
+        # the sinks might be used by more than one thread (apply_plan)
+        self.lock = threading.Lock()
+
+    def get_kind(self, path_object: pathlib.Path) -> Optional[str]:
+        """ the kind of the object, None if it does not exist """
+        str_path_object = os.path.abspath(str(path_object))
+        str_path_parent, name = os.path.split(str_path_object)
+        try:
+            with self.lock:
+                listing = self.get_listing(str_path_parent)
+        except OSError:
+            # directories we are not allowed to list, but might be allowed to access
+            return probe_kind(str_path_object)
+        if listing is None:
+            return None
+        return listing.get(name)
+
+    def exists(self, path_object: pathlib.Path) -> bool:
+        """ like pathlib.Path.exists() - False for broken symlinks """
+        return self.get_kind(path_object) not in (None, KIND_BROKEN)
+
+    def is_file(self, path_object: pathlib.Path) -> bool:
+        return self.get_kind(path_object) == KIND_FILE
+
+    def is_dir(self, path_object: pathlib.Path) -> bool:
+        return self.get_kind(path_object) == KIND_DIR
+
+    def needs_unlink(self, path_object: pathlib.Path) -> bool:
+        """ if there is anything (also a broken symlink) which has to be removed before that object can be written """
+        return self.get_kind(path_object) is not None
+
+    def add(self, path_object: pathlib.Path, is_dir: bool = False) -> None:
+        """ record an object written by the build - the parent directories it created are recorded as well """
+        with self.lock:
+            self.add_object(os.path.abspath(str(path_object)), KIND_DIR if is_dir else KIND_FILE)
+
+    def remove(self, path_object: pathlib.Path) -> None:
+        """ record an object removed by the build """
+        str_path_parent, name = os.path.split(os.path.abspath(str(path_object)))
+        with self.lock:
+            listing = self.listings.get(str_path_parent)
+            if listing is not None:
+                listing.pop(name, None)
+
+    def add_object(self, str_path_object: str, kind: str) -> None:
+        if kind == KIND_DIR and str_path_object in self.listings and self.listings[str_path_object] is None:
+            self.listings[str_path_object] = dict()
+        while True:
+            str_path_parent, name = os.path.split(str_path_object)
+            if not name:
+                return
+            if str_path_parent in self.listings:
+                listing = self.listings[str_path_parent]
+                if listing is not None:
+                    # the parent existed already, so did its parents
+                    listing[name] = kind
+                    return
+                # the parent was created together with the object
+                self.listings[str_path_parent] = {name: kind}
+            # a parent which was not listed yet is listed from the filesystem later, with the object in it
+            str_path_object, kind = str_path_parent, KIND_DIR
+
+    def get_listing(self, str_path_dir: str) -> Optional[Dict[str, str]]:
+        if str_path_dir in self.listings:
+            return self.listings[str_path_dir]
+        str_path_parent, name = os.path.split(str_path_dir)
+        if name and str_path_parent in self.listings:
+            parent_listing = self.listings[str_path_parent]
+            # the parent is known, and the directory is not in there
+            if parent_listing is None or parent_listing.get(name) != KIND_DIR:
+                self.listings[str_path_dir] = None
+                return None
+        self.listings[str_path_dir] = listing = scan_directory(str_path_dir)
+        return listing
+
+
+def probe_kind(str_path_object: str) -> Optional[str]:
+    """ the kind of a single object, the same way scan_directory() would classify it """
+    if os.path.isdir(str_path_object):
+        return KIND_DIR
+    if os.path.isfile(str_path_object):
+        return KIND_FILE
+    if os.path.islink(str_path_object) and not os.path.exists(str_path_object):
+        return KIND_BROKEN
+    if os.path.lexists(str_path_object):
+        return KIND_OTHER
+    return None
+
+
+def scan_directory(str_path_dir: str) -> Optional[Dict[str, str]]:
+    """ the objects in a directory and their kind, with one os.scandir() - None if it is not a directory, raises other OSErrors """
+    listing: Dict[str, str] = dict()
+    try:
+        with os.scandir(str_path_dir) as dir_entries:
+            for dir_entry in dir_entries:
+                try:
+                    if dir_entry.is_dir():
+                        listing[dir_entry.name] = KIND_DIR
+                    elif dir_entry.is_file():
+                        listing[dir_entry.name] = KIND_FILE
+                    elif dir_entry.is_symlink() and not os.path.exists(dir_entry.path):
+                        listing[dir_entry.name] = KIND_BROKEN
+                    else:
+                        listing[dir_entry.name] = KIND_OTHER
+                except OSError:                             # pragma: no cover
+                    listing[dir_entry.name] = KIND_OTHER    # pragma: no cover
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    return listing
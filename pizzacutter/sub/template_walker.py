@@ -0,0 +1,195 @@
+# STDLIB
+import os
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# OWN
+import pathlib3x as pathlib
+
+
+# selects the template objects of a build : called with the entry and if its directory was selected with everything below it.
+# returns True if the object is selected with everything below it, False if a directory is not selected itself but is walked,
+# None if the object is skipped - a skipped directory is not even entered
+SelectFunction = Callable[['TemplateEntry', bool], Optional[bool]]
+
+
+class TemplateEntry(object):
+    """
+    a file or directory of the template, as found by the template walker.
+    that record is kept small on purpose, because huge templates have millions of them :
+    no pathlib objects, only the path relative to the template directory, with forward slashes
+
+    >>> TemplateEntry('{{PizzaCutter.project_dir}}/test.txt', is_dir=False, no_overwrite=True)
+    TemplateEntry('{{PizzaCutter.project_dir}}/test.txt', is_dir=False, no_overwrite=True)
+    >>> TemplateEntry('{{PizzaCutter.project_dir}}/test.txt', is_dir=False, no_overwrite=False, layer=1)
+    TemplateEntry('{{PizzaCutter.project_dir}}/test.txt', is_dir=False, no_overwrite=False, layer=1)
+
+    """
+    __slots__ = ('path', 'is_dir', 'no_overwrite', 'layer')
+
+    def __init__(self, path: str, is_dir: bool, no_overwrite: bool, layer: int = 0) -> None:
+        self.path = path
+        self.is_dir = is_dir
+        # the no_overwrite option is inherited by all objects in a directory marked with it
+        self.no_overwrite = no_overwrite
+        # the number of the template layer the entry is from, 0 is the template of the conf file
+        self.layer = layer
+
+    def __repr__(self) -> str:
+        layer = f', layer={self.layer}' if self.layer else ''
+        return f'TemplateEntry({self.path!r}, is_dir={self.is_dir}, no_overwrite={self.no_overwrite}{layer})'
+
+
+def get_sorted_dir_entries(path_dir: str) -> List['os.DirEntry[str]']:
+    """ the entries of one directory, sorted by name to get a deterministic order """
+    with os.scandir(path_dir) as dir_entries:
+        return sorted(dir_entries, key=lambda dir_entry: dir_entry.name)
+
+
+def iter_template_subdirs_with_pattern(path_template_dir: pathlib.Path, patterns: Iterable[str]) -> Iterator['os.DirEntry[str]']:
+    """ yields the subdirectories of the template directory with a pattern in the name, sorted by name - only those are part of the template """
+    patterns = list(patterns)
+    for dir_entry in get_sorted_dir_entries(str(path_template_dir)):
+        if dir_entry.is_dir() and any(pattern in dir_entry.name for pattern in patterns):
+            yield dir_entry
+
+
+def walk_template(path_template_dir: pathlib.Path, patterns: Iterable[str], option_no_copy: str, option_no_overwrite: str,
+                  select: Optional[SelectFunction] = None) -> Iterator[TemplateEntry]:
+    """
+    walks the template in a single pass with os.scandir and yields compact template entries lazily, depth first,
+    each directory before its content, siblings sorted by name. Only the entries of the directories on the
+    current path are held in memory, so the memory stays roughly constant, whatever the size of the template.
+
+    only subdirectories of the template directory with a pattern in their name are part of the template.
+    objects marked with option_no_copy are not yielded, and directories marked with it are not even entered.
+    option_no_overwrite is passed down to all objects below a marked directory.
+    the type information of the os.DirEntry is reused, so there are no extra stat calls.
+    objects which are not selected by the select function are not yielded, directories which are skipped by it are not entered.
+
+    >>> # Setup
+    >>> path_test_dir = pathlib.Path(__file__).parent.parent.parent.resolve() / 'tests'
+    >>> path_template_dir = path_test_dir / 'pizzacutter_test_template_01'
+    >>> patterns = ['{{TestPizzaCutter.project_dir}}']
+
+    >>> # Test
+    >>> template_entries = list(walk_template(path_template_dir, patterns, '{{TestPizzaCutter.option.no_copy}}', '{{TestPizzaCutter.option.no_overwrite}}'))
+    >>> for template_entry in template_entries[:4]:
+    ...     print(template_entry)
+    TemplateEntry('{{TestPizzaCutter.project_dir}}', is_dir=True, no_overwrite=False)
+    TemplateEntry('{{TestPizzaCutter.project_dir}}/dir_test_01', is_dir=True, no_overwrite=False)
+    TemplateEntry('{{TestPizzaCutter.project_dir}}/dir_test_01/sub_test_01', is_dir=True, no_overwrite=False)
+    TemplateEntry('{{TestPizzaCutter.project_dir}}/dir_test_01/sub_test_01/test01.txt', is_dir=False, no_overwrite=False)
+
+    >>> # no_copy objects are pruned
+    >>> assert not [template_entry for template_entry in template_entries if 'no_copy' in template_entry.path]
+
+    >>> # only the selected subtree is walked
+    >>> def select(template_entry, parent_selected):
+    ...     if parent_selected or template_entry.path.endswith('/dir_test_01'):
+    ...         return True
+    ...     return False if template_entry.path.count('/') < 1 else None
+    >>> selected_entries = list(walk_template(path_template_dir, patterns, '{{TestPizzaCutter.option.no_copy}}', \
+'{{TestPizzaCutter.option.no_overwrite}}', select=select))
+    >>> assert len(selected_entries) > 2 and all(template_entry.path.count('/dir_test_01') for template_entry in selected_entries[1:])
+
+    >>> # no_overwrite is inherited
+    >>> [template_entry.path.rsplit('/', 1)[-1] for template_entry in template_entries if template_entry.no_overwrite]
+    ['test02{{TestPizzaCutter.option.no_overwrite}}.txt', 'test02{{TestPizzaCutter.option.no_overwrite}}.txt', \
+'dir_test_02{{TestPizzaCutter.option.no_overwrite}}', 'sub_test_01', 'test01.txt', \
+'test02{{TestPizzaCutter.option.no_overwrite}}.txt', 'test01.txt', 'test02{{TestPizzaCutter.option.no_overwrite}}.txt']
+
+    """
+    # the relative path of an entry is a slice of the DirEntry path, the template directory is the common prefix
+    len_template_dir_prefix = len(os.path.join(str(path_template_dir), ''))
+    convert_sep = os.sep != '/'
+
+    # a stack of (iterator over the entries of a directory, no_overwrite inherited from that directory, if that directory was selected)
+    stack: List[Tuple[Iterator['os.DirEntry[str]'], bool, bool]] = [(iter_template_subdirs_with_pattern(path_template_dir, patterns), False, False)]
+    while stack:
+        dir_entries, no_overwrite_inherited, selected_inherited = stack[-1]
+        dir_entry = next(dir_entries, None)
+        if dir_entry is None:
+            stack.pop()
+            continue
+
+        if option_no_copy in dir_entry.name:
+            continue
+
+        no_overwrite = no_overwrite_inherited or option_no_overwrite in dir_entry.name
+        is_dir = dir_entry.is_dir()
+        relative_path = dir_entry.path[len_template_dir_prefix:]
+        if convert_sep:
+            relative_path = relative_path.replace(os.sep, '/')                  # pragma: no cover
+        template_entry = TemplateEntry(relative_path, is_dir, no_overwrite)
+        selected: Optional[bool] = True
+        if select is not None:
+            selected = select(template_entry, selected_inherited)
+            if selected is None:
+                continue
+        yield template_entry
+
+        # like pathlib glob('**'), we dont follow symlinked directories
+        if is_dir and not dir_entry.is_symlink():
+            stack.append((iter(get_sorted_dir_entries(dir_entry.path)), no_overwrite, bool(selected)))
+
+
+def walk_template_layers(path_template_dirs: Sequence[pathlib.Path], patterns: Iterable[str], option_no_copy: str,
+                         option_no_overwrite: str, select: Optional[SelectFunction] = None) -> Iterator[TemplateEntry]:
+    """
+    walks the layers of a template and merges them into one list of entries, so each target object is written once.
+    objects with the same path (ignoring the option no_overwrite) are taken from the last layer which has them,
+    directories from the first one. the entries keep the position of their first appearance, so directories still come before their content.
+
+    >>> # Setup
+    >>> path_test_dir = pathlib.Path(__file__).parent.parent.parent.resolve() / 'tests'
+    >>> path_template_dirs = [path_test_dir / 'pizzacutter_test_template_01', path_test_dir / 'pizzacutter_test_template_02']
+    >>> patterns = ['{{TestPizzaCutter.project_dir}}']
+
+    >>> # Test
+    >>> template_entries = list(walk_template_layers(path_template_dirs, patterns, '{{TestPizzaCutter.option.no_copy}}', \
+'{{TestPizzaCutter.option.no_overwrite}}'))
+    >>> for template_entry in template_entries[:3]:
+    ...     print(template_entry)
+    TemplateEntry('{{TestPizzaCutter.project_dir}}', is_dir=True, no_overwrite=False)
+    TemplateEntry('{{TestPizzaCutter.project_dir}}/dir_test_01', is_dir=True, no_overwrite=False)
+    TemplateEntry('{{TestPizzaCutter.project_dir}}/dir_test_01/sub_test_01', is_dir=True, no_overwrite=False)
+    >>> [template_entry.layer for template_entry in template_entries if template_entry.path.endswith('/malformed.txt')]
+    [1]
+    >>> assert len(template_entries) == len(set(template_entry.path for template_entry in template_entries))
+
+    """
+    patterns = list(patterns)
+    merged_entries: Dict[str, TemplateEntry] = dict()
+    for layer, path_template_dir in enumerate(path_template_dirs):
+        for template_entry in walk_template(path_template_dir, patterns, option_no_copy, option_no_overwrite, select=select):
+            merge_key = template_entry.path.replace(option_no_overwrite, '')
+            if template_entry.is_dir and merge_key in merged_entries:
+                continue
+            template_entry.layer = layer
+            merged_entries[merge_key] = template_entry
+    return iter(merged_entries.values())
+
+
+def filter_template_entries(template_entries: Iterable[TemplateEntry], select: SelectFunction) -> Iterator[TemplateEntry]:
+    """
+    applies the select function to template entries which were walked already (compiled templates) - the entries below a skipped
+    directory are skipped as well. the entries must come depth first, each directory before its content, like from walk_template()
+
+    >>> template_entries = [TemplateEntry('a', True, False), TemplateEntry('a/b.txt', False, False), TemplateEntry('c', True, False),
+    ...                     TemplateEntry('c/d.txt', False, False)]
+    >>> [template_entry.path for template_entry in filter_template_entries(template_entries, lambda entry, selected: None if entry.path == 'a' else True)]
+    ['c', 'c/d.txt']
+
+    """
+    # (path prefix, selected) of the directories on the current path - selected is None for a skipped directory
+    dir_states: List[Tuple[str, Optional[bool]]] = list()
+    for template_entry in template_entries:
+        while dir_states and not template_entry.path.startswith(dir_states[-1][0]):
+            dir_states.pop()
+        if dir_states and dir_states[-1][1] is None:
+            continue
+        selected = select(template_entry, bool(dir_states and dir_states[-1][1]))
+        if template_entry.is_dir:
+            dir_states.append((template_entry.path + '/', selected))
+        if selected is not None:
+            yield template_entry
@@ -26,3 +26,12 @@ def test_cli_commands() -> None:
     assert call_cli_command('-h')
     assert call_cli_command('info')
     assert call_cli_command('--traceback info')
+    assert call_cli_command('patterns -h')
+    assert call_cli_command('lint -h')
+    assert call_cli_command('compile -h')
+    assert call_cli_command('render -h')
+    assert call_cli_command('plan -h')
+    assert call_cli_command('apply -h')
+    assert call_cli_command('gc-store -h')
+    assert call_cli_command('fleet -h')
+    assert call_cli_command('merge-reports -h')
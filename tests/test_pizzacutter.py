@@ -1,7 +1,9 @@
 # STDLIB
+import io
+import json
 import pytest                   # type: ignore
 import shutil
-from typing import Any
+from typing import Any, Set, Tuple
 import logging
 
 # OWN
@@ -9,6 +11,7 @@ import pathlib3x as pathlib
 
 # proj
 import pizzacutter
+from pizzacutter.sub import build_journal, build_manifest, sharding
 
 logger = logging.getLogger()
 
@@ -19,9 +22,11 @@ def pizza_cutter_instance():
     path_template_dir = path_test_dir / 'pizzacutter_test_template_02'
     path_conf_file = path_template_dir / 'PizzaCutterTestConfig_02.py'
     path_target_dir = path_test_dir / 'test_target'
+    path_state_dir = path_test_dir / 'test_target_state'
     path_outside_target_dir = get_outside_target_dir()
 
-    pizza_cutter = pizzacutter.PizzaCutter(path_conf_file=path_conf_file, path_template_dir=path_template_dir, path_target_dir=path_target_dir)
+    pizza_cutter = pizzacutter.PizzaCutter(path_conf_file=path_conf_file, path_template_dir=path_template_dir, path_target_dir=path_target_dir,
+                                           path_state_dir=path_state_dir)
     yield pizza_cutter  # provide the fixture value
     # teardown code
     if not path_target_dir.is_relative_to(path_test_dir):
@@ -31,9 +36,26 @@ def pizza_cutter_instance():
         raise RuntimeError(f'attempt to delete "{path_outside_target_dir}" which is outside the test dir "{path_test_dir}"')
 
     shutil.rmtree(path_target_dir, ignore_errors=True)
+    shutil.rmtree(path_state_dir, ignore_errors=True)
     shutil.rmtree(path_outside_target_dir, ignore_errors=True)
 
 
+@pytest.fixture(scope="function")
+def get_test_dir():
+    """ returns the paths of directories for a test in the test dir, they are removed after the test """
+    path_test_dir = pathlib.Path(__file__).parent.parent.resolve() / 'tests'
+    path_test_dirs = list()
+
+    def get_path_test_dir(name: str) -> pathlib.Path:
+        path_test_dirs.append(path_test_dir / f'test_build_{name}')
+        return path_test_dirs[-1]
+
+    yield get_path_test_dir
+    # teardown code
+    for path_dir in path_test_dirs:
+        shutil.rmtree(path_dir, ignore_errors=True)
+
+
 @pytest.fixture(params=[False, True], ids=['quiet=False', 'quiet=True'])
 def pizza_cutter_quiet(request: Any) -> bool:
     return request.param
@@ -73,6 +95,150 @@ def test_pizzacutter(pizza_cutter_instance, pizza_cutter_quiet, pizza_cutter_dry
         pizza_cutter_instance.build()
 
 
+def test_build_events_and_metrics(get_test_dir):
+    path_template_dir, path_conf_file = get_template_01()
+    f_events = io.StringIO()
+    metrics = pizzacutter.BuildMetrics()
+    pizza_cutter = pizzacutter.PizzaCutter(path_conf_file, path_template_dir, get_test_dir('target'), quiet=True, path_state_dir=get_test_dir('state'),
+                                           event_stream=pizzacutter.BuildEventStream(f_events), metrics=metrics)
+    report = pizza_cutter.build()
+    events = [json.loads(line)['event'] for line in f_events.getvalue().splitlines()]
+    assert (events[0], events[-1]) == ('build_started', 'build_finished')
+    assert events.count('file_written') == report.files_copied + report.files_rendered == metrics.file_seconds.count > 0
+    assert 'pizzacutter_phase_seconds{phase="render"}' in metrics.as_openmetrics(report)
+
+
+def test_build_report_diagnostics(get_test_dir):
+    # the diagnostics in the report do not depend on verbose or on the log level
+    path_template_dir, path_conf_file = get_template_01()
+    old_level = logger.level
+    try:
+        for name, verbose_diagnostics, level in (('default', False, logging.INFO), ('verbose', True, logging.INFO), ('error', False, logging.ERROR)):
+            logger.setLevel(level)
+            pizza_cutter = pizzacutter.PizzaCutter(path_conf_file, path_template_dir, get_test_dir(name), quiet=True,
+                                                   verbose_diagnostics=verbose_diagnostics)
+            assert pizza_cutter.build().diagnostics == {'unfilled_patterns_in_file': 1}
+    finally:
+        logger.setLevel(old_level)
+
+
+def test_layered_build(get_test_dir):
+    # the overlay replaces the files with the same path, each target is written once
+    path_template_dir, path_conf_file = get_template_01()
+    path_base_template_dir = path_template_dir.parent / 'pizzacutter_test_template_02'
+    path_target_dir = get_test_dir('target')
+    pizza_cutter = pizzacutter.PizzaCutter(path_base_template_dir / 'PizzaCutterTestConfig_02.py', path_base_template_dir, path_target_dir, quiet=True,
+                                           path_state_dir=get_test_dir('state'), layers=[path_conf_file])
+    report = pizza_cutter.build()
+    assert report.file_layers['{{TestPizzaCutter.project_dir}}/malformed.txt'] == str(path_base_template_dir)
+    assert report.file_layers['{{TestPizzaCutter.project_dir}}/test01.txt'] == str(path_template_dir)
+    assert (path_target_dir / 'pizzacutter_test_project/malformed.txt').is_file()
+
+
+def test_content_store_build(get_test_dir):
+    # two targets built through the same content store - the second build writes no new objects
+    path_template_dir, path_conf_file = get_template_01()
+    path_store_dir = get_test_dir('store')
+    path_target_dir, path_target_dir_02 = get_test_dir('target'), get_test_dir('target_02')
+    report = pizzacutter.PizzaCutter(path_conf_file, path_template_dir, path_target_dir, quiet=True, path_state_dir=get_test_dir('state'),
+                                     path_content_store=path_store_dir).build()
+    assert report.store_objects_written > 0
+    report = pizzacutter.PizzaCutter(path_conf_file, path_template_dir, path_target_dir_02, quiet=True, path_state_dir=get_test_dir('state_02'),
+                                     path_content_store=path_store_dir).build()
+    assert report.store_objects_written == 0 and report.store_objects_reused > 0
+    # the objects are only removed, when no target refers to them anymore
+    shutil.rmtree(path_target_dir)
+    assert pizzacutter.ContentStore(path_store_dir).gc() == (0, 0)
+    shutil.rmtree(path_target_dir_02)
+    assert pizzacutter.ContentStore(path_store_dir).gc()[0] > 0
+
+
+def test_output_cache_build(get_test_dir):
+    # the build of a fresh target with the same fingerprint is taken from the output cache, without rendering
+    path_template_dir, path_conf_file = get_template_01()
+    path_cache_dir = get_test_dir('output_cache')
+    path_target_dir, path_target_dir_02 = get_test_dir('target'), get_test_dir('target_02')
+    report_miss = pizzacutter.PizzaCutter(path_conf_file, path_template_dir, path_target_dir, quiet=True, path_state_dir=get_test_dir('state'),
+                                          path_output_cache=path_cache_dir).build()
+    report_hit = pizzacutter.PizzaCutter(path_conf_file, path_template_dir, path_target_dir_02, quiet=True, path_state_dir=get_test_dir('state_02'),
+                                         path_output_cache=path_cache_dir).build()
+    assert (report_miss.output_cache_misses, report_hit.output_cache_hits, report_hit.files_rendered) == (1, 1, 0)
+    assert report_hit.files_cloned + report_hit.files_copied == report_miss.files_rendered + report_miss.files_copied > 0
+    assert report_hit.directories_created == report_miss.directories_created
+    assert len(report_hit.unfilled_patterns) == len(report_miss.unfilled_patterns)
+    for path_file in (path for path in path_target_dir.glob('**/*') if path.is_file()):
+        assert (path_target_dir_02 / path_file.relative_to(path_target_dir)).read_bytes() == path_file.read_bytes()
+
+
+def test_build_subset(get_test_dir):
+    # only the selected objects are walked, written and checked for unfilled patterns
+    path_template_dir, path_conf_file = get_template_01()
+    path_target_dir = get_test_dir('target')
+    report = pizzacutter.PizzaCutter(path_conf_file, path_template_dir, path_target_dir, quiet=True, path_state_dir=get_test_dir('state'),
+                                     only=['pizzacutter_test_project/dir_test_01'], exclude=['*/sub_test_01']).build()
+    target_objects = sorted(path.relative_to(path_target_dir / 'pizzacutter_test_project').as_posix() for path in path_target_dir.glob('*/**/*'))
+    assert target_objects == ['dir_test_01', 'dir_test_01/test01.txt', 'dir_test_01/test02.txt']
+    # the unfilled patterns of the objects which are not selected (for instance "pizzacutter_test_project/test01.txt") are not reported
+    assert report.unfilled_patterns == {}
+
+
+def test_build_shards(get_test_dir):
+    # each shard is built into its own target like on CI workers - together the shards build the same as a full build
+    path_template_dir, path_conf_file = get_template_01()
+    path_target_dir = get_test_dir('target')
+    path_shard_dirs = [get_test_dir(f'target_shard_{index}') for index in (1, 2, 3)]
+    full_report = pizzacutter.PizzaCutter(path_conf_file, path_template_dir, path_target_dir, quiet=True, path_state_dir=get_test_dir('state')).build()
+    shard_reports = [pizzacutter.PizzaCutter(path_conf_file, path_template_dir, path_shard_dir, quiet=True, path_state_dir=get_test_dir(f'state_shard_{index}'),
+                                             shard=(index, 3)).build() for index, path_shard_dir in enumerate(path_shard_dirs, 1)]
+    merged_report = sharding.merge_reports(shard_reports)
+    assert merged_report.files_rendered == full_report.files_rendered
+    assert merged_report.directories_created == full_report.directories_created
+    assert sorted(map(len, merged_report.unfilled_patterns.values())) == sorted(map(len, full_report.unfilled_patterns.values()))
+    assert set.union(*map(get_target_objects, path_shard_dirs)) == get_target_objects(path_target_dir)
+
+
+def get_target_objects(path_dir: pathlib.Path) -> Set[pathlib.Path]:
+    return set(path.relative_to(path_dir) for path in path_dir.glob('**/*'))
+
+
+class InterruptedSink(pizzacutter.FileSystemSink):
+    """ a filesystem sink whose build is interrupted after some files are written """
+    def __init__(self, files_to_write: int) -> None:
+        super().__init__()
+        self.files_to_write = files_to_write
+
+    def write_file(self, path_target_file, content, path_source_file=None):
+        if not self.files_to_write:
+            raise RuntimeError('interrupted')
+        self.files_to_write -= 1
+        super().write_file(path_target_file, content, path_source_file)
+
+
+def test_resume_build(get_test_dir):
+    # the target files the interrupted build completed are kept, the journal is removed when the build finished
+    path_template_dir, path_conf_file = get_template_01()
+    path_target_dir, path_state_dir = get_test_dir('target'), get_test_dir('state')
+    path_state_dir_full = get_test_dir('state_full')
+    full_report = pizzacutter.PizzaCutter(path_conf_file, path_template_dir, get_test_dir('target_full'), quiet=True,
+                                          path_state_dir=path_state_dir_full).build()
+    # a build which is not journaled (or selective) does not record the build manifest
+    assert not (path_state_dir_full / build_manifest.BUILD_MANIFEST_FILENAME).exists()
+    with pytest.raises(RuntimeError, match='interrupted'):
+        pizzacutter.PizzaCutter(path_conf_file, path_template_dir, path_target_dir, quiet=True, path_state_dir=path_state_dir,
+                                output_sink=InterruptedSink(files_to_write=3), journal=True).build()
+    assert (path_state_dir / build_journal.BUILD_JOURNAL_FILENAME).is_file()
+    report = pizzacutter.PizzaCutter(path_conf_file, path_template_dir, path_target_dir, quiet=True, path_state_dir=path_state_dir, resume=True).build()
+    assert report.files_resumed == 3
+    assert report.files_rendered + report.files_resumed == full_report.files_rendered
+    assert not (path_state_dir / build_journal.BUILD_JOURNAL_FILENAME).exists()
+
+
+def get_template_01() -> Tuple[pathlib.Path, pathlib.Path]:
+    """ the template directory and the conf file of the test template 01 """
+    path_template_dir = pathlib.Path(__file__).parent.parent.resolve() / 'tests' / 'pizzacutter_test_template_01'
+    return path_template_dir, path_template_dir / 'PizzaCutterTestConfig_01.py'
+
+
 def get_outside_target_dir() -> pathlib.Path:
     path_test_dir = pathlib.Path(__file__).parent.parent.resolve() / 'tests'
     outside_target_dir = path_test_dir / 'outside_target_dir'